@@ -0,0 +1,10 @@
+"""Shared infrastructure for the game cogs (trivia_plus, word_racer, playset).
+
+This is a library, not a cog: it has no `setup`, and the game cogs import
+it as ``game_sessions``. Its info.json marks it as a shared library, so
+Red's downloader installs it, onto the bot's import path, along with any
+cog from this repo.
+"""
+from .leaderboard import *
+from .router import *
+from .registry import *
@@ -0,0 +1,198 @@
+"""Members' game statistics, kept in memory, ranked, and saved game by game."""
+import asyncio
+import bisect
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import discord
+from redbot.core import Config
+
+__all__ = ["LeaderboardIndex", "LeaderboardStore", "SORT_KEYS", "STAT_DEFAULTS"]
+
+# What each game cog registers for its members
+STAT_DEFAULTS = {"wins": 0, "games": 0, "total_score": 0}
+SORT_KEYS = ("wins", "games", "total_score", "average_score")
+# Ties on the sort key are broken by these, last first
+_TIEBREAKS = ("average_score", "total_score", "wins", "games")
+
+
+class LeaderboardIndex:
+    """Players' stats, with a ranking of the players by each of `SORT_KEYS`.
+
+    A ranking orders players by its key, then by the other keys in turn,
+    all descending; it is kept as a sorted list, so that changing one
+    player's stats moves just that player, and reading the top N players
+    only reads N entries.
+
+    Attributes
+    ----------
+    stats : `dict`
+        Maps player IDs to their stats. Replace a player's stats with
+        `update`, rather than changing them in place.
+
+    """
+
+    def __init__(self, stats: Optional[Dict[int, dict]] = None):
+        self.stats = dict(stats or {})
+        self._orders = {
+            key: (key,) + tuple(k for k in reversed(_TIEBREAKS) if k != key) for key in SORT_KEYS
+        }
+        self._rankings = {
+            key: sorted(self._rank(key, player_id, s) for player_id, s in self.stats.items())
+            for key in SORT_KEYS
+        }
+
+    def __len__(self):
+        return len(self.stats)
+
+    def update(self, player_id: int, stats: dict):
+        old = self.stats.get(player_id)
+        for key, ranking in self._rankings.items():
+            if old is not None:
+                del ranking[bisect.bisect_left(ranking, self._rank(key, player_id, old))]
+            bisect.insort(ranking, self._rank(key, player_id, stats))
+        self.stats[player_id] = stats
+
+    def remove(self, player_id: int):
+        old = self.stats.pop(player_id, None)
+        if old is None:
+            return
+        for key, ranking in self._rankings.items():
+            del ranking[bisect.bisect_left(ranking, self._rank(key, player_id, old))]
+
+    def ranked(self, key: str) -> Iterator[Tuple[int, dict]]:
+        """Iterate over (player ID, stats), best first by ``key``."""
+        if key not in self._rankings:
+            raise ValueError(f"{key} is not a valid key.")
+        for rank in self._rankings[key]:
+            player_id = rank[-1]
+            yield player_id, self.stats[player_id]
+
+    def _rank(self, key: str, player_id: int, stats: dict) -> tuple:
+        # Negated so that ascending order puts the best first; ties end up in ID order
+        return tuple(-stats[k] for k in self._orders[key]) + (player_id,)
+
+
+class LeaderboardStore:
+    """A game cog's per-member ``wins``, ``games`` and ``total_score``.
+
+    A guild's stats are read from ``config`` the first time they are
+    needed, and kept in memory, with each member's ``average_score``, in a
+    `LeaderboardIndex`. Recording a game updates everyone who played in it
+    in memory, and then saves all of their stats in a single write. The
+    global leaderboard, which sums each user's stats over all
+    guilds, is built from one read of every guild the first time it is
+    asked for, and then also kept up to date game by game.
+
+    The cog must still register `STAT_DEFAULTS` for its members, and should
+    only change their stats through `record_game` and `delete_member`, so
+    that what is in memory matches ``config``.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._guilds = {}  # guild ID -> LeaderboardIndex of members
+        self._global = None  # LeaderboardIndex of users, once loaded
+        self._lock = asyncio.Lock()
+
+    async def guild_index(self, guild: discord.Guild) -> LeaderboardIndex:
+        async with self._lock:
+            return await self._guild_index(guild)
+
+    async def global_index(self) -> LeaderboardIndex:
+        async with self._lock:
+            if self._global is None:
+                totals = {}
+                for guild_id, members in (await self.config.all_members()).items():
+                    if guild_id not in self._guilds:
+                        self._guilds[guild_id] = LeaderboardIndex(
+                            {member_id: _with_average(data) for member_id, data in members.items()}
+                        )
+                    for member_id, stats in self._guilds[guild_id].stats.items():
+                        total = totals.setdefault(member_id, dict(STAT_DEFAULTS))
+                        for key in STAT_DEFAULTS:
+                            total[key] += stats[key]
+                self._global = LeaderboardIndex(
+                    {user_id: _with_average(total) for user_id, total in totals.items()}
+                )
+            return self._global
+
+    async def top_members(
+        self, guild: discord.Guild, key: str, top: int
+    ) -> List[Tuple[discord.Member, dict]]:
+        """Return the ``top`` best members of ``guild`` by ``key``, with their stats.
+
+        Members who have left the guild are skipped. A ``top`` of 0 or less
+        returns every member.
+        """
+        index = await self.guild_index(guild)
+        return _take(((guild.get_member(i), stats) for i, stats in index.ranked(key)), top)
+
+    async def top_users(self, bot, key: str, top: int) -> List[Tuple[discord.User, dict]]:
+        """Return the ``top`` best users across all guilds by ``key``, with their stats."""
+        index = await self.global_index()
+        return _take(((bot.get_user(i), stats) for i, stats in index.ranked(key)), top)
+
+    async def record_game(self, guild: discord.Guild, results: Dict[int, Tuple[int, bool]]):
+        """Record one game's results, mapping member IDs to (score, whether they won)."""
+        if not results:
+            return
+        async with self._lock:
+            index = await self._guild_index(guild)
+            for member_id, (score, won) in results.items():
+                index.update(member_id, _add_game(index.stats.get(member_id), score, won))
+                if self._global is not None:
+                    self._global.update(
+                        member_id, _add_game(self._global.stats.get(member_id), score, won)
+                    )
+            # The guild's raw member data; no defaults, which are per member
+            async with self.config.custom(Config.MEMBER, str(guild.id))(default={}) as members:
+                for member_id in results:
+                    members[str(member_id)] = {
+                        key: index.stats[member_id][key] for key in STAT_DEFAULTS
+                    }
+
+    async def delete_member(self, guild_id: int, member_id: int):
+        """Delete a member's stats, both from ``config`` and from memory."""
+        async with self._lock:
+            await self.config.member_from_ids(guild_id, member_id).clear()
+            index = self._guilds.get(guild_id)
+            if index is not None:
+                index.remove(member_id)
+            # Rebuilt from every guild the next time it is asked for
+            self._global = None
+
+    async def _guild_index(self, guild: discord.Guild) -> LeaderboardIndex:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            members = await self.config.all_members(guild)
+            index = self._guilds[guild.id] = LeaderboardIndex(
+                {member_id: _with_average(data) for member_id, data in members.items()}
+            )
+        return index
+
+
+def _with_average(data: dict) -> dict:
+    stats = dict(STAT_DEFAULTS)
+    stats.update((key, data[key]) for key in STAT_DEFAULTS if key in data)
+    stats["average_score"] = stats["total_score"] / stats["games"] if stats["games"] else 0.0
+    return stats
+
+
+def _add_game(stats: Optional[dict], score: int, won: bool) -> dict:
+    stats = _with_average(stats or {})
+    stats["wins"] += int(won)
+    stats["games"] += 1
+    stats["total_score"] += score
+    stats["average_score"] = stats["total_score"] / stats["games"]
+    return stats
+
+
+def _take(rows: Iterator[tuple], top: int) -> List[tuple]:
+    taken = []
+    for player, stats in rows:
+        if player is None:
+            continue
+        taken.append((player, stats))
+        if len(taken) == top:
+            break
+    return taken
@@ -0,0 +1,159 @@
+"""Which game session is running in which channel."""
+import collections
+import weakref
+from typing import Any, Iterator, Optional
+
+import discord
+
+__all__ = [
+    "ChannelBusyError",
+    "SessionLimitError",
+    "SessionRegistry",
+    "SessionSlot",
+    "session_registry",
+]
+
+MAX_SESSIONS_PER_GUILD = 10
+MAX_SESSIONS = 100
+
+_registries = weakref.WeakKeyDictionary()  # bot -> SessionRegistry
+
+
+class SessionLimitError(Exception):
+    """A new game session can't be started right now."""
+
+    pass
+
+
+class ChannelBusyError(SessionLimitError):
+    """A game session is already running in the channel.
+
+    Attributes
+    ----------
+    kind : `str`
+        The kind of game which is running there.
+
+    """
+
+    def __init__(self, kind: str):
+        super().__init__(f"There is already an ongoing {kind} session in this channel.")
+        self.kind = kind
+
+
+class SessionSlot:
+    """A channel's claim on a game session, before and after it starts.
+
+    Attributes
+    ----------
+    channel : `discord.TextChannel`
+        The channel the game runs in.
+    kind : `str`
+        The kind of game, e.g. ``"trivia"``.
+    session : object, optional
+        The running session, once it has been started.
+
+    """
+
+    def __init__(self, channel: discord.TextChannel, kind: str):
+        self.channel = channel
+        self.kind = kind
+        self.session = None
+
+
+class SessionRegistry:
+    """The game sessions running in each channel, across all the game cogs.
+
+    A channel is claimed before a session is set up in it, and the claim
+    is checked and taken in one step, so two commands racing to start a
+    game in a channel can't both succeed. Claims are also limited to
+    ``per_guild`` in any one guild and to ``total`` in all.
+
+    Use `session_registry` to get the bot's registry, rather than creating
+    one.
+    """
+
+    def __init__(self, per_guild: int = MAX_SESSIONS_PER_GUILD, total: int = MAX_SESSIONS):
+        self.per_guild = per_guild
+        self.total = total
+        self._slots = {}  # channel ID -> SessionSlot
+        self._guild_counts = collections.Counter()  # guild ID -> claimed channels
+
+    def __len__(self):
+        return len(self._slots)
+
+    def claim(self, channel: discord.TextChannel, kind: str) -> SessionSlot:
+        """Claim ``channel`` for a new ``kind`` session.
+
+        Pass the session to `start` once it is running, or give the channel
+        back with `release` if it doesn't get that far.
+
+        Raises
+        ------
+        ChannelBusyError
+            The channel already has a session, or a claim on one.
+        SessionLimitError
+            The guild, or the bot as a whole, is running as many sessions
+            as it may.
+        """
+        slot = self._slots.get(channel.id)
+        if slot is not None:
+            raise ChannelBusyError(slot.kind)
+        guild_id = _guild_id(channel)
+        if len(self._slots) >= self.total:
+            raise SessionLimitError("There are too many games running right now; try again later.")
+        if self._guild_counts[guild_id] >= self.per_guild:
+            raise SessionLimitError(
+                f"This server already has {self.per_guild} games running; try again later."
+            )
+        slot = self._slots[channel.id] = SessionSlot(channel, kind)
+        self._guild_counts[guild_id] += 1
+        return slot
+
+    def start(self, slot: SessionSlot, session: Any):
+        slot.session = session
+
+    def release(self, channel: discord.abc.GuildChannel, holder: Any = None) -> bool:
+        """Give back ``channel``.
+
+        If ``holder``, a slot or a session, is given, the channel is only
+        released if that is what holds it, so that a session which ended
+        late can't release a newer session's channel. Returns whether the
+        channel was released.
+        """
+        slot = self._slots.get(channel.id)
+        if slot is None:
+            return False
+        if holder is not None and holder is not slot and holder is not slot.session:
+            return False
+        del self._slots[channel.id]
+        guild_id = _guild_id(channel)
+        self._guild_counts[guild_id] -= 1
+        if not self._guild_counts[guild_id]:
+            del self._guild_counts[guild_id]
+        return True
+
+    def get(self, channel: discord.abc.GuildChannel, kind: Optional[str] = None) -> Any:
+        """Return the session running in ``channel``, if it is of kind ``kind``."""
+        slot = self._slots.get(channel.id)
+        if slot is None or (kind is not None and slot.kind != kind):
+            return None
+        return slot.session
+
+    def sessions(self, kind: Optional[str] = None) -> Iterator[Any]:
+        """Iterate over the running sessions, or those of kind ``kind``."""
+        for slot in list(self._slots.values()):
+            if slot.session is not None and (kind is None or slot.kind == kind):
+                yield slot.session
+
+
+def _guild_id(channel) -> Optional[int]:
+    guild = getattr(channel, "guild", None)
+    return guild.id if guild is not None else None
+
+
+def session_registry(bot) -> SessionRegistry:
+    """Return the bot's `SessionRegistry`, shared by all the game cogs."""
+    registry = _registries.get(bot)
+    if registry is None:
+        registry = _registries[bot] = SessionRegistry()
+    return registry
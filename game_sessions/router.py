@@ -0,0 +1,114 @@
+"""Routing of messages to the game sessions waiting on them."""
+import asyncio
+import collections
+import logging
+import weakref
+from typing import Callable, Optional
+
+import discord
+
+__all__ = ["MessageRouter", "message_router"]
+
+LOG = logging.getLogger("red.eliza.game_sessions")
+
+_routers = weakref.WeakKeyDictionary()  # bot -> MessageRouter
+
+
+class MessageRouter:
+    """Waits for messages on behalf of game sessions, by channel.
+
+    ``bot.wait_for("message", ...)`` runs every waiter's check on every
+    message the bot sees, so with many games running, each message costs
+    one check per game. The router instead listens for messages once, and
+    only runs the checks of waiters in the message's own channel.
+
+    The router only listens while some cog is attached to it: each game cog
+    calls `attach` when it is created and `detach` when it unloads, and the
+    listener is removed when the last one detaches.
+
+    Use `message_router` to get the bot's router, rather than creating one.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._waiters = collections.defaultdict(list)  # channel ID -> [(future, check)]
+        self._holders = set()  # cogs using the router
+
+    def __len__(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def attach(self, holder):
+        """Start listening for messages on behalf of ``holder``, usually a cog."""
+        if not self._holders:
+            self.bot.add_listener(self.on_message, "on_message")
+            LOG.debug("Registered the game session message router")
+        self._holders.add(holder)
+
+    def detach(self, holder):
+        """Stop listening on behalf of ``holder``, and altogether if it was the last."""
+        if holder not in self._holders:
+            return
+        self._holders.discard(holder)
+        if not self._holders:
+            self.bot.remove_listener(self.on_message, "on_message")
+            LOG.debug("Removed the game session message router")
+
+    async def wait_for(
+        self,
+        channel: discord.abc.Messageable,
+        check: Optional[Callable[[discord.Message], bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> discord.Message:
+        """Wait for a message in ``channel`` passing ``check``.
+
+        Behaves like ``bot.wait_for("message", check=check, timeout=timeout)``
+        restricted to one channel: it returns the message, raises
+        `asyncio.TimeoutError` on timing out, and passes on any exception
+        ``check`` raises.
+        """
+        future = asyncio.get_event_loop().create_future()
+        waiter = (future, check or (lambda message: True))
+        self._waiters[channel.id].append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._discard(channel.id, waiter)
+
+    async def on_message(self, message: discord.Message):
+        waiters = self._waiters.get(message.channel.id)
+        if not waiters:
+            return
+        for waiter in list(waiters):
+            future, check = waiter
+            if future.done():
+                continue
+            try:
+                result = check(message)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                if result:
+                    future.set_result(message)
+
+    def _discard(self, channel_id: int, waiter):
+        waiters = self._waiters.get(channel_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[channel_id]
+
+
+def message_router(bot) -> MessageRouter:
+    """Return the bot's `MessageRouter`, creating it if needed.
+
+    All the game cogs share one router, so that each message is only
+    looked at once however many games are running.
+    """
+    router = _routers.get(bot)
+    if router is None:
+        router = _routers[bot] = MessageRouter(bot)
+    return router
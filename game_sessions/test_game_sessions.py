@@ -0,0 +1,237 @@
+"""Unit tests for game_sessions."""
+import asyncio
+import random
+import types
+
+import pytest
+
+from . import (
+    SORT_KEYS,
+    ChannelBusyError,
+    LeaderboardIndex,
+    SessionLimitError,
+    SessionRegistry,
+    message_router,
+    session_registry,
+)
+
+
+class FakeBot:
+    def __init__(self):
+        self.listeners = []
+
+    def add_listener(self, func, name=None):
+        self.listeners.append((func, name))
+
+    def remove_listener(self, func, name=None):
+        self.listeners.remove((func, name))
+
+
+def channel(channel_id: int, guild_id: int = 1):
+    return types.SimpleNamespace(id=channel_id, guild=types.SimpleNamespace(id=guild_id))
+
+
+def message(channel_, content: str = ""):
+    return types.SimpleNamespace(channel=channel_, content=content)
+
+
+# Session registry
+
+
+def test_claimed_channel_is_busy_until_released():
+    registry = SessionRegistry()
+    registry.claim(channel(1), "trivia")
+    with pytest.raises(ChannelBusyError) as raised:
+        registry.claim(channel(1), "wordracer")
+    assert raised.value.kind == "trivia"
+    assert registry.release(channel(1))
+    registry.claim(channel(1), "wordracer")
+
+
+def test_only_the_holder_releases_a_channel():
+    registry = SessionRegistry()
+    old_slot = registry.claim(channel(1), "trivia")
+    old_session = object()
+    registry.start(old_slot, old_session)
+    assert registry.release(channel(1), old_session)
+
+    new_slot = registry.claim(channel(1), "trivia")
+    new_session = object()
+    registry.start(new_slot, new_session)
+    # The old session ending late must not free the new session's channel
+    assert not registry.release(channel(1), old_session)
+    assert not registry.release(channel(1), old_slot)
+    assert registry.get(channel(1)) is new_session
+    assert registry.release(channel(1), new_slot)
+    assert registry.get(channel(1)) is None
+
+
+def test_get_and_sessions_filter_by_kind():
+    registry = SessionRegistry()
+    trivia, racer = object(), object()
+    registry.start(registry.claim(channel(1), "trivia"), trivia)
+    registry.start(registry.claim(channel(2), "wordracer"), racer)
+    registry.claim(channel(3), "trivia")  # claimed, but not started yet
+    assert registry.get(channel(1), "trivia") is trivia
+    assert registry.get(channel(1), "wordracer") is None
+    assert list(registry.sessions("trivia")) == [trivia]
+    assert set(registry.sessions()) == {trivia, racer}
+
+
+def test_per_guild_limit():
+    registry = SessionRegistry(per_guild=2, total=10)
+    registry.claim(channel(1, guild_id=1), "trivia")
+    registry.claim(channel(2, guild_id=1), "trivia")
+    with pytest.raises(SessionLimitError) as raised:
+        registry.claim(channel(3, guild_id=1), "trivia")
+    assert not isinstance(raised.value, ChannelBusyError)
+    registry.claim(channel(4, guild_id=2), "trivia")
+
+    registry.release(channel(1, guild_id=1))
+    registry.claim(channel(3, guild_id=1), "trivia")
+
+
+def test_total_limit():
+    registry = SessionRegistry(per_guild=10, total=2)
+    registry.claim(channel(1, guild_id=1), "trivia")
+    registry.claim(channel(2, guild_id=2), "trivia")
+    with pytest.raises(SessionLimitError):
+        registry.claim(channel(3, guild_id=3), "trivia")
+    registry.release(channel(2, guild_id=2))
+    registry.claim(channel(3, guild_id=3), "trivia")
+    assert len(registry) == 2
+
+
+def test_registries_share_the_bots_sessions():
+    bot = FakeBot()
+    first, second = session_registry(bot), session_registry(bot)
+    first.claim(channel(1), "trivia")
+    with pytest.raises(ChannelBusyError):
+        second.claim(channel(1), "playset")
+    session_registry(FakeBot()).claim(channel(1), "playset")
+
+
+# Message router
+
+
+@pytest.mark.asyncio
+async def test_router_delivers_only_matching_messages():
+    bot = FakeBot()
+    router = message_router(bot)
+    router.attach("trivia")
+    (on_message, name), = bot.listeners
+    assert name == "on_message"
+
+    waiting = asyncio.ensure_future(
+        router.wait_for(channel(1), check=lambda m: m.content == "yes", timeout=5)
+    )
+    await asyncio.sleep(0)
+    await on_message(message(channel(2), "yes"))
+    await on_message(message(channel(1), "no"))
+    assert not waiting.done()
+    answer = message(channel(1), "yes")
+    await on_message(answer)
+    assert await waiting is answer
+    assert len(router) == 0 and not router._waiters
+
+
+@pytest.mark.asyncio
+async def test_router_forgets_waiters_that_time_out():
+    router = message_router(FakeBot())
+    with pytest.raises(asyncio.TimeoutError):
+        await router.wait_for(channel(1), timeout=0.01)
+    assert len(router) == 0 and not router._waiters
+
+
+@pytest.mark.asyncio
+async def test_router_passes_on_check_errors():
+    bot = FakeBot()
+    router = message_router(bot)
+    router.attach("trivia")
+    (on_message, name), = bot.listeners
+
+    def check(m):
+        raise KeyError(m.content)
+
+    waiting = asyncio.ensure_future(router.wait_for(channel(1), check=check, timeout=5))
+    await asyncio.sleep(0)
+    await on_message(message(channel(1), "boom"))
+    with pytest.raises(KeyError):
+        await waiting
+    assert not router._waiters
+
+
+def test_router_listens_while_any_cog_is_attached():
+    bot = FakeBot()
+    assert message_router(bot) is message_router(bot)
+    router = message_router(bot)
+    router.attach("trivia")
+    router.attach("playset")
+    router.attach("trivia")  # e.g. a reloaded cog
+    assert len(bot.listeners) == 1
+    router.detach("trivia")
+    assert len(bot.listeners) == 1
+    router.detach("playset")
+    assert not bot.listeners
+    router.detach("playset")  # already detached
+    router.attach("wordracer")
+    assert len(bot.listeners) == 1
+
+
+# Leaderboard rankings
+
+
+def four_pass_sort(stats: dict, key: str) -> list:
+    # The leaderboard's original sort, except that players tied on every
+    # key end in ID order rather than in Config's order
+    priority = ["average_score", "total_score", "wins", "games"]
+    priority.remove(key)
+    priority.append(key)
+    items = sorted(stats.items())
+    for k in priority:
+        items = sorted(items, key=lambda t: t[1][k], reverse=True)
+    return [player_id for player_id, _ in items]
+
+
+def random_stats(rng: random.Random) -> dict:
+    # Small ranges, so that many players tie on one key or more
+    games = rng.randint(0, 3)
+    total_score = rng.randint(0, 2) * games
+    return {
+        "wins": rng.randint(0, games),
+        "games": games,
+        "total_score": total_score,
+        "average_score": total_score / games if games else 0.0,
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rankings_match_the_four_pass_sort(seed):
+    rng = random.Random(seed)
+    stats = {player_id: random_stats(rng) for player_id in rng.sample(range(1000), 60)}
+    index = LeaderboardIndex(stats)
+    for key in SORT_KEYS:
+        assert [player_id for player_id, _ in index.ranked(key)] == four_pass_sort(stats, key)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rankings_stay_sorted_through_updates(seed):
+    rng = random.Random(seed)
+    stats = {player_id: random_stats(rng) for player_id in range(40)}
+    index = LeaderboardIndex(stats)
+    for _ in range(200):
+        player_id = rng.randrange(50)
+        if rng.random() < 0.1:
+            index.remove(player_id)
+            stats.pop(player_id, None)
+        else:
+            stats[player_id] = random_stats(rng)
+            index.update(player_id, stats[player_id])
+    assert len(index) == len(stats)
+    for key in SORT_KEYS:
+        assert [player_id for player_id, _ in index.ranked(key)] == four_pass_sort(stats, key)
+
+
+def test_ranking_by_an_unknown_key_fails():
+    with pytest.raises(ValueError):
+        list(LeaderboardIndex().ranked("losses"))
@@ -1,4 +1,4 @@
 from .playset import PlaySet
 
 def setup(bot):
-    bot.add_cog(PlaySet())
+    bot.add_cog(PlaySet(bot))
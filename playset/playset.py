@@ -3,24 +3,39 @@ import discord
 from .session import SetSession
 from redbot.core import Config
 from redbot.core.utils.chat_formatting import box, pagify
+from game_sessions import (
+    STAT_DEFAULTS,
+    LeaderboardStore,
+    SessionLimitError,
+    message_router,
+    session_registry,
+)
 
 UNIQUE_ID = 0x717EE2E9
 
 class PlaySet(commands.Cog):
-    def __init__(self):
+    def __init__(self, bot):
         super().__init__()
-        self.set_sessions = []
+        self.bot = bot
+        self.sessions = session_registry(bot)
+        message_router(bot).attach(self)
         self.conf = Config.get_conf(self, identifier=UNIQUE_ID, force_registration=True)
-        self.conf.register_member(wins=0, games=0, total_score=0)
+        self.conf.register_member(**STAT_DEFAULTS)
+        self.leaderboard = LeaderboardStore(self.conf)
 
     @commands.group(invoke_without_command=True)
     async def playset(self, ctx: commands.Context):
-        session = self._get_set_session(ctx.channel)
-        if session is not None:
-            await ctx.send("There is already an ongoing Set session in this channel.")
+        try:
+            slot = self.sessions.claim(ctx.channel, "Set")
+        except SessionLimitError as exc:
+            await ctx.send(str(exc))
             return
-        session = SetSession.start(ctx)
-        self.set_sessions.append(session)
+        try:
+            session = SetSession.start(ctx)
+        except Exception:
+            self.sessions.release(ctx.channel, slot)
+            raise
+        self.sessions.start(slot, session)
         print("New Set session; "+str(ctx.channel)+" in "+str(ctx.guild.id))
 
     @playset.command(name="stop", aliases=["cancel"])
@@ -76,60 +91,35 @@ class PlaySet(commands.Cog):
                 ).format(field_name=sort_by, prefix=ctx.prefix)
             )
             return
-        guild = ctx.guild
-        data = await self.conf.all_members(guild)
-        data = {guild.get_member(u): d for u, d in data.items()}
-        data.pop(None, None)  # remove any members which aren't in the guild
-        await self.send_leaderboard(ctx, data, key, top)
+        rows = await self.leaderboard.top_members(ctx.guild, key, top)
+        await self.send_leaderboard(ctx, rows)
 
-    async def send_leaderboard(self, ctx: commands.Context, data: dict, key: str, top: int):
+    async def send_leaderboard(self, ctx: commands.Context, rows: list):
         """Send the leaderboard from the given data.
         Parameters
         ----------
         ctx : commands.Context
             The context to send the leaderboard to.
-        data : dict
-            The data for the leaderboard. This must map `discord.Member` ->
-            `dict`.
-        key : str
-            The field to sort the data by. Can be ``wins``, ``total_score``,
-            ``games`` or ``average_score``.
-        top : int
-            The number of members to display on the leaderboard.
+        rows : list
+            The leaderboard, best first, as ``(discord.Member, dict)``
+            pairs of players and their stats.
         Returns
         -------
         `list` of `discord.Message`
             The sent leaderboard messages.
         """
-        if not data:
+        if not rows:
             await ctx.send(_("There are no scores on record!"))
             return
-        leaderboard = self._get_leaderboard(data, key, top)
+        leaderboard = self._get_leaderboard(rows)
         ret = []
         for page in pagify(leaderboard, shorten_by=10):
             ret.append(await ctx.send(box(page, lang="py")))
         return ret
 
     @staticmethod
-    def _get_leaderboard(data: dict, key: str, top: int):
-        # Mix in average score
-        for member, stats in data.items():
-            if stats["games"] != 0:
-                stats["average_score"] = stats["total_score"] / stats["games"]
-            else:
-                stats["average_score"] = 0.0
-        # Sort by reverse order of priority
-        priority = ["average_score", "total_score", "wins", "games"]
-        try:
-            priority.remove(key)
-        except ValueError:
-            raise ValueError(f"{key} is not a valid key.")
-        # Put key last in reverse priority
-        priority.append(key)
-        items = data.items()
-        for key in priority:
-            items = sorted(items, key=lambda t: t[1][key], reverse=True)
-        max_name_len = max(map(lambda m: len(str(m)), data.keys()))
+    def _get_leaderboard(rows: list):
+        max_name_len = max(len(str(member)) for member, stats in rows)
         # Headers
         headers = (
             "Rank",
@@ -141,7 +131,7 @@ class PlaySet(commands.Cog):
         )
         lines = [" | ".join(headers), " | ".join(("-" * len(h) for h in headers))]
         # Header underlines
-        for rank, tup in enumerate(items, 1):
+        for rank, tup in enumerate(rows, 1):
             member, m_data = tup
             # Align fields to header width
             fields = tuple(
@@ -160,8 +150,6 @@ class PlaySet(commands.Cog):
             padding = [" " * (len(h) - len(f)) for h, f in zip(headers, fields)]
             fields = tuple(f + padding[i] for i, f in enumerate(fields))
             lines.append(" | ".join(fields).format(member=member, **m_data))
-            if rank == top:
-                break
         return "\n".join(lines)
 
     @commands.Cog.listener()
@@ -176,8 +164,7 @@ class PlaySet(commands.Cog):
         """
         channel = session.ctx.channel
         print("Ending Set session; "+str(channel)+" in "+str(channel.guild.id))
-        if session in self.set_sessions:
-            self.set_sessions.remove(session)
+        self.sessions.release(channel, session)
         if session.scores:
             await self.update_leaderboard(session)
 
@@ -188,22 +175,19 @@ class PlaySet(commands.Cog):
         session : SetSession
             The Set session to update scores from.
         """
-        max_score = 0
-        for member, score in session.scores.items():
-            if score>max_score:
-                max_score=score
-
-        for member, score in session.scores.items():
-            if member.id == session.ctx.bot.user.id:
-                continue
-            stats = await self.conf.member(member).all()
-            if score == max_score:
-                stats["wins"] += 1
-            stats["total_score"] += score
-            stats["games"] += 1
-            await self.conf.member(member).set(stats)
+        max_score = max([0, *session.scores.values()])
+        results = {
+            member.id: (score, score == max_score)
+            for member, score in session.scores.items()
+            if member.id != session.ctx.bot.user.id
+        }
+        await self.leaderboard.record_game(session.ctx.guild, results)
 
     def _get_set_session(self, channel: discord.TextChannel) -> SetSession:
-        return next(
-            (session for session in self.set_sessions if session.ctx.channel == channel), None
-        )
+        return self.sessions.get(channel, "Set")
+
+    def cog_unload(self):
+        for session in self.sessions.sessions("Set"):
+            session.force_stop()
+            self.sessions.release(session.ctx.channel, session)
+        message_router(self.bot).detach(self)
@@ -12,6 +12,8 @@ import os
 import random
 from zipfile import ZipFile
 
+from game_sessions import message_router
+
 __all__ = ["SetSession"]
 
 _CARD_SIZE = (84,61)
@@ -72,7 +74,7 @@ class SetSession:
         self.wrongAnswers = []
 
         message = await asyncio.gather(
-            self.ctx.bot.wait_for("message", check=self.check_set),
+            message_router(self.ctx.bot).wait_for(self.ctx.channel, check=self.check_set),
             self._wrong_handler())
         guess = message[0].content.upper()
         guess_unique = sorted(set(guess))
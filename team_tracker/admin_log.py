@@ -0,0 +1,72 @@
+"""Buffered, deduplicating sink for messages to the admin channels."""
+
+import asyncio
+import collections
+import logging
+from typing import Callable, Iterable
+
+import discord
+from redbot.core.utils.chat_formatting import pagify
+
+
+log = logging.getLogger('red.eliza.team_tracker.admin_log')
+
+ADMIN_LOG_WINDOW = 2.0  # seconds over which admin messages are coalesced
+
+
+class AdminLog(object):
+  """Collects admin messages and sends them in the background, in batches.
+
+  `post` never waits on Discord: it only buffers the message. The first
+  message after a quiet spell starts a window of ADMIN_LOG_WINDOW seconds; at
+  its end, everything buffered is sent as few messages as possible to every
+  channel returned by `channels`, all channels at once. A message posted
+  several times within one window is sent once, with a count, so an error
+  storm costs a handful of Discord messages instead of one per error."""
+
+  def __init__(self, channels: Callable[[], Iterable[discord.TextChannel]],
+               window: float = ADMIN_LOG_WINDOW):
+    self.channels = channels
+    self.window = window
+    self._pending = collections.OrderedDict()  # message -> times posted
+    self._flusher = None
+
+  def __len__(self):
+    return len(self._pending)
+
+  def post(self, message: str):
+    self._pending[message] = self._pending.get(message, 0) + 1
+    if self._flusher is None:
+      self._flusher = asyncio.ensure_future(self._flush_later())
+
+  def stop(self):
+    if self._flusher is not None:
+      self._flusher.cancel()
+      self._flusher = None
+
+  async def flush(self):
+    """Sends everything buffered now."""
+    if not self._pending:
+      return
+    pending, self._pending = self._pending, collections.OrderedDict()
+    text = '\n'.join(message if count == 1 else f'{message} (x{count})'
+                     for message, count in pending.items())
+    pages = list(pagify(text))
+    channels = [channel for channel in self.channels() if channel]
+    results = await asyncio.gather(
+        *[self._send(channel, pages) for channel in channels],
+        return_exceptions=True)
+    for channel, result in zip(channels, results):
+      if isinstance(result, Exception):
+        log.error(f'Could not send admin messages to {channel}: {result!r}')
+
+  async def _flush_later(self):
+    await asyncio.sleep(self.window)
+    self._flusher = None  # so that messages posted during the flush get a window
+    await self.flush()
+
+  @staticmethod
+  async def _send(channel: discord.TextChannel, pages):
+    # Pages go to each channel in order, but channels are sent to concurrently
+    for page in pages:
+      await channel.send(page)
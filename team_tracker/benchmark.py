@@ -0,0 +1,149 @@
+"""Offline load tests for the team tracker's hot paths.
+
+Runs a real TeamTracker, with real Config stored in a temporary directory,
+against a FakeHuntServer and an in-memory stand-in for a Discord guild and its
+members, and reports how long each operation takes:
+
+    python -m team_tracker.benchmark --users 10000 --teams 2000
+
+Discord API calls made by the cog (channel creation and edits, role changes)
+are simulated with a fixed delay, `--api-latency`, so that how well the cog
+overlaps them shows up in the results.
+"""
+
+import argparse
+import asyncio
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+
+from .fake_discord import FakeBot, FakeContext, FakeGuild, FakeUser, use_data_path
+from .fake_server import FakeHuntServer
+
+
+## Harness
+
+class Result(object):
+
+  def __init__(self, name: str, items: int, timings: list):
+    self.name = name
+    self.items = items
+    self.timings = timings
+
+  def __str__(self):
+    total = sum(self.timings)
+    line = (f'{self.name:24} {len(self.timings):4d} runs  {total:8.2f}s'
+            f'  {self.items / total if total else 0:10.0f} items/s')
+    if len(self.timings) > 1:
+      quantiles = sorted(self.timings)
+      p99 = quantiles[min(len(quantiles) - 1, int(len(quantiles) * .99))]
+      line += (f'  p50 {statistics.median(self.timings) * 1000:8.1f}ms'
+               f'  p99 {p99 * 1000:8.1f}ms')
+    return line
+
+
+async def timed(func, *args, **kwargs) -> float:
+  start = time.perf_counter()
+  await func(*args, **kwargs)
+  return time.perf_counter() - start
+
+
+async def run(users: int, teams: int, group_size: int, api_latency: float,
+              searches: int, data_path: pathlib.Path):
+  use_data_path(data_path)
+  from .team_tracker import TeamTracker
+
+  guild = FakeGuild('Benchmark Hunt', api_latency)
+  bot = FakeBot(guild)
+  ctx = FakeContext(bot, guild)
+  server = FakeHuntServer(secret='benchmark')
+  base_url = await server.start()
+
+  tracker = TeamTracker(bot)
+  await tracker.initialize_internals()
+  await tracker.config.server_url.set(base_url)
+  await tracker.config.secret.set('benchmark')
+  await tracker.config.user_refresh_budget.set(users)
+  await tracker.config.team_refresh_budget.set(teams)
+  await tracker.config.refresh_jitter.set(0.0)
+  tracker.team_schedule.jitter = tracker.user_table.scheduler.jitter = 0.0
+
+  print(f'Registering {users} users on {teams} teams...')
+  team_names = [f'team-{team_id}-{random.choice(["red", "blue", "green"])}'
+                for team_id in range(teams)]
+  for team_id, name in enumerate(team_names):
+    server.add_team(team_id, name.replace('-', ' ').title(), name)
+  for i in range(users):
+    user = FakeUser(f'user{i}')
+    bot.add_user(user)
+    guild.add_member(user)
+    server.register(await tracker._token(user), i % teams)
+    await tracker._set_user_state(user.id, last_updated=0)
+  await tracker.writes.flush()
+
+  results = []
+  print('Running benchmarks...')
+
+  # First pass assigns every user to a team; the second only re-confirms
+  for label in ('users: first refresh', 'users: refresh'):
+    for user_id in list(tracker.user_table.users):
+      tracker.user_table.update(user_id, last_updated=0)
+    results.append(Result(label, users, [await timed(
+        tracker.cron_update_users.coro, tracker)]))
+  await tracker.writes.flush()
+
+  for team_id in list(tracker.teams):
+    tracker.team_schedule.schedule(team_id, 0)
+  results.append(Result('teams: refresh', len(tracker.teams), [await timed(
+      tracker.cron_update_teams.coro, tracker)]))
+
+  timings = []
+  for i in range(searches):
+    timings.append(await timed(
+        type(tracker).team_search.callback, tracker, ctx,
+        random.choice(team_names)[:8]))
+  results.append(Result('team search', searches, timings))
+
+  timings = [await timed(type(tracker).admin_select.callback, tracker, ctx, 1)
+             for i in range(3)]
+  results.append(Result('admin select', 3 * len(tracker.teams), timings))
+
+  calls = guild.api_calls
+  results.append(Result(
+      'channel auto-batch', len(tracker.teams), [await timed(
+          type(tracker).channel_auto_batch.callback, tracker, ctx,
+          'text', group_size)]))
+  await tracker.writes.flush()
+
+  print()
+  for result in results:
+    print(result)
+  print(f'\n{guild.api_calls - calls} simulated Discord API calls for'
+        f' auto-batch; {dict(server.requests)} hunt server requests.')
+  print()
+  print('\n'.join(tracker.metrics.summary()))
+
+  await tracker._shutdown()
+  await server.stop()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--users', type=int, default=10000)
+  parser.add_argument('--teams', type=int, default=2000)
+  parser.add_argument('--group-size', type=int, default=20,
+                      help='teams per channel for auto-batch')
+  parser.add_argument('--api-latency', type=float, default=0.01,
+                      help='seconds per simulated Discord API call')
+  parser.add_argument('--searches', type=int, default=200)
+  args = parser.parse_args()
+  with tempfile.TemporaryDirectory() as data_path:
+    asyncio.get_event_loop().run_until_complete(run(
+        args.users, args.teams, args.group_size, args.api_latency,
+        args.searches, pathlib.Path(data_path)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,113 @@
+"""Resumable state for creating many team channels at once."""
+
+import time
+from typing import List
+
+import discord
+
+
+CATEGORY_LIMIT = 50  # most channels Discord allows in one category
+PROGRESS_INTERVAL = 2.0  # seconds between edits of a progress message
+
+CHANNEL_TYPES = {
+    'text': ['text'],
+    'voice': ['voice'],
+    'both': ['text', 'voice'],
+}
+
+
+class ChannelBatch(object):
+  """A batch of team channels to create in one guild, and how far it has got.
+
+  Each group of team IDs gets one channel of each kind named by
+  `channel_type`. Names are chosen when the batch is planned rather than when
+  its channels are made, so a resumed batch creates exactly the channels the
+  interrupted one would have. `created` maps the index of each group to the
+  IDs of whichever of its channels exist so far, by kind; `categories` lists
+  the IDs of the overflow categories made for this batch."""
+
+  channel_type = 'text'
+  groups = []  # list of lists of team_ids
+  names = []  # one channel name per group
+  created = {}  # group index -> {kind: channel_id}
+  categories = []  # category ids
+  started = 0  # time.time()
+
+  @staticmethod
+  def plan(channel_type: str, groups: List[List[int]], names: List[str]):
+    obj = ChannelBatch()
+    obj.channel_type = channel_type
+    obj.groups = [list(group) for group in groups]
+    obj.names = list(names)
+    obj.created = {}
+    obj.categories = []
+    obj.started = time.time()
+    return obj
+
+  @staticmethod
+  def read(data: dict):
+    obj = ChannelBatch()
+    obj.channel_type = data['channel_type']
+    obj.groups = data['groups']
+    obj.names = data['names']
+    # Config round-trips through JSON, which turns integer keys into strings
+    obj.created = {int(index): channels
+                   for index, channels in data.get('created', {}).items()}
+    obj.categories = data.get('categories', [])
+    obj.started = data.get('started', time.time())
+    return obj
+
+  def serialize(self) -> dict:
+    return {
+        'channel_type': self.channel_type,
+        'groups': self.groups,
+        'names': self.names,
+        'created': {str(index): channels
+                    for index, channels in self.created.items()},
+        'categories': self.categories,
+        'started': self.started,
+    }
+
+  @property
+  def kinds(self) -> List[str]:
+    return CHANNEL_TYPES[self.channel_type]
+
+  def missing(self, index: int) -> List[str]:
+    """The kinds of channel not yet created for group `index`."""
+    channels = self.created.get(index, {})
+    return [kind for kind in self.kinds if kind not in channels]
+
+  def pending(self) -> List[int]:
+    """Indexes of the groups whose channels have not all been created."""
+    return [index for index in range(len(self.groups)) if self.missing(index)]
+
+  def done(self) -> bool:
+    return not self.pending()
+
+  def progress(self) -> str:
+    finished = len(self.groups) - len(self.pending())
+    return (f'Created channels for {finished} of {len(self.groups)} groups'
+            f' ({time.time() - self.started:.0f}s elapsed).')
+
+
+class ProgressMessage(object):
+  """A status message which is edited in place, at most every PROGRESS_INTERVAL seconds."""
+
+  def __init__(self, channel: discord.abc.Messageable):
+    self.channel = channel
+    self.message = None
+    self._last_edit = 0
+
+  async def update(self, content: str, force: bool = False):
+    now = time.time()
+    if not force and now - self._last_edit < PROGRESS_INTERVAL:
+      return
+    self._last_edit = now
+    try:
+      if self.message is None:
+        self.message = await self.channel.send(content)
+      else:
+        await self.message.edit(content=content)
+    except discord.HTTPException:
+      # Progress reports are best effort; the batch itself carries on.
+      pass
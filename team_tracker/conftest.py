@@ -0,0 +1,51 @@
+"""Fixtures shared by the team tracker's tests."""
+
+import pytest
+import pytest_asyncio
+from redbot.core import data_manager
+
+from .fake_discord import FakeBot, FakeGuild, use_data_path
+from .fake_server import FakeHuntServer
+from .hunt_client import HuntClient
+
+
+@pytest_asyncio.fixture
+async def server():
+  """A started FakeHuntServer with two teams and three registered users."""
+  server = FakeHuntServer(secret='hunter2')
+  server.add_team(7, 'Team Seven', 'seven')
+  server.add_team(8, 'Team Eight', 'eight')
+  server.register('aaaa', 7)
+  server.register('bbbb', 7)
+  server.register('cccc', 8)
+  await server.start()
+  yield server
+  await server.stop()
+
+
+@pytest_asyncio.fixture
+async def client():
+  client = HuntClient()
+  yield client
+  await client.close()
+
+
+@pytest.fixture
+def guild():
+  return FakeGuild('Test Hunt', api_latency=0.0)
+
+
+@pytest_asyncio.fixture
+async def tracker(tmp_path, server, guild):
+  """A TeamTracker, with Config in a temporary directory, talking to `server`."""
+  basic_config = data_manager.basic_config
+  use_data_path(tmp_path)
+  from .team_tracker import TeamTracker
+
+  tracker = TeamTracker(FakeBot(guild))
+  await tracker.initialize_internals()
+  await tracker.config.server_url.set(server.base_url)
+  await tracker.config.secret.set('hunter2')
+  yield tracker
+  await tracker._shutdown()
+  data_manager.basic_config = basic_config
@@ -0,0 +1,125 @@
+"""Persistent digest -> user ID index, kept as an append-only log."""
+
+import logging
+import os
+import pathlib
+from typing import Dict, Iterable, List, Optional
+
+
+log = logging.getLogger('red.eliza.team_tracker.digest_index')
+
+LOG_NAME = 'undigest.log'
+MIN_COMPACT_LINES = 1000  # log lines below which compaction is never worth it
+
+
+class DigestIndex(object):
+  """Maps user digests back to user IDs.
+
+  The whole index lives in memory. Changes are persisted by appending one line
+  per change to a log file in the cog's data directory, `+ <digest> <user_id>`
+  for an addition and `- <digest>` for a removal, so that adding or removing an
+  entry costs O(1) no matter how large the index is. Loading replays the log.
+  Once the log holds more than twice as many lines as the index has entries
+  (and at least MIN_COMPACT_LINES), it is compacted: rewritten to contain only
+  the live entries, and atomically swapped into place.
+  """
+
+  def __init__(self, directory: pathlib.Path):
+    self.path = pathlib.Path(directory) / LOG_NAME
+    self.undigest = {}  # digest -> user_id
+    self._log_lines = 0
+    self._file = None
+
+  def __contains__(self, hashh):
+    return hashh in self.undigest
+
+  def __len__(self):
+    return len(self.undigest)
+
+  def load(self, legacy: Dict[str, int] = None):
+    """Reads the index from its log.
+
+    If there is no log yet, the index is instead seeded from `legacy` (the
+    contents of the old `undigest` Config value) and a log is written for it."""
+    self.close()
+    self.undigest = {}
+    self._log_lines = 0
+    if self.path.exists():
+      with self.path.open('r', encoding='utf-8') as f:
+        clean = all([self._replay(line) for line in f])
+      if not clean:
+        self.compact()
+    elif legacy:
+      self.undigest = {hashh: int(user_id) for hashh, user_id in legacy.items()}
+      self.compact()
+    self._maybe_compact()
+
+  def get(self, hashh: str) -> Optional[int]:
+    return self.undigest.get(hashh, None)
+
+  def get_many(self, hashes: Iterable[str]) -> List[Optional[int]]:
+    return [self.undigest.get(hashh, None) for hashh in hashes]
+
+  def add(self, hashh: str, user_id: int):
+    if self.undigest.get(hashh, None) == user_id:
+      return
+    self.undigest[hashh] = user_id
+    self._append(f'+ {hashh} {user_id}\n')
+
+  def remove(self, hashh: str):
+    if hashh not in self.undigest:
+      return
+    del self.undigest[hashh]
+    self._append(f'- {hashh}\n')
+
+  def clear(self):
+    self.undigest = {}
+    self.compact()
+
+  def compact(self):
+    """Rewrites the log to hold exactly the live entries."""
+    self.close()
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = self.path.with_suffix('.tmp')
+    with temp_path.open('w', encoding='utf-8') as f:
+      for hashh, user_id in self.undigest.items():
+        f.write(f'+ {hashh} {user_id}\n')
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temp_path, self.path)
+    self._log_lines = len(self.undigest)
+    log.debug(f'Compacted digest log to {self._log_lines} entries.')
+
+  def close(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+  def _replay(self, line: str) -> bool:
+    """Applies one log line, returning whether it was well formed."""
+    parts = line.split()
+    self._log_lines += 1
+    if line.endswith('\n'):
+      if len(parts) == 3 and parts[0] == '+' and parts[2].isdigit():
+        self.undigest[parts[1]] = int(parts[2])
+        return True
+      if len(parts) == 2 and parts[0] == '-':
+        self.undigest.pop(parts[1], None)
+        return True
+    # Most likely a write torn by a crash; compacting drops it
+    log.warning(f'Skipping malformed digest log line {line!r}')
+    return False
+
+  def _append(self, line: str):
+    if self._file is None:
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+      self._file = self.path.open('a', encoding='utf-8')
+    self._file.write(line)
+    self._file.flush()
+    self._log_lines += 1
+    self._maybe_compact()
+
+  def _maybe_compact(self):
+    if (self._log_lines >= MIN_COMPACT_LINES
+        and self._log_lines > 2 * len(self.undigest)):
+      self.compact()
@@ -0,0 +1,94 @@
+"""Rate-limited dispatch of direct messages, with batched failure reports."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+import discord
+
+
+log = logging.getLogger('red.eliza.team_tracker.dispatch')
+
+DM_RATE = 4.0  # direct messages started per second, at most
+DM_WORKERS = 4  # direct messages in flight at once
+
+Failure = Tuple[discord.User, str, Exception]  # (user, note, error)
+
+
+class RateLimiter(object):
+  """Spaces out callers of `wait()` to at most `rate` per second."""
+
+  def __init__(self, rate: float):
+    self.interval = 1.0 / rate
+    self._next = 0.0
+    self._lock = asyncio.Lock()
+
+  async def wait(self):
+    async with self._lock:
+      now = time.monotonic()
+      if self._next > now:
+        await asyncio.sleep(self._next - now)
+        now = self._next
+      self._next = now + self.interval
+
+
+class DMDispatcher(object):
+  """A queue of direct messages, sent by a pool of workers under a rate limit.
+
+  Each queued message carries a `note` (e.g. the registration URL in it) to
+  show an admin if the message can't be delivered. Rather than reporting each
+  failure as it happens, failures are collected, and `report` is called once
+  with all of them whenever the queue empties -- so a mass mailing produces
+  one admin report, not one per recipient."""
+
+  def __init__(self, report: Callable[[List[Failure]], Awaitable[None]],
+               rate: float = DM_RATE, workers: int = DM_WORKERS):
+    self.report = report
+    self.workers = workers
+    self._limiter = RateLimiter(rate)
+    self._queue = asyncio.Queue()
+    self._failures = []
+    self._unfinished = 0  # queued or being sent
+    self._tasks = []
+
+  def __len__(self):
+    return self._unfinished
+
+  def start(self):
+    self._tasks = [asyncio.ensure_future(self._work())
+                   for i in range(self.workers)]
+
+  def stop(self):
+    for task in self._tasks:
+      task.cancel()
+    self._tasks = []
+
+  def put(self, user: discord.User, content: str, note: str = ''):
+    self._unfinished += 1
+    self._queue.put_nowait((user, content, note))
+
+  async def join(self):
+    """Waits until every queued message has been sent or has failed."""
+    await self._queue.join()
+
+  async def _work(self):
+    while True:
+      user, content, note = await self._queue.get()
+      try:
+        await self._limiter.wait()
+        await user.send(content)
+      except discord.HTTPException as e:
+        self._failures.append((user, note, e))
+      except Exception as e:
+        log.exception(f'Unexpected error sending a DM to {user}')
+        self._failures.append((user, note, e))
+      finally:
+        self._unfinished -= 1
+        self._queue.task_done()
+      if not self._unfinished and self._failures:
+        failures, self._failures = self._failures, []
+        try:
+          await self.report(failures)
+        except Exception:
+          log.exception(f'Could not report {len(failures)} failed DMs')
@@ -0,0 +1,256 @@
+"""Stand-ins for Discord and Red, for tests and benchmarks.
+
+An in-memory guild, its members, roles and channels, and a bot holding just
+the parts of Red that TeamTracker uses. Discord API calls made through them
+take `api_latency` seconds each and are counted, so that tests can check how
+many calls the cog makes and benchmarks can measure how well it overlaps
+them.
+
+Red's Config and cog_data_path read their location from Red's global basic
+config; `use_data_path` points it at a (temporary) directory.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import pathlib
+
+from redbot.core import data_manager
+
+
+## Discord stand-ins
+
+_ids = itertools.count(10 ** 17)
+
+
+class FakeRole(object):
+
+  def __init__(self, name: str):
+    self.id = next(_ids)
+    self.name = name
+
+
+class FakeUser(object):
+
+  def __init__(self, name: str):
+    self.id = next(_ids)
+    self.name = name
+    self.discriminator = '0001'
+    self.display_name = name
+    self.bot = False
+
+
+class FakeMember(object):
+
+  def __init__(self, user: FakeUser, guild: 'FakeGuild'):
+    self._user = user
+    self.guild = guild
+    self.roles = []
+
+  def __getattr__(self, attr):
+    return getattr(self._user, attr)
+
+  def __hash__(self):
+    return hash(self._user.id)
+
+  def __eq__(self, other):
+    return getattr(other, 'id', None) == self.id
+
+  async def add_roles(self, *roles, reason=None):
+    await self.guild.api_call()
+    self.roles.extend(role for role in roles if role not in self.roles)
+
+  async def remove_roles(self, *roles, reason=None):
+    await self.guild.api_call()
+    self.roles = [role for role in self.roles if role not in roles]
+
+
+class FakeChannel(object):
+
+  def __init__(self, name: str, guild: 'FakeGuild', overwrites: dict = None,
+               category: 'FakeCategory' = None):
+    self.id = next(_ids)
+    self.name = name
+    self.guild = guild
+    self.category = category
+    self.overwrites = dict(overwrites or {})
+    self.mention = f'#{name}'
+    self.messages = []
+
+  async def edit(self, overwrites: dict = None, reason: str = None):
+    await self.guild.api_call()
+    if overwrites is not None:
+      self.overwrites = dict(overwrites)
+
+  async def set_permissions(self, target, overwrite=None, reason: str = None):
+    await self.guild.api_call()
+    self.overwrites[target] = overwrite
+
+  async def send(self, content: str = None, **kwargs):
+    self.messages.append(content)
+    return FakeMessage(content)
+
+
+class FakeCategory(FakeChannel):
+
+  def __init__(self, name: str, guild: 'FakeGuild'):
+    super().__init__(name, guild)
+    self.channels = []
+
+  async def create_text_channel(self, name: str, overwrites: dict = None,
+                                reason: str = None):
+    return await self._create(name, overwrites)
+
+  async def create_voice_channel(self, name: str, overwrites: dict = None,
+                                 reason: str = None):
+    return await self._create(name, overwrites)
+
+  async def _create(self, name, overwrites):
+    await self.guild.api_call()
+    channel = FakeChannel(name, self.guild, overwrites, category=self)
+    self.channels.append(channel)
+    self.guild.channels[channel.id] = channel
+    return channel
+
+
+class FakeMessage(object):
+
+  def __init__(self, content: str):
+    self.content = content
+
+  async def edit(self, content: str = None, **kwargs):
+    self.content = content
+
+
+class FakeGuild(object):
+
+  def __init__(self, name: str, api_latency: float):
+    self.id = next(_ids)
+    self.name = name
+    self.api_latency = api_latency
+    self.api_calls = 0
+    self.default_role = FakeRole('@everyone')
+    self.roles = {self.default_role.id: self.default_role}
+    self.member_map = {}  # user_id -> FakeMember
+    self.channels = {}  # channel_id -> FakeChannel
+
+  async def api_call(self):
+    self.api_calls += 1
+    await asyncio.sleep(self.api_latency)
+
+  @property
+  def members(self):
+    return list(self.member_map.values())
+
+  def add_member(self, user: FakeUser) -> FakeMember:
+    member = self.member_map[user.id] = FakeMember(user, self)
+    return member
+
+  def get_member(self, user_id: int):
+    return self.member_map.get(user_id, None)
+
+  def get_role(self, role_id: int):
+    return self.roles.get(role_id, None)
+
+  def get_channel(self, channel_id: int):
+    return self.channels.get(channel_id, None)
+
+  async def fetch_roles(self):
+    await self.api_call()
+    return list(self.roles.values())
+
+  async def create_role(self, name: str, **kwargs):
+    await self.api_call()
+    role = FakeRole(name)
+    self.roles[role.id] = role
+    return role
+
+  async def create_category(self, name: str, reason: str = None):
+    await self.api_call()
+    category = FakeCategory(name, self)
+    self.channels[category.id] = category
+    return category
+
+
+class FakeGuildSettings(object):
+
+  async def mod_role(self):
+    return []
+
+
+class FakeCoreConfig(object):
+
+  def guild(self, guild):
+    return FakeGuildSettings()
+
+
+class FakePrefixCache(object):
+
+  async def get_prefixes(self, guild=None):
+    return ['!']
+
+
+class FakeBot(object):
+  """The parts of Red that TeamTracker uses, backed by in-memory objects."""
+
+  def __init__(self, guild: FakeGuild):
+    self.user = FakeUser('eliza')
+    self.guild = guild
+    self.users = {}
+    self.loop = asyncio.get_event_loop()
+    self._config = FakeCoreConfig()
+    self._prefix_cache = FakePrefixCache()
+    guild.add_member(self.user)
+
+  def add_user(self, user: FakeUser):
+    self.users[user.id] = user
+
+  def add_listener(self, func, name=None):
+    pass
+
+  def get_user(self, user_id: int):
+    return self.users.get(user_id, None)
+
+  async def fetch_user(self, user_id: int):
+    return self.users[user_id]
+
+  def get_channel(self, channel_id: int):
+    return self.guild.get_channel(channel_id)
+
+  async def fetch_channel(self, channel_id: int):
+    return self.guild.get_channel(channel_id)
+
+  def get_guild(self, guild_id: int):
+    return self.guild if guild_id == self.guild.id else None
+
+  async def fetch_guild(self, guild_id: int):
+    return self.get_guild(guild_id)
+
+
+class FakeContext(object):
+
+  def __init__(self, bot: FakeBot, guild: FakeGuild):
+    self.bot = bot
+    self.guild = guild
+    self.author = bot.user
+    self.channel = FakeChannel('bench', guild)
+    self.clean_prefix = '!'
+
+  async def send(self, content: str = None, **kwargs):
+    return await self.channel.send(content, **kwargs)
+
+  @contextlib.asynccontextmanager
+  async def typing(self):
+    yield
+
+
+## Red
+
+def use_data_path(data_path: pathlib.Path):
+  """Points Red's Config and cog_data_path at a JSON-backed instance there."""
+  data_manager.basic_config = dict(data_manager.basic_config_default)
+  data_manager.basic_config.update({
+      'DATA_PATH': str(data_path),
+      'STORAGE_TYPE': 'JSON',
+      'STORAGE_DETAILS': {},
+  })
@@ -0,0 +1,128 @@
+"""A local stand-in for the hunt server, for tests and benchmarks.
+
+Implements the lookup/removal endpoints the cog talks to, including the
+batched lookup endpoint, against an in-memory registration table:
+
+    server = FakeHuntServer(secret='hunter2')
+    server.add_team(7, 'Team Seven', 'seven')
+    server.register(digest, 7)
+    base_url = await server.start()
+    ...
+    await server.stop()
+"""
+
+import collections
+
+from aiohttp import web
+
+
+class FakeHuntServer(object):
+  """In-memory hunt server speaking the same protocol as the real one."""
+
+  def __init__(self, secret: str = None):
+    self.secret = secret
+    self.teams = {}  # team_id -> (display_name, username)
+    self.affiliations = {}  # digest -> team_id
+    self.rosters = collections.defaultdict(set)  # team_id -> set of digests
+    self.requests = collections.Counter()  # endpoint -> number of requests seen
+    # If set, the batch endpoint fails with this status, like an older server
+    self.bulk_status = None
+    self.base_url = None
+    self._runner = None
+
+    self.app = web.Application()
+    self.app.router.add_get('/lookup_discord', self.lookup)
+    self.app.router.add_get('/remove_discord', self.remove)
+    self.app.router.add_post('/lookup_discord_batch', self.lookup_batch)
+
+  ## Registration table
+
+  def add_team(self, team_id: int, display_name: str, username: str):
+    self.teams[team_id] = (display_name, username)
+
+  def register(self, digest: str, team_id: int):
+    self.unregister(digest)
+    self.affiliations[digest] = team_id
+    self.rosters[team_id].add(digest)
+
+  def unregister(self, digest: str):
+    team_id = self.affiliations.pop(digest, None)
+    if team_id is not None:
+      self.rosters[team_id].discard(digest)
+
+  def members(self, team_id: int):
+    return sorted(self.rosters.get(team_id, ()))
+
+  ## Lifecycle
+
+  async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+    """Start serving, and return the base URL to use as the cog's server_url."""
+    self._runner = web.AppRunner(self.app)
+    await self._runner.setup()
+    site = web.TCPSite(self._runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    self.base_url = f'http://{host}:{port}/'
+    return self.base_url
+
+  async def stop(self):
+    if self._runner is not None:
+      await self._runner.cleanup()
+      self._runner = None
+
+  ## Payloads
+
+  def _team_payload(self, team_id: int):
+    display_name, username = self.teams[team_id]
+    return [team_id, None, display_name, username]
+
+  def _user_result(self, digest: str) -> dict:
+    team_id = self.affiliations.get(digest, None)
+    if team_id is None or team_id not in self.teams:
+      return {'success': False}
+    return {'success': True, 'team': self._team_payload(team_id)}
+
+  def _team_result(self, team_id: int) -> dict:
+    members = self.members(team_id)
+    if team_id not in self.teams or not members:
+      return {'success': False}
+    return {'success': True,
+            'team': self._team_payload(team_id),
+            'user_ids': members}
+
+  def _authorized(self, auth) -> bool:
+    return self.secret is None or auth == self.secret
+
+  ## Handlers
+
+  async def lookup(self, request: web.Request) -> web.Response:
+    self.requests['lookup_discord'] += 1
+    if not self._authorized(request.query.get('auth')):
+      return web.Response(status=403, text='bad auth')
+    if 'team_id' in request.query:
+      return web.json_response(self._team_result(int(request.query['team_id'])))
+    return web.json_response(self._user_result(request.query.get('user_id')))
+
+  async def remove(self, request: web.Request) -> web.Response:
+    self.requests['remove_discord'] += 1
+    if not self._authorized(request.query.get('auth')):
+      return web.Response(status=403, text='bad auth')
+    digest = request.query.get('user_id')
+    success = digest in self.affiliations
+    self.unregister(digest)
+    return web.json_response({'success': success})
+
+  async def lookup_batch(self, request: web.Request) -> web.Response:
+    self.requests['lookup_discord_batch'] += 1
+    if self.bulk_status is not None:
+      return web.Response(status=self.bulk_status, text='no bulk lookups here')
+    payload = await request.json()
+    if not self._authorized(payload.get('auth')):
+      return web.Response(status=403, text='bad auth')
+    return web.json_response({
+        'success': True,
+        'teams': {str(team_id): self._team_result(int(team_id))
+                  for team_id in payload.get('team_ids', [])},
+        'users': {digest: self._user_result(digest)
+                  for digest in payload.get('user_ids', [])},
+    })
@@ -0,0 +1,100 @@
+"""Async HTTP client for talking to the hunt server."""
+
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+from .metrics import Metrics
+
+
+log = logging.getLogger('red.eliza.team_tracker.hunt_client')
+
+DEFAULT_MAX_CONNECTIONS = 16  # simultaneous requests to the hunt server
+DEFAULT_TIMEOUT = 15.0  # seconds, for an entire request/response round trip
+DEFAULT_KEEPALIVE = 30.0  # seconds an idle pooled connection is kept open
+
+
+class HuntServerError(Exception):
+  """The hunt server could not be reached, or did not respond in time."""
+  pass
+
+
+class HuntResponse(object):
+  """The parts of a hunt server response that the cog cares about.
+
+  This deliberately mirrors the small slice of `requests.Response` that the cog
+  used before, so that call sites read the same way."""
+
+  def __init__(self, status_code: int, text: str, url: str):
+    self.status_code = status_code
+    self.text = text
+    self.url = url
+
+  def json(self):
+    return json.loads(self.text)
+
+
+class HuntClient(object):
+  """Pooled, concurrency-limited HTTP client for the hunt server.
+
+  Every request made by the cog goes through a single aiohttp session, and
+  hence a single pool of keep-alive connections. At most `max_connections`
+  requests are in flight at once; the rest wait their turn without blocking the
+  event loop, so a large refresh overlaps its network waits instead of
+  serializing them.
+
+  Each request's latency and outcome is recorded in `metrics`, labelled by the
+  endpoint (the last component of the URL path)."""
+
+  def __init__(self,
+               max_connections: int = DEFAULT_MAX_CONNECTIONS,
+               timeout: float = DEFAULT_TIMEOUT,
+               keepalive: float = DEFAULT_KEEPALIVE,
+               metrics: Metrics = None):
+    self.max_connections = max_connections
+    self.metrics = metrics or Metrics()
+    self.timeout = aiohttp.ClientTimeout(total=timeout)
+    self.keepalive = keepalive
+    self._semaphore = asyncio.Semaphore(max_connections)
+    self._session = None
+
+  def _get_session(self) -> aiohttp.ClientSession:
+    # The session is created lazily so that it is bound to the running loop.
+    if self._session is None or self._session.closed:
+      connector = aiohttp.TCPConnector(
+          limit=self.max_connections, keepalive_timeout=self.keepalive)
+      self._session = aiohttp.ClientSession(
+          connector=connector, timeout=self.timeout)
+    return self._session
+
+  async def get(self, url: str, params: dict = None) -> HuntResponse:
+    # aiohttp refuses None-valued query parameters, where requests dropped them
+    params = {key: value for key, value in (params or {}).items()
+              if value is not None}
+    return await self._request('GET', url, params=params)
+
+  async def post_json(self, url: str, payload: dict) -> HuntResponse:
+    return await self._request('POST', url, json=payload)
+
+  async def _request(self, method: str, url: str, **kwargs) -> HuntResponse:
+    endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+    async with self._semaphore:
+      try:
+        with self.metrics.timer('hunt_request_seconds', endpoint=endpoint):
+          async with self._get_session().request(method, url, **kwargs) as response:
+            text = await response.text()
+        self.metrics.inc('hunt_requests_total', endpoint=endpoint,
+                         status=response.status)
+        return HuntResponse(response.status, text, str(response.url))
+      except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        self.metrics.inc('hunt_requests_total', endpoint=endpoint,
+                         status='error')
+        log.warning(f'{method} request to {url} failed: {exc!r}')
+        raise HuntServerError(f'Request to {url} failed: {exc!r}') from exc
+
+  async def close(self):
+    if self._session is not None and not self._session.closed:
+      await self._session.close()
+    self._session = None
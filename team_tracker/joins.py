@@ -0,0 +1,59 @@
+"""Queued, concurrent handling of members joining guilds."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+import discord
+
+
+log = logging.getLogger('red.eliza.team_tracker.joins')
+
+JOIN_WORKERS = 8  # joins handled at once
+
+
+class JoinQueue(object):
+  """Member joins waiting to be handled, and the pool of workers handling them.
+
+  The join listener only has to enqueue a member, so a burst of joins at the
+  start of an event never holds up the gateway; `workers` worker tasks then
+  handle up to that many joins at once. The handler is called with the member
+  and the `time.monotonic()` at which they were queued."""
+
+  def __init__(self,
+               handler: Callable[[discord.Member, float], Awaitable[None]],
+               workers: int = JOIN_WORKERS):
+    self.handler = handler
+    self.workers = workers
+    self._queue = asyncio.Queue()
+    self._tasks = []
+
+  def __len__(self):
+    return self._queue.qsize()
+
+  def start(self):
+    self._tasks = [asyncio.ensure_future(self._work())
+                   for i in range(self.workers)]
+
+  def stop(self):
+    for task in self._tasks:
+      task.cancel()
+    self._tasks = []
+
+  def put(self, member: discord.Member):
+    self._queue.put_nowait((member, time.monotonic()))
+
+  async def join(self):
+    """Waits until every queued join has been handled."""
+    await self._queue.join()
+
+  async def _work(self):
+    while True:
+      member, queued = await self._queue.get()
+      try:
+        await self.handler(member, queued)
+      except Exception:
+        log.exception(f'Failed to handle {member} joining {member.guild}')
+      finally:
+        self._queue.task_done()
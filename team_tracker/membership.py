@@ -0,0 +1,80 @@
+"""Indexes of team membership by user, and of guild membership by guild."""
+
+import collections
+from typing import Dict, Iterable, List, Optional
+
+import discord
+
+
+class MembershipIndex(object):
+  """Reverse indexes over team and guild membership.
+
+  `user_teams` maps the ID of every user on some team to that team's ID; each
+  TeamData holds the set of its own members' IDs. `guild_members` maps guild ID
+  to the set of IDs of that guild's members. It is built from the guild's
+  member cache the first time a guild is asked about, and kept up to date from
+  member join and leave events thereafter.
+
+  Together these let the registered members of a guild be found, grouped by
+  team, in time proportional to the guild's size rather than to the number of
+  registered users across all teams.
+  """
+
+  def __init__(self):
+    self.user_teams = {}  # user_id -> team_id
+    self.guild_members = {}  # guild_id -> set of user_ids
+
+  def clear(self):
+    self.user_teams = {}
+    self.guild_members = {}
+
+  ## Team membership
+
+  def add(self, user_id: int, team_id: int):
+    self.user_teams[user_id] = team_id
+
+  def remove(self, user_id: int, team_id: int = None):
+    if team_id is None or self.user_teams.get(user_id, None) == team_id:
+      self.user_teams.pop(user_id, None)
+
+  def team_of(self, user_id: int) -> Optional[int]:
+    return self.user_teams.get(user_id, None)
+
+  ## Guild membership
+
+  def member_ids(self, guild: discord.Guild) -> set:
+    if guild.id not in self.guild_members:
+      self.guild_members[guild.id] = set(member.id for member in guild.members)
+    return self.guild_members[guild.id]
+
+  def member_joined(self, member: discord.Member):
+    if member.guild.id in self.guild_members:
+      self.guild_members[member.guild.id].add(member.id)
+
+  def member_left(self, member: discord.Member):
+    if member.guild.id in self.guild_members:
+      self.guild_members[member.guild.id].discard(member.id)
+
+  def forget_guild(self, guild_id: int):
+    self.guild_members.pop(guild_id, None)
+
+  ## Both
+
+  def members_by_team(self, guild: discord.Guild) -> Dict[int, List[discord.Member]]:
+    """Maps team ID -> list of that team's members in `guild`, for teams with any."""
+    teams = collections.defaultdict(list)
+    for user_id in self.member_ids(guild):
+      team_id = self.user_teams.get(user_id, None)
+      if team_id is None:
+        continue
+      member = guild.get_member(user_id)
+      if member is not None:
+        teams[team_id].append(member)
+    return teams
+
+  def load(self, teams: Iterable):
+    """Rebuilds the user -> team index from TeamData objects."""
+    self.user_teams = {}
+    for team in teams:
+      for user_id in team.user_ids:
+        self.user_teams[user_id] = team.team_id
@@ -0,0 +1,149 @@
+"""In-process metrics for the team refresh pipeline."""
+
+import bisect
+import contextlib
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+  return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+  labels = labels + extra
+  if not labels:
+    return ''
+  return '{%s}' % ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+class Histogram(object):
+  """Counts of observations falling in each of a fixed set of buckets."""
+
+  def __init__(self, buckets=LATENCY_BUCKETS):
+    self.buckets = tuple(buckets)
+    self.counts = [0] * (len(self.buckets) + 1)  # the last is for > max bucket
+    self.count = 0
+    self.sum = 0.0
+
+  def observe(self, value: float):
+    self.counts[bisect.bisect_left(self.buckets, value)] += 1
+    self.count += 1
+    self.sum += value
+
+  def mean(self) -> float:
+    return self.sum / self.count if self.count else 0.0
+
+  def quantile(self, q: float) -> float:
+    """An upper bound on the `q` quantile: the bound of the bucket it falls in."""
+    if not self.count:
+      return 0.0
+    rank, seen = q * self.count, 0
+    for bound, count in zip(self.buckets, self.counts):
+      seen += count
+      if seen >= rank:
+        return bound
+    return float('inf')
+
+
+class Metrics(object):
+  """Counters, latency histograms and gauges, keyed by name and labels.
+
+  Counters and histograms are updated as things happen; gauges are functions
+  registered once and sampled whenever the metrics are read. `export()`
+  renders everything in the Prometheus text format, and `summary()` as lines
+  for a Discord message."""
+
+  def __init__(self):
+    self.started = time.time()
+    self.counters = {}  # (name, labels) -> int
+    self.histograms = {}  # (name, labels) -> Histogram
+    self.gauges = {}  # name -> function returning a number
+
+  def inc(self, name: str, amount: int = 1, **labels):
+    key = (name, _labels(labels))
+    self.counters[key] = self.counters.get(key, 0) + amount
+
+  def observe(self, name: str, value: float, **labels):
+    key = (name, _labels(labels))
+    if key not in self.histograms:
+      self.histograms[key] = Histogram()
+    self.histograms[key].observe(value)
+
+  @contextlib.contextmanager
+  def timer(self, name: str, **labels):
+    """Observes how long the body takes, in seconds, under `name`."""
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(name, time.perf_counter() - start, **labels)
+
+  def gauge(self, name: str, func: Callable[[], float]):
+    self.gauges[name] = func
+
+  def counter(self, name: str, **labels) -> int:
+    return self.counters.get((name, _labels(labels)), 0)
+
+  def reset(self):
+    self.started = time.time()
+    self.counters = {}
+    self.histograms = {}
+
+  def _sample_gauges(self) -> Dict[str, float]:
+    values = {}
+    for name, func in self.gauges.items():
+      try:
+        values[name] = func()
+      except Exception:
+        # A gauge over state that isn't set up yet (or any more) reads as 0
+        values[name] = 0
+    return values
+
+  def export(self) -> str:
+    lines = []
+    for (name, labels), value in sorted(self.counters.items()):
+      lines.append(f'{name}{_format_labels(labels)} {value}')
+    for (name, labels), histogram in sorted(self.histograms.items(),
+                                            key=lambda item: item[0]):
+      cumulative = 0
+      for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket'
+                     f'{_format_labels(labels, (("le", f"{bound:g}"),))}'
+                     f' {cumulative}')
+      lines.append(f'{name}_bucket{_format_labels(labels, (("le", "+Inf"),))}'
+                   f' {histogram.count}')
+      lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum:.6f}')
+      lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+    for name, value in sorted(self._sample_gauges().items()):
+      lines.append(f'{name} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+  def summary(self) -> List[str]:
+    lines = [f'Collecting for {time.time() - self.started:.0f} seconds.']
+    if self.histograms:
+      lines.append('**Latencies** (count, mean, ~p50, ~p99):')
+    for (name, labels), histogram in sorted(self.histograms.items(),
+                                            key=lambda item: item[0]):
+      lines.append(
+          f'    {name}{_format_labels(labels)}: {histogram.count},'
+          f' {histogram.mean() * 1000:.0f}ms,'
+          f' <{histogram.quantile(.5) * 1000:g}ms,'
+          f' <{histogram.quantile(.99) * 1000:g}ms')
+    if self.counters:
+      lines.append('**Counters**:')
+    for (name, labels), value in sorted(self.counters.items()):
+      lines.append(f'    {name}{_format_labels(labels)}: {value}')
+    gauges = self._sample_gauges()
+    if gauges:
+      lines.append('**Gauges**:')
+    for name, value in sorted(gauges.items()):
+      lines.append(f'    {name}: {value:g}')
+    return lines
@@ -0,0 +1,101 @@
+"""Cached rendering and lazy pagination for team listings."""
+
+import collections.abc
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+TABLE_PAGE_LENGTH = 1500  # characters of table rows after which a page breaks
+
+
+class TablePages(collections.abc.Sequence):
+  """Table rows split into code-block pages, each rendered only when viewed.
+
+  Page breaks fall where `paginate_table` put them: after the row that takes
+  a page past TABLE_PAGE_LENGTH characters. Finding them only sums row
+  lengths, so a menu over thousands of rows (see `lazy_menu`) joins just the
+  page on screen."""
+
+  def __init__(self, lines: List[str]):
+    self.lines = lines
+    self._breaks = [0]
+    count = len('```') + 1
+    for idx, line in enumerate(lines):
+      count += len(line) + 1
+      if count > TABLE_PAGE_LENGTH and idx + 1 < len(lines):
+        self._breaks.append(idx + 1)
+        count = len('```') + 1
+    self._breaks.append(len(lines))
+
+  def __len__(self):
+    return len(self._breaks) - 1
+
+  def __getitem__(self, page):
+    if isinstance(page, slice):
+      return [self[idx] for idx in range(*page.indices(len(self)))]
+    if page < 0:
+      page += len(self)
+    if not 0 <= page < len(self):
+      raise IndexError(page)
+    start, end = self._breaks[page], self._breaks[page + 1]
+    return '\n'.join(['```'] + self.lines[start:end] + ['```'])
+
+
+class TeamViewCache(object):
+  """Rendered team listings, re-rendered only for teams that have changed.
+
+  A table view (one per guild and member count shown) keeps one rendered row
+  per team, built in full the first time the view is shown. After that,
+  `invalidate(team_id)` marks the team's row stale in every view, and the next
+  showing re-renders only the stale rows. Detail views (`team show`) are cached
+  whole, per team and guild, and dropped on invalidation.
+
+  Anything that changes what a team's row or details show -- its members,
+  which of them are in a guild, their names, or its channels -- must
+  invalidate it."""
+
+  def __init__(self):
+    self._rows = {}  # view key -> {team_id: row}
+    self._stale = {}  # view key -> set of team_ids
+    self._pages = {}  # view key -> TablePages, or absent if rows changed
+    self._details = {}  # (team_id, guild_id) -> list of pages
+
+  def clear(self):
+    self._rows, self._stale, self._pages, self._details = {}, {}, {}, {}
+
+  def invalidate(self, team_id: int):
+    for key, stale in self._stale.items():
+      stale.add(team_id)
+    self._details = {key: pages for key, pages in self._details.items()
+                     if key[0] != team_id}
+
+  def table(self, key: Hashable,
+            render_all: Callable[[], Dict[int, str]],
+            render: Callable[[int], Optional[str]]) -> TablePages:
+    """The pages of the table view `key`, ordered by team ID.
+
+    `render_all` renders every team's row, and `render` one team's row (or a
+    false value if the team should not be listed)."""
+    if key not in self._rows:
+      self._rows[key] = {team_id: row for team_id, row in render_all().items()
+                         if row}
+      self._stale[key] = set()
+    rows = self._rows[key]
+    if self._stale[key]:
+      for team_id in self._stale[key]:
+        row = render(team_id)
+        if row:
+          rows[team_id] = row
+        else:
+          rows.pop(team_id, None)
+      self._stale[key] = set()
+      self._pages.pop(key, None)
+    if key not in self._pages:
+      self._pages[key] = TablePages([rows[team_id] for team_id in sorted(rows)])
+    return self._pages[key]
+
+  def details(self, team_id: int, guild_id: Optional[int],
+              render: Callable[[], List[str]]) -> List[str]:
+    key = (team_id, guild_id)
+    if key not in self._details:
+      self._details[key] = render()
+    return self._details[key]
@@ -0,0 +1,139 @@
+"""Bulk application of team channel permission overwrites."""
+
+import asyncio
+import collections
+import contextlib
+import logging
+from typing import Dict, Iterable, Union
+
+import discord
+
+from .metrics import Metrics
+
+
+log = logging.getLogger('red.eliza.team_tracker.permissions')
+
+DEFAULT_MAX_EDITS = 4  # channel creations or edits in flight at once
+MAX_RETRIES = 3  # attempts beyond the first for a rate-limited edit
+
+Target = Union[discord.Role, discord.Member]
+
+
+class PermissionEngine(object):
+  """Applies complete permission overwrite maps to channels in single calls.
+
+  Setting one member's overwrite at a time costs a Discord API call per member,
+  and each of those calls counts against the same per-channel rate limit. The
+  engine instead computes a channel's final overwrites up front and sends them
+  all at once: with the create call for a new channel, or with one edit for an
+  existing one.
+
+  Member role changes go through the engine too, one call per member.
+
+  At most `max_edits` creations or edits are in flight at once; change it with
+  `set_max_edits`, which takes effect for calls already waiting. An edit that
+  is nevertheless rate limited waits out the interval Discord asks for (or, if
+  it doesn't say, a doubling backoff) and is retried, up to MAX_RETRIES times."""
+
+  def __init__(self, max_edits: int = DEFAULT_MAX_EDITS, metrics: Metrics = None):
+    self.max_edits = max_edits
+    self.metrics = metrics or Metrics()
+    self._in_flight = 0
+    self._slots = asyncio.Condition()
+    self._channel_locks = collections.defaultdict(asyncio.Lock)
+
+  async def set_max_edits(self, max_edits: int):
+    """Changes how many calls may be in flight at once.
+
+    Calls already in flight finish as they are; if there are now more of them
+    than `max_edits`, new calls wait until enough have finished."""
+    async with self._slots:
+      self.max_edits = max_edits
+      self._slots.notify_all()
+
+  @staticmethod
+  def merge(overwrites: Dict[Target, discord.PermissionOverwrite],
+            targets: Iterable[Target],
+            overwrite: discord.PermissionOverwrite) -> Dict[Target, discord.PermissionOverwrite]:
+    """Returns a copy of `overwrites` with `overwrite` set for every target."""
+    merged = dict(overwrites)
+    for target in targets:
+      if target is not None:
+        merged[target] = overwrite
+    return merged
+
+  async def create_category(self, guild: discord.Guild, name: str,
+                            reason: str = None):
+    return await self._call(guild.create_category, name, reason=reason)
+
+  async def add_roles(self, member: discord.Member, *roles: discord.Role,
+                      reason: str = None):
+    await self._call(member.add_roles, *roles, reason=reason)
+
+  async def remove_roles(self, member: discord.Member, *roles: discord.Role,
+                         reason: str = None):
+    await self._call(member.remove_roles, *roles, reason=reason)
+
+  async def create_text_channel(self, category: discord.CategoryChannel,
+                                name: str, overwrites, reason: str = None):
+    return await self._call(category.create_text_channel, name,
+                            overwrites=overwrites, reason=reason)
+
+  async def create_voice_channel(self, category: discord.CategoryChannel,
+                                 name: str, overwrites, reason: str = None):
+    return await self._call(category.create_voice_channel, name,
+                            overwrites=overwrites, reason=reason)
+
+  async def apply(self, channel: discord.abc.GuildChannel,
+                  targets: Iterable[Target],
+                  overwrite: discord.PermissionOverwrite,
+                  reason: str = None):
+    """Sets `overwrite` for all `targets` in `channel` with a single edit.
+
+    Edits to the same channel are serialized, and each reads the channel's
+    current overwrites only once it holds the channel, so that concurrent
+    applications to one channel don't undo each other."""
+    targets = [target for target in targets if target is not None]
+    if not targets:
+      return
+    async with self._channel_locks[channel.id]:
+      await self._call(self._edit, channel, targets, overwrite, reason)
+
+  async def _edit(self, channel, targets, overwrite, reason):
+    await channel.edit(overwrites=self.merge(channel.overwrites, targets, overwrite),
+                       reason=reason)
+
+  async def _call(self, func, *args, **kwargs):
+    call = func.__name__.lstrip('_')
+    async with self._slot():
+      for attempt in range(MAX_RETRIES + 1):
+        try:
+          with self.metrics.timer('discord_call_seconds', call=call):
+            return await func(*args, **kwargs)
+        except discord.HTTPException as e:
+          self.metrics.inc('discord_call_errors_total', call=call, status=e.status)
+          if e.status != 429 or attempt == MAX_RETRIES:
+            raise
+          await asyncio.sleep(self._retry_after(e, attempt))
+
+  @contextlib.asynccontextmanager
+  async def _slot(self):
+    async with self._slots:
+      await self._slots.wait_for(lambda: self._in_flight < self.max_edits)
+      self._in_flight += 1
+    try:
+      yield
+    finally:
+      async with self._slots:
+        self._in_flight -= 1
+        self._slots.notify()
+
+  @staticmethod
+  def _retry_after(e: discord.HTTPException, attempt: int) -> float:
+    backoff = 2.0 ** attempt
+    try:
+      delay = float(e.response.headers.get('Retry-After', backoff))
+    except (AttributeError, TypeError, ValueError):
+      delay = backoff
+    log.warning(f'Rate limited by Discord; retrying in {delay}s')
+    return delay
@@ -0,0 +1,147 @@
+"""Write-coalescing persistence for team and per-user Config data."""
+
+import asyncio
+import logging
+from typing import Callable
+
+from redbot.core import Config
+
+from .metrics import Metrics
+
+
+log = logging.getLogger('red.eliza.team_tracker.persistence')
+
+FLUSH_INTERVAL = 5.0  # seconds between routine flushes
+MAX_PENDING = 200  # dirty teams + users at which a flush happens immediately
+
+
+class WriteBuffer(object):
+  """Coalesces team and per-user Config writes into periodic bulk flushes.
+
+  A mass re-sync changes the same teams and user fields over and over, and
+  each change would otherwise be its own Config write. Instead, dirty teams
+  and user fields accumulate here, and only their latest values are written
+  out: all teams in one write, and all users in another. A flush happens
+  every FLUSH_INTERVAL seconds (driven by the cog), as soon as MAX_PENDING
+  teams and users are dirty, and when the cog unloads.
+
+  Until a change is flushed, Config still holds the old value, so user fields
+  which may be buffered must be read through `pending_user_field`, and
+  anything which must only happen once a change is saved can wait for it with
+  `when_flushed`.
+  """
+
+  MISSING = object()
+
+  def __init__(self, config: Config, max_pending: int = MAX_PENDING,
+               metrics: Metrics = None):
+    self.config = config
+    self.metrics = metrics or Metrics()
+    self.max_pending = max_pending
+    self._teams = {}  # team_id -> TeamData, serialized at flush time
+    self._users = {}  # user_id -> {field: value}
+    self._cleared_users = set()
+    # What is being written by a flush in progress; still visible to reads
+    self._flushing_users = {}
+    self._flushing_cleared = set()
+    self._callbacks = []
+    self._lock = asyncio.Lock()
+
+  def __len__(self):
+    return len(self._teams) + len(self._users) + len(self._cleared_users)
+
+  async def mark_team(self, team):
+    self._teams[team.team_id] = team
+    await self._maybe_flush()
+
+  async def set_user(self, user_id: int, **fields):
+    self._users.setdefault(user_id, {}).update(fields)
+    await self._maybe_flush()
+
+  async def clear_user(self, user_id: int):
+    self._users.pop(user_id, None)
+    self._cleared_users.add(user_id)
+    await self._maybe_flush()
+
+  def pending_user_field(self, user_id: int, field: str, default=MISSING):
+    """The buffered value of a user field, or `default` if nothing is buffered.
+
+    A user cleared since the last flush reads as having only default values."""
+    for users, cleared in ((self._users, self._cleared_users),
+                           (self._flushing_users, self._flushing_cleared)):
+      fields = users.get(user_id, {})
+      if field in fields:
+        return fields[field]
+      if user_id in cleared:
+        return self.config.defaults[Config.USER][field]
+    return default
+
+  def when_flushed(self, callback: Callable[[], None]):
+    """Calls `callback` once the next flush has saved everything buffered.
+
+    Register the callback before buffering the change it waits for, since
+    buffering can itself trigger a flush. While the callback runs,
+    `pending_user_field` still sees the values that flush saved."""
+    self._callbacks.append(callback)
+
+  def discard(self):
+    """Drops everything pending, e.g. because Config is about to be cleared."""
+    self._teams, self._users, self._cleared_users = {}, {}, set()
+    self._callbacks = []
+
+  async def flush(self):
+    async with self._lock:
+      teams, callbacks = self._teams, self._callbacks
+      self._flushing_users, self._flushing_cleared = self._users, self._cleared_users
+      self._teams, self._users, self._cleared_users = {}, {}, set()
+      self._callbacks = []
+      try:
+        if teams:
+          with self.metrics.timer('config_write_seconds', scope='teams'):
+            async with self.config.teams() as all_teams:
+              for team_id, team in teams.items():
+                all_teams[str(team_id)] = team.serialize()
+          self.metrics.inc('config_writes_total', scope='teams')
+          self.metrics.inc('config_records_written_total', len(teams),
+                           scope='teams')
+        if self._flushing_users or self._flushing_cleared:
+          with self.metrics.timer('config_write_seconds', scope='users'):
+            # Raw user data, without the per-user defaults merged in on top
+            async with self.config.custom(Config.USER)(default={}) as all_users:
+              # Clears go first, since a user can be cleared and then set again
+              for user_id in self._flushing_cleared:
+                all_users.pop(str(user_id), None)
+              for user_id, fields in self._flushing_users.items():
+                all_users.setdefault(str(user_id), {}).update(fields)
+          self.metrics.inc('config_writes_total', scope='users')
+          self.metrics.inc(
+              'config_records_written_total',
+              len(self._flushing_users) + len(self._flushing_cleared),
+              scope='users')
+        if teams or self._flushing_users or self._flushing_cleared:
+          log.debug(f'Flushed {len(teams)} teams and'
+                    f' {len(self._flushing_users) + len(self._flushing_cleared)}'
+                    ' users.')
+      except Exception:
+        self.metrics.inc('config_write_errors_total')
+        self._callbacks = callbacks + self._callbacks
+        # Put back anything not superseded in the meantime, to retry later
+        for team_id, team in teams.items():
+          self._teams.setdefault(team_id, team)
+        for user_id, fields in self._flushing_users.items():
+          if user_id not in self._cleared_users:
+            self._users[user_id] = {**fields, **self._users.get(user_id, {})}
+        self._cleared_users |= self._flushing_cleared
+        raise
+      else:
+        for callback in callbacks:
+          try:
+            callback()
+          except Exception:
+            log.exception('Error in a callback after flushing')
+      finally:
+        self._flushing_users, self._flushing_cleared = {}, set()
+
+  async def _maybe_flush(self):
+    if len(self) >= self.max_pending:
+      await self.flush()
@@ -0,0 +1,71 @@
+"""Planned, rate-limit-aware bulk changes to one role's members."""
+
+import asyncio
+import logging
+from typing import List
+
+import discord
+
+from .permissions import PermissionEngine
+
+
+log = logging.getLogger('red.eliza.team_tracker.roles')
+
+RETRY_ROUND_DELAY = 5.0  # seconds before failed changes get a second round
+
+
+class RolePlan(object):
+  """The members to gain and lose one role, and how applying that went.
+
+  A plan only ever lists members whose role actually needs to change, so it
+  doubles as a preview: `describe()` reports what applying it would do, and
+  `apply()` does it. Changes are made through a PermissionEngine, which
+  bounds how many are in flight and retries rate-limited ones. Changes which
+  still fail are retried once more, as a group, after RETRY_ROUND_DELAY
+  seconds; whatever fails then is left in `failed`."""
+
+  def __init__(self, role: discord.Role, reason: str = None):
+    self.role = role
+    self.reason = reason
+    self.to_add = []  # list of Members
+    self.to_remove = []  # list of Members
+    self.failed = []  # list of (Member, 'add' or 'remove', exception)
+
+  def __len__(self):
+    return len(self.to_add) + len(self.to_remove)
+
+  def add(self, member: discord.Member):
+    self.to_add.append(member)
+
+  def remove(self, member: discord.Member):
+    self.to_remove.append(member)
+
+  def describe(self) -> str:
+    """The size of the change, e.g. '+3 and -1', for the caller to qualify."""
+    return f'+{len(self.to_add)} and -{len(self.to_remove)}'
+
+  async def apply(self, engine: PermissionEngine):
+    changes = ([(member, 'add') for member in self.to_add] +
+               [(member, 'remove') for member in self.to_remove])
+    failed = await self._apply(engine, changes)
+    if failed:
+      log.warning(f'{len(failed)} role changes failed; retrying in'
+                  f' {RETRY_ROUND_DELAY}s')
+      await asyncio.sleep(RETRY_ROUND_DELAY)
+      failed = await self._apply(
+          engine, [(member, action) for member, action, e in failed])
+    self.failed = failed
+
+  async def _apply(self, engine: PermissionEngine, changes: List[tuple]):
+    async def change(member, action):
+      if action == 'add':
+        await engine.add_roles(member, self.role, reason=self.reason)
+      else:
+        await engine.remove_roles(member, self.role, reason=self.reason)
+
+    results = await asyncio.gather(
+        *[change(member, action) for member, action in changes],
+        return_exceptions=True)
+    return [(member, action, result)
+            for (member, action), result in zip(changes, results)
+            if isinstance(result, Exception)]
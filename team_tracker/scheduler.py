@@ -0,0 +1,92 @@
+"""Due-time scheduling for automated team and user refreshes."""
+
+import heapq
+import itertools
+import random
+from typing import Hashable, List, Optional, Tuple
+
+
+class RefreshScheduler(object):
+  """Priority queue of refresh jobs, keyed on when each job is next due.
+
+  The internal representation is a heap of [due, count, key] entries as in
+  lfg's GuildQueue, where due is a time.time() timestamp, count is unique
+  across entries, and key identifies the job (a team or user ID). Each key is
+  scheduled at most once; rescheduling a key marks its old entry as removed
+  rather than searching the heap for it.
+
+  Every scheduled due time is pushed back by up to `jitter` seconds, chosen
+  uniformly at random, so that jobs which would otherwise fall due together
+  spread out over several ticks. Jitter only ever delays a job.
+  """
+
+  REMOVED = '<removed-job>'
+
+  def __init__(self, jitter: float = 0.0):
+    self.jitter = jitter
+    self._queue = []
+    self._finder = {}  # key -> live heap entry
+    self._counter = itertools.count()
+
+  def __contains__(self, key):
+    return key in self._finder
+
+  def __len__(self):
+    return len(self._finder)
+
+  def clear(self):
+    self._queue = []
+    self._finder = {}
+
+  def schedule(self, key: Hashable, due: float) -> float:
+    """(Re)schedules `key` to be due at `due`, plus jitter. Returns the due time."""
+    self.unschedule(key)
+    if self.jitter:
+      due += random.uniform(0, self.jitter)
+    entry = [due, next(self._counter), key]
+    self._finder[key] = entry
+    heapq.heappush(self._queue, entry)
+    return due
+
+  def unschedule(self, key: Hashable):
+    entry = self._finder.pop(key, None)
+    if entry is not None:
+      entry[-1] = RefreshScheduler.REMOVED
+
+  def next_due(self) -> Optional[float]:
+    """The due time of the earliest job, or None if nothing is scheduled."""
+    self._prune()
+    return self._queue[0][0] if self._queue else None
+
+  def pop_due(self, now: float, budget: int = None,
+              retry_after: float = None) -> List[Hashable]:
+    """Removes and returns up to `budget` keys which are due at time `now`.
+
+    Keys are returned in due order; any due keys beyond the budget stay at the
+    front of the queue for the next tick. If `retry_after` is given, each
+    returned key is provisionally rescheduled that many seconds from now, so
+    that a job which fails without rescheduling itself is retried later.
+
+    Costs O(1) when nothing is due, and O(k log n) for k keys returned."""
+    due = []
+    while budget is None or len(due) < budget:
+      self._prune()
+      if not self._queue or self._queue[0][0] > now:
+        break
+      key = heapq.heappop(self._queue)[-1]
+      del self._finder[key]
+      due.append(key)
+    if retry_after is not None:
+      for key in due:
+        self.schedule(key, now + retry_after)
+    return due
+
+  def upcoming(self, count: int) -> List[Tuple[float, Hashable]]:
+    """The `count` earliest (due, key) pairs, for display. Costs O(n log count)."""
+    live = (entry for entry in self._queue
+            if entry[-1] is not RefreshScheduler.REMOVED)
+    return [(entry[0], entry[-1]) for entry in heapq.nsmallest(count, live)]
+
+  def _prune(self):
+    while self._queue and self._queue[0][-1] is RefreshScheduler.REMOVED:
+      heapq.heappop(self._queue)
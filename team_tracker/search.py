@@ -0,0 +1,91 @@
+"""Trigram index for fuzzy searches over team names."""
+
+import collections
+import re
+from typing import Hashable, List, Set, Tuple
+
+from fuzzywuzzy import fuzz
+
+
+CANDIDATES = 50  # best trigram matches rescored per search
+
+
+def normalize(text: str) -> str:
+  return ' '.join(re.sub(r'[^\w]+', ' ', text.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+  """The trigrams of `text`, padded so that short words still have some."""
+  padded = f'  {normalize(text)} '
+  return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex(object):
+  """Fuzzy text search over a changing set of keyed names.
+
+  Each key (a team ID) is indexed under the trigrams of each of its names, in
+  `postings`. A search first ranks keys by how many trigrams they share with
+  the query, which touches only the postings of the query's own trigrams, and
+  then rescores just the best CANDIDATES of those with fuzzywuzzy's WRatio --
+  the same scorer `process.extract` used over every team -- so ratings mean
+  what they did before. An index of at most CANDIDATES keys rescores them all,
+  since WRatio can still rate a name that shares no trigram with the query.
+
+  Adding a key that is already present replaces its names."""
+
+  def __init__(self):
+    self.postings = collections.defaultdict(set)  # trigram -> set of keys
+    self.names = {}  # key -> tuple of names
+    self._grams = {}  # key -> set of trigrams over all its names
+
+  def __contains__(self, key):
+    return key in self.names
+
+  def __len__(self):
+    return len(self.names)
+
+  def clear(self):
+    self.postings = collections.defaultdict(set)
+    self.names = {}
+    self._grams = {}
+
+  def add(self, key: Hashable, *names: str):
+    names = tuple(name for name in names if name)
+    if self.names.get(key, None) == names:
+      return
+    self.remove(key)
+    grams = set()
+    for name in names:
+      grams |= trigrams(name)
+    for gram in grams:
+      self.postings[gram].add(key)
+    self.names[key] = names
+    self._grams[key] = grams
+
+  def remove(self, key: Hashable):
+    for gram in self._grams.pop(key, ()):
+      keys = self.postings[gram]
+      keys.discard(key)
+      if not keys:
+        del self.postings[gram]
+    self.names.pop(key, None)
+
+  def search(self, query: str, limit: int = 5,
+             min_score: int = 0) -> List[Tuple[Hashable, int]]:
+    """Returns up to `limit` (key, score) pairs, best first, scoring 0-100."""
+    if not normalize(query):
+      return []
+    if len(self.names) <= CANDIDATES:
+      candidates = list(self.names)
+    else:
+      shared = collections.Counter()
+      for gram in trigrams(query):
+        shared.update(self.postings.get(gram, ()))
+      candidates = [key for key, _ in shared.most_common(CANDIDATES)]
+    results = []
+    for key in candidates:
+      score = max(fuzz.WRatio(query, name) for name in self.names[key])
+      if score >= min_score:
+        results.append((key, score))
+    results.sort(key=lambda result: -result[1])
+    return results[:limit]
@@ -0,0 +1,93 @@
+"""In-memory mirror of the per-user refresh state kept in Config."""
+
+from typing import List
+
+from .scheduler import RefreshScheduler
+
+
+REFRESH_TICK = 10.0  # seconds between runs of the user refresh cron
+BASE_UPDATE_THRESHOLD = 30.0  # seconds; multiplied by a user's backoff_factor
+RETRY_INTERVAL = 60.0  # seconds before retrying a refresh that wrote nothing
+
+
+class UserState(object):
+  """The refresh-related fields of a single user's config."""
+
+  FIELDS = ('team_id', 'last_updated', 'backoff_factor')
+
+  __slots__ = ('user_id',) + FIELDS
+
+  def __init__(self, user_id: int, team_id: int = -1, last_updated: float = 0,
+               backoff_factor: float = 1):
+    self.user_id = user_id
+    self.team_id = team_id
+    self.last_updated = last_updated
+    self.backoff_factor = backoff_factor
+
+  def update_threshold(self) -> float:
+    """Minimum number of seconds after which a user update should be requested."""
+    return BASE_UPDATE_THRESHOLD * self.backoff_factor
+
+  def next_due(self) -> float:
+    """The earliest time at which this user should be refreshed again."""
+    return self.last_updated + self.update_threshold()
+
+
+class UserTable(object):
+  """Per-user refresh state, indexed by when each user is next due.
+
+  Every change to a user's team_id, last_updated or backoff_factor is written
+  through to this table as well as Config, so that the refresh cron never needs
+  to read Config. Each user is scheduled exactly `update_threshold()` seconds
+  after their last update, plus the scheduler's jitter."""
+
+  def __init__(self, jitter: float = 0.0):
+    self.users = {}  # user_id -> UserState
+    self.scheduler = RefreshScheduler(jitter=jitter)
+
+  def __contains__(self, user_id):
+    return user_id in self.users
+
+  def __len__(self):
+    return len(self.users)
+
+  def clear(self):
+    self.users = {}
+    self.scheduler.clear()
+
+  def load(self, all_users: dict):
+    """Replaces the table with the contents of `config.all_users()`."""
+    self.clear()
+    for user_id, data in all_users.items():
+      state = UserState(user_id, **{field: data[field] for field in UserState.FIELDS
+                                    if field in data})
+      self.users[user_id] = state
+      self.scheduler.schedule(user_id, state.next_due())
+
+  def get(self, user_id: int) -> UserState:
+    """Returns the user's state, or a default state if the user is unknown."""
+    state = self.users.get(user_id, None)
+    if state is None:
+      state = UserState(user_id)
+    return state
+
+  def update(self, user_id: int, **fields) -> UserState:
+    """Sets some of a user's fields (adding the user if need be) and reschedules them."""
+    state = self.users.get(user_id, None)
+    if state is None:
+      state = self.users[user_id] = UserState(user_id)
+    for field, value in fields.items():
+      setattr(state, field, value)
+    self.scheduler.schedule(user_id, state.next_due())
+    return state
+
+  def remove(self, user_id: int):
+    self.users.pop(user_id, None)
+    self.scheduler.unschedule(user_id)
+
+  def pop_due(self, now: float, budget: int = None) -> List[int]:
+    """Returns the IDs of up to `budget` users due for a refresh at time `now`.
+
+    Each returned user is provisionally rescheduled RETRY_INTERVAL from now, so
+    that a refresh which fails without writing anything is retried later."""
+    return self.scheduler.pop_due(now, budget, retry_after=RETRY_INTERVAL)
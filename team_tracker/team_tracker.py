@@ -1,16 +1,16 @@
 """Cog for tracking team affiliations globally."""
 
 import asyncio
-import copy
-import fuzzywuzzy
+import collections
+import contextlib
 import hashlib
+import io
 import logging
 import os
 import pathlib
 import random
-import requests
 import time
-from typing import List, Optional, Union
+from typing import List, Optional, Sequence, Union
 
 import discord
 from discord.ext import tasks
@@ -18,10 +18,28 @@ from redbot.core import commands
 from redbot.core import Config
 from redbot.core import checks
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils import mod
-from redbot.core.utils.menus import menu, prev_page, next_page
+from redbot.core.utils.chat_formatting import pagify
+from redbot.core.utils.menus import menu, prev_page, next_page, start_adding_reactions
+from redbot.core.utils.predicates import ReactionPredicate
 
 from . import nl
+from .admin_log import AdminLog
+from .channel_batch import CATEGORY_LIMIT, CHANNEL_TYPES, ChannelBatch, ProgressMessage
+from .digest_index import DigestIndex
+from .dispatch import DMDispatcher
+from .hunt_client import HuntClient
+from .joins import JoinQueue
+from .membership import MembershipIndex
+from .metrics import Metrics
+from .pagination import TeamViewCache
+from .permissions import DEFAULT_MAX_EDITS, PermissionEngine
+from .persistence import FLUSH_INTERVAL, WriteBuffer
+from .roles import RolePlan
+from .scheduler import RefreshScheduler
+from .search import TrigramIndex
+from .state import REFRESH_TICK, UserState, UserTable
 
 
 log = logging.getLogger('red.eliza.team_tracker')
@@ -33,8 +51,13 @@ DEFAULT_GLOBAL_SETTINGS = {
     'server_url': None,
     'lookup_url': None,
     'secret': None,
+    'batch_size': 50,  # teams or users per bulk lookup; 0 to disable
+    'user_refresh_budget': 200,  # most users refreshed per cron tick
+    'team_refresh_budget': 50,  # most teams refreshed per cron tick
+    'refresh_jitter': 5.0,  # seconds by which refreshes are randomly delayed
+    'channel_parallelism': DEFAULT_MAX_EDITS,  # channel creations/edits at once
     ## TODO: Make registration URL a setting?
-    'undigest': {},  # digest -> user_id
+    'undigest': {},  # digest -> user_id; superseded by the DigestIndex log
 }
 
 DEFAULT_GUILD_SETTINGS = {
@@ -42,6 +65,7 @@ DEFAULT_GUILD_SETTINGS = {
     'admin_channel': None,
     'teams_category': None,
     'participant_role': None,
+    'channel_batch': None,  # unfinished ChannelBatch, serialized
 }
 
 DEFAULT_USER_SETTINGS = {
@@ -51,13 +75,12 @@ DEFAULT_USER_SETTINGS = {
     'digest': None,  # This is a digest of user ID + secret somehow
     'last_updated': 0,  # time.time()
     'do_not_message': False,
-    # We use this to stagger automated user refreshes (to avoid spikyness). I
-    # would use the user ID but I do not believe those to be uniformly
-    # distributed.
     'backoff_factor': 1,
-    'refresh_modulus': -1,
 }
 
+TEAM_REFRESH_TICK = 60.0  # seconds between runs of the team refresh cron
+TEAM_REFRESH_INTERVAL = 30 * 60.0  # seconds between refreshes of any one team
+
 PARTICIPANT_ROLE_NAME = 'participant'
 
 CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
@@ -105,6 +128,36 @@ async def close_menu(ctx: commands.Context, pages: list, controls: dict,
 
 DEFAULT_CONTROLS = {"⬅": prev_page, "❌": close_menu, "➡": next_page}
 
+async def lazy_menu(ctx: commands.Context, pages: Sequence[str],
+                    timeout: float = 120):
+  """Like `menu` with DEFAULT_CONTROLS, but only renders the page on screen.
+
+  Red's `menu` checks the type of every page before showing the first, which
+  would render all of a `TablePages` up front."""
+  page = 0
+  message = await ctx.send(pages[page])
+  start_adding_reactions(message, DEFAULT_CONTROLS.keys())
+  predicate = ReactionPredicate.with_emojis(
+      tuple(DEFAULT_CONTROLS.keys()), message, ctx.author)
+  while True:
+    try:
+      reaction, user = await ctx.bot.wait_for('reaction_add', check=predicate,
+                                              timeout=timeout)
+    except asyncio.TimeoutError:
+      break
+    emoji = str(reaction.emoji)
+    if emoji == '❌':
+      break
+    page = (page + (1 if emoji == '➡' else -1)) % len(pages)
+    with contextlib.suppress(discord.Forbidden, discord.NotFound):
+      await message.remove_reaction(emoji, user)
+    try:
+      await message.edit(content=pages[page])
+    except discord.NotFound:
+      return
+  with contextlib.suppress(discord.NotFound):
+    await close_menu(ctx, pages, DEFAULT_CONTROLS, message, page, timeout, '❌')
+
 def paginate_team_data(members: List[discord.Member],
                              users: List[discord.User],
                              channels: List[discord.abc.GuildChannel]) -> List[str]:
@@ -161,77 +214,59 @@ def paginate_team_data(members: List[discord.Member],
 
   return pages
 
-def paginate_table(lines):
-  pages = []
-  current_page, current_count = [], 0
-  current_page.append("```")
-  current_count += len(current_page[0]) + 1
-  for line in lines:
-    current_page.append(line)
-    current_count += len(line) + 1
-    if current_count > 1500:
-      current_page.append("```")
-      pages.append('\n'.join(current_page))
-      current_page = ["```"]
-      current_count = len(current_page[0]) + 1
-  current_page.append("```")
-  pages.append('\n'.join(current_page))
-  return pages
-
-
 class TeamData(object):
   """Structured data collected about teams."""
   team_id = -1
   display_name = None
   username = None
   channels = []  # list of objects, but serializes as a list of ids
-  users = []  # list of objects, but serializes as a list of ids
+  user_ids = set()  # serializes as a list of ids
   last_updated = 0  # time.time()
 
   @staticmethod
   async def read(bot: Red, data: dict):
     obj = TeamData()
+    obj.bot = bot
     obj.team_id = data['team_id']
     obj.display_name = data['display_name']
     obj.username = data['username']
     obj.channels = [bot.get_channel(channel_id)
                     for channel_id in data.get('channels', [])]
-    obj.users = [bot.get_user(user_id)
-                 for user_id in data.get('users', [])]
+    obj.user_ids = set(data.get('users', []))
     obj.last_updated = data.get('last_updated', time.time())
     return obj
 
   async def reload(self):
-    # Re-retrieves all Channel and User objects
-    self.channels = [bot.get_channel(channel.id)
+    # Re-retrieves all Channel objects
+    self.channels = [self.bot.get_channel(channel.id)
                      for channel in self.channels]
-    self.users = [bot.get_user(user.id)
-                  for user in self.users]
 
-  async def write(self, config: Config):
-    self.channels = [ch for ch in self.channels if ch is not None]
-    self.users = [us for us in self.users if us is not None]
-    serialized = {
+  @property
+  def users(self) -> List[discord.User]:
+    """The team's members that the bot can see."""
+    users = [self.bot.get_user(user_id) for user_id in self.user_ids]
+    return [user for user in users if user is not None]
+
+  def serialize(self) -> dict:
+    return {
         'team_id': self.team_id,
         'display_name': self.display_name,
         'username': self.username,
-        'channels': [channel.id for channel in self.channels],
-        'users': [user.id for user in self.users if user is not None],
+        'channels': [channel.id for channel in self.channels
+                     if channel is not None],
+        'users': sorted(self.user_ids),
         'last_updated': self.last_updated,
     }
-    await config.set_raw('teams', self.team_id, value=serialized)
 
   def users_here(self, guild: discord.Guild):
-    members = [guild.get_member(user.id)
-               for user in self.users if user is not None]
+    members = [guild.get_member(user_id) for user_id in self.user_ids]
     return [member for member in members if member is not None]
 
-  def table_line(self, guild: discord.Guild, count: int=1):
+  def table_line(self, users_here: List[discord.Member], count: int=1):
     data = [f'{self.team_id:4d}',
             f'{self.username:24}']
-    users_here = self.users_here(guild)
     members = [f'@{user.name}#{user.discriminator}'
-               for user in self.users_here(guild)[:count]]
+               for user in users_here[:count]]
     others = len(users_here) - len(members)
     if others:
       members.append(f'{others} more')
@@ -256,20 +291,74 @@ class TeamTracker(commands.Cog):
     self.config.register_global(**DEFAULT_GLOBAL_SETTINGS)
     self.config.register_guild(**DEFAULT_GUILD_SETTINGS)
     self.config.register_user(**DEFAULT_USER_SETTINGS)
+    self.metrics = Metrics()
+    self.hunt_client = HuntClient(metrics=self.metrics)
+    self.writes = WriteBuffer(self.config, metrics=self.metrics)
+    self.permissions = PermissionEngine(metrics=self.metrics)
+    self._running_batches = set()  # guild_ids with a channel batch in progress
+    self.joins = JoinQueue(self._handle_join)
+    self.dms = DMDispatcher(self._report_failed_dms)
+    self.admin_log = AdminLog(lambda: self.admin_channels.values())
+    # Set if the hunt server turns out not to support bulk lookups
+    self._bulk_unsupported = False
+
+    self.metrics.gauge('teams', lambda: len(self.teams))
+    self.metrics.gauge('users', lambda: len(self.user_table))
+    self.metrics.gauge('team_queue_depth', lambda: len(self.team_schedule))
+    self.metrics.gauge('user_queue_depth', lambda: len(self.user_table.scheduler))
+    self.metrics.gauge('team_cron_lag_seconds',
+                       lambda: self._cron_lag(self.team_schedule))
+    self.metrics.gauge('user_cron_lag_seconds',
+                       lambda: self._cron_lag(self.user_table.scheduler))
+    self.metrics.gauge('pending_config_writes', lambda: len(self.writes))
+    self.metrics.gauge('join_queue_depth', lambda: len(self.joins))
+    self.metrics.gauge('dm_queue_depth', lambda: len(self.dms))
+    self.metrics.gauge('pending_admin_messages', lambda: len(self.admin_log))
 
   async def initialize(self):
     await self.initialize_internals()
     self.bot.add_listener(self.member_join, 'on_member_join')
+    self.bot.add_listener(self.member_remove, 'on_member_remove')
+    self.bot.add_listener(self.member_update, 'on_member_update')
+    self.bot.add_listener(self.user_update, 'on_user_update')
     self.cron_update_teams.start()
     self.cron_update_users.start()
+    self.cron_flush_writes.start()
+    self.joins.start()
+    self.dms.start()
 
   async def initialize_internals(self):
     # Load config information to internal memory
+    jitter = await self.config.refresh_jitter()
     self.teams = {}
+    self.team_schedule = RefreshScheduler(jitter=jitter)
+    self.team_search_index = TrigramIndex()
+    now = time.time()
     async with self.config.teams() as teams:
       for key, value in teams.items():
         data = await TeamData.read(self.bot, value)
         self.teams[data.team_id] = data
+        self.team_search_index.add(data.team_id, data.username, data.display_name)
+        # Spread team refreshes evenly over the refresh interval
+        self.team_schedule.schedule(
+            data.team_id, now + random.uniform(0, TEAM_REFRESH_INTERVAL))
+
+    self.membership = MembershipIndex()
+    self.membership.load(self.teams.values())
+    self.views = TeamViewCache()
+
+    await self.permissions.set_max_edits(
+        await self.config.channel_parallelism())
+
+    self.user_table = UserTable(jitter=jitter)
+    self.user_table.load(await self.config.all_users())
+
+    self.digests = DigestIndex(cog_data_path(self))
+    legacy_undigest = await self.config.undigest()
+    self.digests.load(legacy_undigest)
+    if legacy_undigest:
+      # The log is authoritative from here on
+      await self.config.undigest.clear()
 
     self.guilds = {}  # guild_id integer -> Guild object
     self.admin_channels = {}  # guild_id integer -> TextChannel object
@@ -279,6 +368,19 @@ class TeamTracker(commands.Cog):
   def cog_unload(self):
     self.cron_update_teams.cancel()
     self.cron_update_users.cancel()
+    self.cron_flush_writes.cancel()
+    self.joins.stop()
+    self.dms.stop()
+    self.admin_log.stop()
+    self.bot.loop.create_task(self._shutdown())
+
+  async def _shutdown(self):
+    try:
+      await self.admin_log.flush()
+      await self.writes.flush()
+    finally:
+      self.digests.close()
+      await self.hunt_client.close()
 
   async def member_join(self, member):
     log.info('member_join triggered')
@@ -287,35 +389,79 @@ class TeamTracker(commands.Cog):
     if member.bot:
       log.info('member was a bot')
       return
-    enabled = await self.config.guild(member.guild).enabled()
-    if not enabled:
+    self.membership.member_joined(member)
+    self._invalidate_member_views(member)
+    if member.guild.id not in self.guilds:
       log.info('guild does not have team tracking enabled')
       return
-    team_id = await self.config.user(member).team_id()
+    self.joins.put(member)
+
+  async def _handle_join(self, member: discord.Member, queued: float):
+    """Gives a newly joined member access to their team's channels, or prompts
+    them to register. Run by the JoinQueue workers."""
+    team_id = self.user_table.get(member.id).team_id
+    team_data = self.teams.get(team_id, None)
     if team_id == -1:
       log.info('sending reg message')
-      if not await self.registration_prompt(member):
-        await self.admin_msg((
-            'Discord registration for %s#%s failed; user may have the bot blocked,'
-            ' or have DMs from non-friends disabled. URL: %s') % (
-                member.name, member.discriminator,
-                os.path.join(await self._register_url(), await self._token(user=member))))
-      await self.config.user(member).backoff_factor.set(1)
-    else:
-      team_data = self.teams[team_id]
+      await self._prompt_registration([member])
+      await self._set_user_state(member.id, backoff_factor=1)
+    elif team_data is not None:
       log.info(f'applying local config for team {team_data.display_name}')
-      for channel in team_data.channels:
-        if channel.guild == member.guild:
-          await self._permit_member_in_channel(
-              member, channel,
-              f'Adding registered user {display(member)}')
-
-  async def registration_prompt(self, user, bypass_ignore=False) -> bool:
-    do_not_message = await self.config.user(user).do_not_message()
-    if do_not_message and not bypass_ignore:
-      return True  # message fails silently as intended
+      results = await asyncio.gather(*[
+          self.permissions.apply(
+              channel, [member], TEAMMATE_PERM,
+              reason=f'Adding registered user {display(member)}')
+          for channel in team_data.channels
+          if channel is not None and channel.guild == member.guild],
+                                     return_exceptions=True)
+      for result in results:
+        if isinstance(result, Exception):
+          log.error(f'Could not admit {display(member)} to a team channel:'
+                    f' {result!r}')
+      self.metrics.observe('join_to_access_seconds', time.monotonic() - queued)
+
+  async def member_remove(self, member):
+    self.membership.member_left(member)
+    self._invalidate_member_views(member)
+
+  async def member_update(self, before, after):
+    # Also fired for role and status changes, which no view shows
+    if before.display_name != after.display_name:
+      self._invalidate_member_views(after)
+
+  async def user_update(self, before, after):
+    if (before.name, before.discriminator) != (after.name, after.discriminator):
+      self._invalidate_member_views(after)
+
+  def _invalidate_member_views(self, member):
+    team_id = self.membership.team_of(member.id)
+    if team_id is not None:
+      self.views.invalidate(team_id)
+
+  async def _prompt_registration(self, users: List[discord.User],
+                                 bypass_ignore=False) -> int:
+    """Queues registration prompts to `users`; returns how many were queued.
+
+    Users who have opted out of messages are skipped unless `bypass_ignore`.
+    Prompts that can't be delivered are reported to admins all together, once
+    the DM queue empties."""
+    users = list(users)
+    if not bypass_ignore:
+      ignoring = await self._get_users_field(
+          [user.id for user in users], 'do_not_message')
+      users = [user for user, ignore in zip(users, ignoring) if not ignore]
+    if not users:
+      return 0
 
     my_prefix = await self._prefix()
+    register_url = await self._register_url()
+    for user, token in zip(users, await self._tokens(users)):
+      url = os.path.join(register_url, token)
+      self.dms.put(user, self._registration_message(user, my_prefix, url),
+                   note=url)
+    return len(users)
+
+  def _registration_message(self, user, my_prefix: str, url: str) -> str:
     if getattr(user, 'guild', None):
       intro = (
           'Hello! You\'re receiving this message either because you or an event'
@@ -331,48 +477,65 @@ class TeamTracker(commands.Cog):
         '    * To let me know which team you\'re on, visit <%s>.\n'
         '          Please do not share this link other players, nor click on'
         ' links of this form sent to you by other players.'
-    ) % (os.path.join(await self._register_url(),
-                      await self._token(user=user)))
+    ) % (url,)
     ignore_instructions = (
         '    * To never receive team-related messages from me again, respond'
         ' with `%steam ignore`. (Opt back in with `%steam unignore`.)'
     ) % (my_prefix, my_prefix)
-    try:
-      await user.send('\n'.join([
-          intro, register_instructions, ignore_instructions]))
-      return True
-    except discord.http.Forbidden:
-      return False
+    return '\n'.join([intro, register_instructions, ignore_instructions])
 
-  @tasks.loop(minutes=1.0)  # Actual loop time for an individual team is 30 minutes
-  async def cron_update_teams(self):
-    wall_modulus = int(time.time() / 60) % 30
-    teams_to_update = [team_id for team_id in self.teams
-                       if team_id % 30 == wall_modulus]
-    if teams_to_update:
-      log.info(f'Running automated update for {len(teams_to_update)}'
-               f' team{nl.s(len(teams_to_update))}.')
-      await asyncio.gather(
-          *[self._update_team(team=self.teams[team_id]) for team_id in teams_to_update],
-          return_exceptions=True)
+  async def _report_failed_dms(self, failures):
+    message = [f'Could not send {len(failures)} registration'
+               f' prompt{nl.s(len(failures))}; these users may have the bot'
+               ' blocked, or have DMs from non-friends disabled:']
+    message.extend(f'{display(user)}: <{url}>' for user, url, error in failures)
+    await self.admin_msg('\n'.join(message))
 
-  @tasks.loop(seconds=10.0)
+  @tasks.loop(seconds=TEAM_REFRESH_TICK)
+  async def cron_update_teams(self):
+    # As with cron_flush_writes, an exception must not stop the loop for good
+    try:
+      budget = await self.config.team_refresh_budget()
+      teams_to_update = []
+      for team_id in self.team_schedule.pop_due(
+          time.time(), budget, retry_after=TEAM_REFRESH_INTERVAL):
+        if self.teams.get(team_id, None) is None:
+          self.team_schedule.unschedule(team_id)
+        else:
+          teams_to_update.append(team_id)
+      if teams_to_update:
+        log.info(f'Running automated update for {len(teams_to_update)}'
+                 f' team{nl.s(len(teams_to_update))}.')
+        self.metrics.inc('refreshes_total', len(teams_to_update), kind='team')
+        with self.metrics.timer('cron_run_seconds', cron='teams'):
+          await self._update_teams(
+              [self.teams[team_id] for team_id in teams_to_update])
+    except Exception:
+      log.exception('Automated team refresh failed')
+
+  @tasks.loop(seconds=REFRESH_TICK)
   async def cron_update_users(self):
-    wall_modulus = int(time.time() / 10) % 6
-    users = await self.config.all_users()
-    users_to_update = [user_id for user_id in users
-                       if (time.time() - users[user_id]['last_updated'] >=
-                           await self._user_update_threshold(users[user_id]))]
-    moduli = await asyncio.gather(
-        *[self._modulus(user_id=user_id) for user_id in users_to_update])
-    users_to_update = [user_id for user_id, modulus in zip(users_to_update, moduli)
-                       if modulus == wall_modulus]
-    if users_to_update:
-      log.info(f'Running automated update for {len(users_to_update)}'
-               f' user{nl.s(len(users_to_update))}.')
-      await asyncio.gather(
-          *[self._update_user(user_id=user_id) for user_id in users_to_update],
-          return_exceptions=True)
+    # As with cron_flush_writes, an exception must not stop the loop for good
+    try:
+      budget = await self.config.user_refresh_budget()
+      users_to_update = self.user_table.pop_due(time.time(), budget)
+      if users_to_update:
+        log.info(f'Running automated update for {len(users_to_update)}'
+                 f' user{nl.s(len(users_to_update))}.')
+        self.metrics.inc('refreshes_total', len(users_to_update), kind='user')
+        with self.metrics.timer('cron_run_seconds', cron='users'):
+          await self._update_users(user_ids=users_to_update)
+    except Exception:
+      log.exception('Automated user refresh failed')
+
+  @tasks.loop(seconds=FLUSH_INTERVAL)
+  async def cron_flush_writes(self):
+    # An exception would stop the loop for good, and the writes with it; the
+    # buffer keeps whatever failed to save, so just try again next time.
+    try:
+      await self.writes.flush()
+    except Exception:
+      log.exception('Could not flush buffered config writes')
 
   ######### General stuff
 
@@ -385,7 +548,7 @@ class TeamTracker(commands.Cog):
   @_team.command(name='whoami')
   async def team_whoami(self, ctx: commands.Context):
     """Show which team you belong to."""
-    team_id = await self.config.user(ctx.author).team_id()
+    team_id = self.user_table.get(ctx.author.id).team_id
 
     if team_id == -1:
       await ctx.send('You are not affiliated with any team.')
@@ -400,7 +563,7 @@ class TeamTracker(commands.Cog):
   @_team.command(name='whois')
   async def team_whois(self, ctx: commands.Context, user: discord.User):
     """Show which team some user belongs to."""
-    team_id = await self.config.user(user).team_id()
+    team_id = self.user_table.get(user.id).team_id
 
     if team_id == -1:
       await ctx.send(f'{display(user)} not affiliated with any team.')
@@ -429,13 +592,7 @@ class TeamTracker(commands.Cog):
     else:
       msg = f'Sending registration prompt to {len(users)} users'
     await ctx.send(msg)
-    errors = await asyncio.gather(
-        *[self.registration_prompt(user, bypass_ignore=True) for user in users],
-        return_exceptions=True)
-    # if not await self.registration_prompt(user, bypass_ignore=True):
-    #   await self.admin_msg(f'Discord registration for {user.name}#{user.discriminator}'
-    #                        ' failed; user may have the bot blocked, or have DMs from non-'
-    #                        'friends disabled.')
+    await self._prompt_registration(users, bypass_ignore=True)
 
   @_team.command(name='url')
   @checks.mod_or_permissions(manage_channels=True)
@@ -443,7 +600,7 @@ class TeamTracker(commands.Cog):
     """Send URLs for the users to admin."""
     await ctx.send(f'Sending {len(users)} registration URLs to admin stderr')
 
-    tokens = await asyncio.gather(*[self._token(user=user) for user in users])
+    tokens = await self._tokens(users)
     base_url = await self._register_url()
     urls = [f'{display(user)}: {os.path.join(base_url, token)}'
             for user, token in zip(users, tokens)]
@@ -468,9 +625,7 @@ class TeamTracker(commands.Cog):
     else:
       msg = f'Updating team affiliation for {len(users)} users'
     message = await ctx.send(msg)
-    await asyncio.gather(
-        *[self._update_user(user=user) for user in users],
-        return_exceptions=True)
+    await self._update_users(users=users)
     await message.edit(content=(message.content + ' ... done'))
 
   @_team.command(name='refresh')
@@ -507,36 +662,33 @@ class TeamTracker(commands.Cog):
   @_team.command(name='ignore')
   async def team_ignore(self, ctx: commands.Context):
     """Opt out of automated messages from the team management cog."""
-    await self.config.user(ctx.author).do_not_message.set(True)
+    await self._set_user_state(ctx.author.id, do_not_message=True)
     await ctx.send('Okay, I won\'t DM about this anymore.')
 
   @_team.command(name='unignore')
   async def team_unignore(self, ctx: commands.Context):
     """Opt (back) in to automated messages from the team management cog."""
-    await self.config.user(ctx.author).do_not_message.set(False)
+    await self._set_user_state(ctx.author.id, do_not_message=False)
     await ctx.send('Okay, I\'ll include you back in team-wide DMs.')
 
   @_team.command(name='search')
   @checks.mod_or_permissions(manage_channels=True)
   async def team_search(self, ctx: commands.Context, username: str):
-    """Search for team by username."""
-    all_usernames = {team_id: team.username for team_id, team in self.teams.items()
-                     if team is not None}
+    """Search for team by username or display name."""
     suggestions = []
-    log.info(repr(fuzzywuzzy.process.extract(
-        username, all_usernames, limit=5)))
-    for fuzz_username, rating, fuzz_id in fuzzywuzzy.process.extract(
-        username, all_usernames, limit=5):
-      if rating < 50:
-        break
-      fuzz_team = self.teams[fuzz_id]
+    results = self.team_search_index.search(username, limit=5, min_score=50)
+    log.info(repr(results))
+    for fuzz_id, rating in results:
+      fuzz_team = self.teams.get(fuzz_id, None)
+      if fuzz_team is None:
+        continue
       suggestions.append(
           f'(ID: **{fuzz_team.team_id}**) **{fuzz_team.display_name[:40]}**'
-          f' -- {len(fuzz_team.users)} registered members')
+          f' -- {len(fuzz_team.user_ids)} registered members')
     if suggestions:
       await ctx.send('\n'.join(suggestions))
     else:
-      await ctx.send(f"Couldn't find any teams whose usernames resembled `{username}`")
+      await ctx.send(f"Couldn't find any teams whose names resembled `{username}`")
 
   @_team.command(name='show')
   @checks.mod_or_permissions(manage_channels=True)
@@ -544,7 +696,10 @@ class TeamTracker(commands.Cog):
     """Show team channels and members."""
     try:
       if team_id not in self.teams:
-        self.teams[team_id] = await self._get_team_data(team_id)
+        team = await self._get_team_data(team_id)
+        if team is None:
+          raise KeyError(team_id)
+        self._track_team(team)
       team = self.teams[team_id]
     except KeyError:
       await ctx.send(f'Unrecognized team ID {team_id}. If you think this is a '
@@ -552,15 +707,18 @@ class TeamTracker(commands.Cog):
                      'registered a Discord account yet.')
       return
 
-    if ctx.guild:
-      members, users = self._get_members_if_possible(
-          [user.id for user in team.users], ctx.guild)
-    else:
-      members, users = [], team.users
+    def render():
+      if ctx.guild:
+        members, users = self._get_members_if_possible(
+            team.user_ids, ctx.guild)
+      else:
+        members, users = [], team.users
+      return paginate_team_data(members, users,
+                                [channel for channel in team.channels
+                                 if channel and channel.guild == ctx.guild])
 
-    pages = paginate_team_data(members, users,
-                               [channel for channel in team.channels
-                                if channel and channel.guild == ctx.guild])
+    pages = self.views.details(
+        team.team_id, ctx.guild.id if ctx.guild else None, render)
 
     embeds = [
         discord.Embed(title=f'**{team.display_name} (ID: {team.team_id})**',
@@ -573,16 +731,30 @@ class TeamTracker(commands.Cog):
       await menu(ctx, embeds, DEFAULT_CONTROLS, timeout=120)
 
   @_team.command(name='show-all')
+  @commands.guild_only()
   @checks.mod_or_permissions(manage_channels=True)
   async def team_show_all(self, ctx: commands.Context, n: int=3):
     """Show tabulated information on all teams along with up to `n` members from each.
 
     Team members not in this guild are excluded from consideration. Teams
     with no members in this guild will not show up at all."""
-    lines = [team.table_line(ctx.guild, n) for team in self.teams.values()]
-    lines = [line for line in lines if line]
-    for page in paginate_table(lines):
-      await ctx.send(page)
+    def render_all():
+      return {team_id: self.teams[team_id].table_line(members, n)
+              for team_id, members
+              in self.membership.members_by_team(ctx.guild).items()
+              if team_id in self.teams}
+
+    def render(team_id):
+      team = self.teams.get(team_id, None)
+      return team and team.table_line(team.users_here(ctx.guild), n)
+
+    pages = self.views.table((ctx.guild.id, n), render_all, render)
+    if not pages.lines:
+      await ctx.send('No teams have registered members in this server.')
+    elif len(pages) == 1:
+      await ctx.send(pages[0])
+    else:
+      await lazy_menu(ctx, pages, timeout=120)
 
   ######### Admin stuff
 
@@ -603,25 +775,30 @@ class TeamTracker(commands.Cog):
   @checks.mod_or_permissions(manage_channels=True)
   async def admin_reset(self, ctx: commands.Context):
     """Resets all team management data, GLOBALLY."""
+    self.writes.discard()
+    self.digests.clear()
     await self.config.clear_all()
     await self.initialize_internals()
     await ctx.send('Global team management factory reset complete.')
 
   @_admin.command(name='select')
   @checks.mod_or_permissions(manage_channels=True)
-  async def admin_select(self, ctx: commands.Context, count: int=1):
+  async def admin_select(self, ctx: commands.Context, count: int=1,
+                         mode: str = None):
     """Selects up to `count` members from each team to be Participants.
 
     Note that this also deselects other members from being Participants. That
     is, running this command twice will not result in more than the desired
     number of participants per team.
+
+    Use `[p]team admin select <count> preview` to see how many members would be
+    selected and deselected without changing anyone's roles.
     """
     participant = await self._get_or_create_participant_role(ctx.guild)
-    user_count, team_count = 0, 0
-    p_removed, p_added = 0, 0
-    for team in self.teams.values():
-      users_here = team.users_here(ctx.guild)
-      if not users_here:
+    plan = RolePlan(participant, reason='Participant selection')
+    team_count = 0
+    for team_id, users_here in self.membership.members_by_team(ctx.guild).items():
+      if team_id not in self.teams:
         continue
       ps, qs = [], []
       for member in users_here:
@@ -632,20 +809,33 @@ class TeamTracker(commands.Cog):
 
       if count < len(ps):
         random.shuffle(ps)
-        await asyncio.gather(*[member.remove_roles(participant)
-                               for member in ps[count:]],
-                             return_exceptions=True)
-        p_removed += (len(ps) - count)
+        for member in ps[count:]:
+          plan.remove(member)
       elif count > len(ps):
         random.shuffle(qs)
-        await asyncio.gather(*[member.add_roles(participant)
-                               for member in qs[:(count - len(ps))]],
-                             return_exceptions=True)
-        p_added += min(len(qs), count - len(ps))
+        for member in qs[:(count - len(ps))]:
+          plan.add(member)
       team_count += 1
-    report = []
-    await ctx.send(f'Selected +{p_added} and -{p_removed} participants'
+
+    if mode == 'preview':
+      await ctx.send(f'Would select {plan.describe()} participants'
+                     f' across {team_count} team{nl.s(team_count)}.')
+      return
+    if plan:
+      await ctx.send(f'Selecting {plan.describe()} participants...')
+      async with ctx.typing():
+        await plan.apply(self.permissions)
+    failed = collections.Counter(action for member, action, error in plan.failed)
+    await ctx.send(f'Selected +{len(plan.to_add) - failed["add"]} and'
+                   f' -{len(plan.to_remove) - failed["remove"]} participants'
                    f' across {team_count} team{nl.s(team_count)}.')
+    if plan.failed:
+      failures = [f'{action} {display(member)}: {error}'
+                  for member, action, error in plan.failed]
+      message = [f'{len(plan.failed)} participant role change{nl.s(len(plan.failed))}'
+                 ' failed, even after retrying:'] + failures
+      for page in pagify('\n'.join(message)):
+        await ctx.send(page)
 
   @_admin.command(name='enable')
   @commands.guild_only()
@@ -689,13 +879,14 @@ class TeamTracker(commands.Cog):
       return
 
     channel_name = random_channel_name()
-    channels = []
-    if channel_type in ['text', 'both']:
-      channels.append(await self._create_team_text_channel(
-          channel_name, ctx.guild, *[self.teams[team_id] for team_id in team_ids]))
-    if channel_type in ['voice', 'both']:
-      channels.append(await self._create_team_voice_channel(
-          channel_name, ctx.guild, *[self.teams[team_id] for team_id in team_ids]))
+    teams = [self.teams[team_id] for team_id in team_ids]
+    category = await self._get_or_create_team_category(ctx.guild)
+    overwrites = self._team_channel_overwrites(
+        await self._base_channel_overwrites(ctx.guild),
+        self.membership.members_by_team(ctx.guild), *teams)
+    channels = await asyncio.gather(*[
+        self._create_team_channel(kind, channel_name, category, overwrites, *teams)
+        for kind in CHANNEL_TYPES[channel_type]])
 
     await ctx.send('Created channel %s for team%s `%s`' % (
         channels[0].mention,
@@ -718,7 +909,7 @@ class TeamTracker(commands.Cog):
     `[p]team channel batch text | 3 5 | 1 | 2 | |`
 
     will create 6 text channels, and the first, fifth, and sixth will not have
-    any teams assigned to them. It is equivalent to running
+    any teams assigned to them. It has the same result as running
 
     `[p]team channel text`
     `[p]team channel text 3 5`
@@ -726,6 +917,10 @@ class TeamTracker(commands.Cog):
     `[p]team channel text 2`
     `[p]team channel text`
     `[p]team channel text`
+
+    except that channels are created several at a time, and progress is
+    reported as it goes. If the batch is interrupted, `[p]team channel resume`
+    finishes it.
     """
     team_groups, bad_args = [[]], []
     if channel_type not in ['text', 'voice', 'both']:
@@ -736,19 +931,14 @@ class TeamTracker(commands.Cog):
       elif not arg.isdigit() or int(arg) not in self.teams:
         bad_args.append(arg)
       else:
-        team_groups[-1].append(arg)
+        team_groups[-1].append(int(arg))
 
     if bad_args:
       await ctx.send(
           f'Received invalid arguments for batch channel creation: {bad_args}')
       return
 
-    fake_msg = copy.copy(ctx.message)
-    new_cmd = (await self._prefix()) + ctx.command.full_parent_name
-    for group in team_groups:
-      fake_msg.content = '%s %s %s' % (new_cmd, channel_type, ' '.join(group))
-      new_ctx = await self.bot.get_context(fake_msg)
-      await self.bot.invoke(new_ctx)
+    await self._start_channel_batch(ctx, channel_type, team_groups)
 
   @_channel.command(name='auto-batch')
   @commands.guild_only()
@@ -768,8 +958,9 @@ class TeamTracker(commands.Cog):
       await ctx.send(f'`{channel_type}` is not a valid channel type.')
       return
 
-    teams = [team_data for team_data in self.teams.values()
-             if team_data.users_here(ctx.guild)]
+    teams = [self.teams[team_id]
+             for team_id in self.membership.members_by_team(ctx.guild)
+             if team_id in self.teams]
     random.shuffle(teams)
     num_channels = round(len(teams) / group_size + .4999)
     groups = []
@@ -779,13 +970,28 @@ class TeamTracker(commands.Cog):
           teams[round(i * len(teams) / num_channels):
                 round((i + 1) * len(teams) / num_channels)]])
 
-    fake_msg = copy.copy(ctx.message)
-    new_cmd = (await self._prefix()) + ctx.command.full_parent_name
-    for group in groups:
-      fake_msg.content = '%s %s %s' % (
-          new_cmd, channel_type, ' '.join(map(str, group)))
-      new_ctx = await self.bot.get_context(fake_msg)
-      await self.bot.invoke(new_ctx)
+    await self._start_channel_batch(ctx, channel_type, groups)
+
+  @_channel.command(name='resume')
+  @commands.guild_only()
+  @checks.mod_or_permissions(manage_channels=True)
+  async def channel_resume(self, ctx: commands.Context, action: str = None):
+    """Finishes an interrupted channel batch in this server.
+
+    Channels that the batch already created are kept, and only the rest are
+    made. Use `[p]team channel resume discard` to abandon the batch instead."""
+    data = await self.config.guild(ctx.guild).channel_batch()
+    if data is None:
+      await ctx.send('There is no unfinished channel batch in this server.')
+      return
+    if ctx.guild.id in self._running_batches:
+      await ctx.send('That channel batch is still running.')
+      return
+    if action == 'discard':
+      await self.config.guild(ctx.guild).channel_batch.set(None)
+      await ctx.send('Discarded the unfinished channel batch.')
+      return
+    await self._run_channel_batch(ctx, ChannelBatch.read(data))
 
   @_channel.command(name='add')
   @commands.guild_only()
@@ -805,10 +1011,8 @@ class TeamTracker(commands.Cog):
           ', '.join(map(str, set(team_ids) - set(self.teams))),))
       return
 
-    await asyncio.gather(*[
-        self._permit_team_in_channel(self.teams[team_id], channel)
-        for team_id in team_ids],
-                         return_exceptions=True)
+    await self._permit_teams_in_channel(
+        channel, *[self.teams[team_id] for team_id in team_ids])
     await ctx.send('Added team%s `%s` to channel %s' % (
         nl.s(len(team_ids)),
         '`, `'.join(self.teams[team_id].username for team_id in team_ids),
@@ -832,10 +1036,8 @@ class TeamTracker(commands.Cog):
           ', '.join(map(str, set(team_ids) - set(self.teams))),))
       return
 
-    await asyncio.gather(*[
-        self._forbid_team_in_channel(self.teams[team_id], channel)
-        for team_id in team_ids],
-                         return_exceptions=True)
+    await self._forbid_teams_in_channel(
+        channel, *[self.teams[team_id] for team_id in team_ids])
     await ctx.send('Removed team%s `%s` from channel %s' % (
         nl.s(len(team_ids)),
         '`, `'.join(self.teams[team_id].username for team_id in team_ids),
@@ -936,11 +1138,147 @@ class TeamTracker(commands.Cog):
         message.append(f'(was `{the_url}`)')
       await self.admin_msg(' '.join(message))
 
+  @_admin.command(name='batch_size')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_batch_size(self, ctx: commands.Context, size: int = None):
+    """Sets or displays the number of teams or users refreshed per request.
+
+    Refreshes are sent to the hunt server in bulk, `size` teams or users at a
+    time. Set this to 0 to send one request per team or user instead, e.g. if
+    the hunt server does not support bulk lookups."""
+    the_size = await self.config.batch_size()
+    if size is None:
+      message = f'Team refreshes are batched {the_size} at a time.'
+      if the_size <= 1:
+        message = 'Team refreshes are not batched.'
+      if self._bulk_unsupported:
+        message += (' (Bulk lookups are currently off, as the hunt server did'
+                    ' not seem to support them.)')
+      await ctx.send(message)
+    else:
+      size = max(size, 0)
+      await self.config.batch_size.set(size)
+      self._bulk_unsupported = False
+      await self.admin_msg(
+          f'{display(ctx.author)} set the team refresh batch size to {size}.'
+          f' (was `{the_size}`)')
+
+  @_admin.command(name='queue')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_queue(self, ctx: commands.Context, count: int = 5):
+    """Shows the automated refresh queues, and the next `count` refreshes due."""
+    now = time.time()
+    user_budget = await self.config.user_refresh_budget()
+    team_budget = await self.config.team_refresh_budget()
+
+    def describe(title, scheduler, budget, tick, name):
+      lines = [f'**{title}**: {len(scheduler)} queued, at most {budget}'
+               f' every {tick:g} seconds']
+      next_due = scheduler.next_due()
+      if next_due is not None and next_due < now:
+        lines[0] += f'; running {now - next_due:.0f} seconds behind'
+      for due, key in scheduler.upcoming(count):
+        lines.append(f'    in {max(due - now, 0):.0f}s: {name(key)}')
+      return lines
+
+    def user_name(user_id):
+      user = self.bot.get_user(user_id)
+      return display(user) if user else f'user {user_id}'
+
+    def team_name(team_id):
+      team = self.teams.get(team_id, None)
+      return f'{team.username} ({team_id})' if team else f'team {team_id}'
+
+    message = describe('User refreshes', self.user_table.scheduler,
+                       user_budget, REFRESH_TICK, user_name)
+    message.append('')
+    message.extend(describe('Team refreshes', self.team_schedule,
+                            team_budget, TEAM_REFRESH_TICK, team_name))
+    await ctx.send('\n'.join(message))
+
+  @_admin.command(name='refresh_budget')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_refresh_budget(self, ctx: commands.Context,
+                                 kind: str, budget: int = None):
+    """Sets or displays the most `users` or `teams` refreshed per cron tick.
+
+    Refreshes that are due but over budget wait for the next tick."""
+    if kind not in ['users', 'teams']:
+      await ctx.send(f'Received unexpected refresh kind `{kind}`;'
+                     ' use `users` or `teams`.')
+      return
+    setting = getattr(self.config, f'{kind[:-1]}_refresh_budget')
+    the_budget = await setting()
+    if budget is None:
+      await ctx.send(f'At most {the_budget} {kind} are refreshed per tick.')
+    else:
+      budget = max(budget, 1)
+      await setting.set(budget)
+      await self.admin_msg(
+          f'{display(ctx.author)} set the {kind[:-1]} refresh budget to'
+          f' {budget}. (was `{the_budget}`)')
+
+  @_admin.command(name='refresh_jitter')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_refresh_jitter(self, ctx: commands.Context,
+                                 seconds: float = None):
+    """Sets or displays the most seconds by which refreshes are randomly delayed.
+
+    Jitter keeps refreshes which would fall due together from bunching up. It
+    applies to refreshes scheduled after it is set."""
+    the_jitter = await self.config.refresh_jitter()
+    if seconds is None:
+      await ctx.send(f'Refreshes are delayed by up to {the_jitter:g} seconds.')
+    else:
+      seconds = max(seconds, 0.0)
+      await self.config.refresh_jitter.set(seconds)
+      self.team_schedule.jitter = seconds
+      self.user_table.scheduler.jitter = seconds
+      await self.admin_msg(
+          f'{display(ctx.author)} set the refresh jitter to {seconds:g}'
+          f' seconds. (was `{the_jitter:g}`)')
+
+  @_admin.command(name='channel_parallelism')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_channel_parallelism(self, ctx: commands.Context,
+                                      count: int = None):
+    """Sets or displays the most channel creations or edits made at once.
+
+    Higher values make batch channel creation faster, at the cost of hitting
+    Discord's rate limits sooner."""
+    the_count = await self.config.channel_parallelism()
+    if count is None:
+      await ctx.send(f'At most {the_count} channels are created or edited at once.')
+    else:
+      count = max(count, 1)
+      await self.config.channel_parallelism.set(count)
+      await self.permissions.set_max_edits(count)
+      await self.admin_msg(
+          f'{display(ctx.author)} set the channel parallelism to {count}.'
+          f' (was `{the_count}`)')
+
+  @_admin.command(name='stats')
+  @checks.mod_or_permissions(manage_channels=True)
+  async def admin_stats(self, ctx: commands.Context, action: str = None):
+    """Shows refresh pipeline metrics.
+
+    Use `[p]team admin stats export` for all metrics as a text file in the
+    Prometheus exposition format, or `[p]team admin stats reset` to zero the
+    counters and latencies."""
+    if action == 'export':
+      await ctx.send(file=discord.File(
+          io.BytesIO(self.metrics.export().encode('utf-8')),
+          filename='team_tracker_metrics.txt'))
+    elif action == 'reset':
+      self.metrics.reset()
+      await ctx.send('Team tracker metrics reset.')
+    else:
+      for page in pagify('\n'.join(self.metrics.summary())):
+        await ctx.send(page)
+
   async def admin_msg(self, message):
-    """Sends a message to all admin channels."""
-    for channel in self.admin_channels.values():
-      if channel:
-        await channel.send(message)
+    """Queues a message for all admin channels; see AdminLog."""
+    self.admin_log.post(message)
 
   ######## Data management helper functions/utilities
 
@@ -951,26 +1289,40 @@ class TeamTracker(commands.Cog):
   async def _prefix(self):
     return (await self.bot._prefix_cache.get_prefixes())[0]
 
-  async def _modulus(self, user: discord.User = None, user_id: int = None):
-    if not user:
-      user = self.bot.get_user(user_id)
-      if user is None:
-        return
-    modulus = await self.config.user(user).refresh_modulus()
-    if modulus == -1:
-      modulus = random.randint(0, 6)
-      await self.config.user(user).refresh_modulus.set(modulus)
-    return modulus
-
-  async def _user_update_threshold(self, user_config: dict):
-    """Minimum number of seconds after which a user update should be requested."""
-    return 30.0 * user_config['backoff_factor']
+  async def _set_user_state(self, user_id: int, **fields):
+    """Sets user config fields, mirroring refresh-related ones in memory."""
+    self.user_table.update(user_id, **{
+        field: value for field, value in fields.items()
+        if field in UserState.FIELDS})
+    await self.writes.set_user(user_id, **fields)
+
+  async def _get_user_field(self, user_id: int, field: str):
+    """Reads a user config field, including changes not yet flushed."""
+    value = self.writes.pending_user_field(user_id, field)
+    if value is WriteBuffer.MISSING:
+      value = await self.config.user_from_id(user_id).get_raw(field)
+    return value
+
+  async def _get_users_field(self, user_ids: List[int], field: str) -> list:
+    """Reads a user config field for many users, with at most one Config read."""
+    values = [self.writes.pending_user_field(user_id, field)
+              for user_id in user_ids]
+    missing = [idx for idx, value in enumerate(values)
+               if value is WriteBuffer.MISSING]
+    if len(missing) == 1:
+      values[missing[0]] = await self._get_user_field(user_ids[missing[0]], field)
+    elif missing:
+      all_users = await self.config.all_users()
+      for idx in missing:
+        values[idx] = all_users.get(user_ids[idx], {}).get(
+            field, DEFAULT_USER_SETTINGS[field])
+    return values
 
   async def _increment_user_backoff(self, user: discord.User):
-    team_id = await self.config.user(user).team_id()
-    backoff = await self.config.user(user).backoff_factor()
-    new_backoff = min(backoff * 1.2, 10 if team_id == -1 else 40)
-    await self.config.user(user).backoff_factor.set(new_backoff)
+    state = self.user_table.get(user.id)
+    backoff = state.backoff_factor
+    new_backoff = min(backoff * 1.2, 10 if state.team_id == -1 else 40)
+    await self._set_user_state(user.id, backoff_factor=new_backoff)
     return backoff, new_backoff
 
   async def _token(self, user: discord.User = None, user_id: int = None):
@@ -980,21 +1332,43 @@ class TeamTracker(commands.Cog):
     # generate person B's URL and assign them to person A's team.
     if not user:
       user = self.bot.get_user(user_id)
-    hashh = await self.config.user(user).digest()
+    hashh = await self._get_user_field(user.id, 'digest')
     if hashh is None:
-      salt = await self.config.user(user).secret()
+      salt = await self._get_user_field(user.id, 'secret')
       if salt is None:
         salt = random_salt()
-        await self.config.user(user).secret.set(salt)
+        await self._set_user_state(user.id, secret=salt)
       hashh = digest(user.id, salt)
-      await self.config.user(user).digest.set(hashh)
-      await self.config.set_raw('undigest', hashh, value=user.id)
+      self._index_digest_when_saved(user.id, hashh)
+      await self._set_user_state(user.id, digest=hashh)
     return hashh
 
-  async def _user_id_from_digest(self, hashh):
-    return await self.config.get_raw('undigest', hashh, default=None)
-
-  async def _register_url(self):
+  async def _tokens(self, users: List[discord.User]) -> List[str]:
+    """Gets secret tokens for many users, creating any that are missing.
+
+    New tokens are saved along with the other buffered writes, and only added
+    to the digest index once they have been."""
+    user_ids = [user.id for user in users]
+    hashes = await self._get_users_field(user_ids, 'digest')
+    salts = await self._get_users_field(user_ids, 'secret')
+    for idx, (user_id, hashh, salt) in enumerate(zip(user_ids, hashes, salts)):
+      if hashh is None:
+        salt = salt or random_salt()
+        hashes[idx] = hashh = digest(user_id, salt)
+        self._index_digest_when_saved(user_id, hashh)
+        await self._set_user_state(user_id, secret=salt, digest=hashh)
+    return hashes
+
+  def _index_digest_when_saved(self, user_id: int, hashh: str):
+    """Adds a new digest to the digest index once it is saved in Config, so
+    that the index never points at a digest Config doesn't have."""
+    def index():
+      # Unless the user's digest was changed again, e.g. they left their team
+      if self.writes.pending_user_field(user_id, 'digest') == hashh:
+        self.digests.add(hashh, user_id)
+    self.writes.when_flushed(index)
+
+  async def _server_endpoint(self, endpoint: str):
     url = await self.config.server_url()
     if not url:
       prefix = await self._prefix()
@@ -1002,27 +1376,19 @@ class TeamTracker(commands.Cog):
           'Team server URL is not set. Use '
           f'`{prefix}team admin server_url <url>` to set it.')
       raise MissingCogSettingException('server_url is unset')
-    return os.path.join(url, 'register_discord')
+    return os.path.join(url, endpoint)
+
+  async def _register_url(self):
+    return await self._server_endpoint('register_discord')
 
   async def _update_url(self):
-    url = await self.config.server_url()
-    if not url:
-      prefix = await self._prefix()
-      await self.admin_msg(
-          'Team server URL is not set. Use '
-          f'`{prefix}team admin server_url <url>` to set it.')
-      raise MissingCogSettingException('server_url is unset')
-    return os.path.join(url, 'lookup_discord')
+    return await self._server_endpoint('lookup_discord')
+
+  async def _batch_update_url(self):
+    return await self._server_endpoint('lookup_discord_batch')
 
   async def _removal_url(self):
-    url = await self.config.server_url()
-    if not url:
-      prefix = await self._prefix()
-      await self.admin_msg(
-          'Team server URL is not set. Use '
-          f'`{prefix}team admin server_url <url>` to set it.')
-      raise MissingCogSettingException('server_url is unset')
-    return os.path.join(url, 'remove_discord')
+    return await self._server_endpoint('remove_discord')
 
   async def _load_guild(self,
                         guild: discord.Guild = None,
@@ -1107,6 +1473,27 @@ class TeamTracker(commands.Cog):
     await self.config.guild(guild).admin_channel.set(0)
     self.admin_channels[guild.id] = None
 
+  @staticmethod
+  def _cron_lag(scheduler: RefreshScheduler) -> float:
+    """How many seconds the most overdue job in `scheduler` is overdue by."""
+    next_due = scheduler.next_due()
+    if next_due is None:
+      return 0.0
+    return max(time.time() - next_due, 0.0)
+
+  def _track_team(self, team: TeamData):
+    """Adds or refreshes a team in memory, scheduling its next refresh."""
+    self.teams[team.team_id] = team
+    self.team_search_index.add(team.team_id, team.username, team.display_name)
+    self.team_schedule.schedule(
+        team.team_id, team.last_updated + TEAM_REFRESH_INTERVAL)
+
+  def _untrack_team(self, team_id: int):
+    self.teams.pop(team_id, None)
+    self.team_search_index.remove(team_id)
+    self.views.invalidate(team_id)
+    self.team_schedule.unschedule(team_id)
+
   async def _get_team_data(self, team_id):
     # Raises KeyError from get_raw if team_id is not a recognized team ID
     data = await self.config.get_raw('teams', team_id)
@@ -1114,11 +1501,81 @@ class TeamTracker(commands.Cog):
       return None
     return await TeamData.read(self.bot, data)
 
+  async def _get_user(self, user_id: int):
+    return self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+
+  async def _batch_size(self):
+    """Number of teams or users per bulk lookup, or None if not batching."""
+    if self._bulk_unsupported:
+      return None
+    batch_size = await self.config.batch_size()
+    return batch_size if batch_size > 1 else None
+
+  async def _lookup_batch(self, team_ids: List[int] = (),
+                          user_hashes: List[str] = ()):
+    """Looks up many teams and/or users in a single request.
+
+    Returns the response data, or None if the lookup failed. If it failed
+    because the hunt server has no bulk endpoint, bulk lookups are also turned
+    off until the batch size is set again."""
+    url = await self._batch_update_url()
+    payload = {
+        'auth': await self.config.secret(),
+        'team_ids': list(team_ids),
+        'user_ids': list(user_hashes),
+    }
+
+    response = await self.hunt_client.post_json(url, payload)
+    if response.status_code in (404, 405):
+      log.warning('Hunt server does not support bulk lookups; falling back to'
+                  ' one request per team or user.')
+      self._bulk_unsupported = True
+      return None
+    if response.status_code != 200:
+      await self.admin_msg(
+          f'Attempt to refresh data for {len(team_ids)} team{nl.s(len(team_ids))}'
+          f' and {len(user_hashes)} user{nl.s(len(user_hashes))} failed with'
+          f' error {response.status_code}: {response.text}')
+      return None
+    return response.json()
+
+  async def _update_users(self, users: List[discord.User] = (),
+                          user_ids: List[int] = ()):
+    """Refreshes many users, batching their lookups where possible."""
+    fetched = await asyncio.gather(
+        *[self._get_user(user_id) for user_id in user_ids],
+        return_exceptions=True)
+    users = list(users) + [user for user in fetched
+                           if not isinstance(user, Exception)]
+    batch_size = await self._batch_size()
+    if batch_size is None:
+      await asyncio.gather(
+          *[self._update_user(user=user) for user in users],
+          return_exceptions=True)
+      return
+    await asyncio.gather(
+        *[self._update_user_batch(users[idx:idx + batch_size])
+          for idx in range(0, len(users), batch_size)],
+        return_exceptions=True)
+
+  async def _update_user_batch(self, users: List[discord.User]):
+    user_hashes = await asyncio.gather(*[self._token(user) for user in users])
+    data = await self._lookup_batch(user_hashes=user_hashes)
+    if data is None:
+      if self._bulk_unsupported:
+        await asyncio.gather(
+            *[self._update_user(user=user) for user in users],
+            return_exceptions=True)
+      return
+    results = data.get('users', {})
+    await asyncio.gather(
+        *[self._apply_user_data(user, results.get(user_hash, {'success': False}))
+          for user, user_hash in zip(users, user_hashes)],
+        return_exceptions=True)
+
   async def _update_user(self, user: discord.User = None, user_id: int = None):
     if user is None:
       user = await self.bot.fetch_user(user_id)
-    original_team_id = await self.config.user(user).team_id()
-    backoff_factor = await self.config.user(user).backoff_factor()
 
     url = await self._update_url()
     params = {
@@ -1126,19 +1583,22 @@ class TeamTracker(commands.Cog):
         'user_id': await self._token(user),
     }
 
-    response = requests.get(url, params=params)
+    response = await self.hunt_client.get(url, params=params)
     if response.status_code != 200:
       await self.admin_msg(
           'Attempt to refresh user data failed with error'
           f' {response.status_code}: {response.text}')
       return
-    data = response.json()
+    await self._apply_user_data(user, response.json())
+
+  async def _apply_user_data(self, user: discord.User, data: dict):
+    """Applies a hunt server lookup result for a single user."""
+    original_team_id = self.user_table.get(user.id).team_id
 
     if not data['success']:
       # User ID is completely unknown to hunt DB. Don't update last_updated so
       # that this user might get picked on the next go
-      log.warning(f'Attempt to get team affiliation for {display(user)}'
-                  f' failed at URL {response.url}')
+      log.warning(f'Attempt to get team affiliation for {display(user)} failed')
       await self._increment_user_backoff(user)
       return
 
@@ -1149,20 +1609,20 @@ class TeamTracker(commands.Cog):
           'display_name': data['team'][2],
           'username': data['team'][3]
       })
-      await team_data.write(self.config)
-      self.teams[team_id] = team_data
+      await self.writes.mark_team(team_data)
+      self._track_team(team_data)
     else:
       team_data = self.teams[team_id]
 
     if original_team_id != team_id:
       log.info(f'Changing team ID for {display(user)}')
-      old_team = self.teams.get(await self.config.user(user).team_id(), None)
+      old_team = self.teams.get(original_team_id, None)
       if old_team:
         await self._remove_user_from_team(user, old_team)
       await self._add_user_to_team(user, team_data)
     else:
       old_backoff, new_backoff = await self._increment_user_backoff(user)
-      await self.config.user(user).last_updated.set(time.time())
+      await self._set_user_state(user.id, last_updated=time.time())
 
   async def _forget_user(self, user: discord.User = None, user_id: int = None):
     if user is None:
@@ -1174,7 +1634,7 @@ class TeamTracker(commands.Cog):
         'user_id': await self._token(user),
     }
 
-    response = requests.get(url, params=params)
+    response = await self.hunt_client.get(url, params=params)
     if response.status_code != 200:
       await self.admin_msg(
           'Attempt to refresh user data failed with error'
@@ -1188,12 +1648,42 @@ class TeamTracker(commands.Cog):
       log.warning(f'Attempt to remove user data for {display(user)}'
                   f' failed at URL {response.url}; continuing anyway')
 
-    team = self.teams.get(await self.config.user(user).team_id(), None)
+    team = self.teams.get(self.user_table.get(user.id).team_id, None)
     if team is not None:
       await self._remove_user_from_team(user, team)
-    await self.config.user(user).clear()
+    await self.writes.clear_user(user.id)
+    self.user_table.remove(user.id)
 
 
+  async def _update_teams(self, teams: List[TeamData]):
+    """Refreshes many teams, batching their lookups where possible."""
+    batch_size = await self._batch_size()
+    if batch_size is None:
+      await asyncio.gather(
+          *[self._update_team(team=team) for team in teams],
+          return_exceptions=True)
+      return
+    await asyncio.gather(
+        *[self._update_team_batch(teams[idx:idx + batch_size])
+          for idx in range(0, len(teams), batch_size)],
+        return_exceptions=True)
+
+  async def _update_team_batch(self, teams: List[TeamData]):
+    data = await self._lookup_batch(team_ids=[team.team_id for team in teams])
+    if data is None:
+      if self._bulk_unsupported:
+        await asyncio.gather(
+            *[self._update_team(team=team) for team in teams],
+            return_exceptions=True)
+      return
+    results = data.get('teams', {})
+    await asyncio.gather(
+        *[self._apply_team_data(
+            team.team_id, results.get(str(team.team_id), {'success': False}),
+            team=team)
+          for team in teams],
+        return_exceptions=True)
+
   async def _update_team(self, team: TeamData = None, team_id: int = None):
     if team is None:
       if team_id not in self.teams:
@@ -1207,19 +1697,23 @@ class TeamTracker(commands.Cog):
         'team_id': team_id or team.team_id,
     }
 
-    response = requests.get(await self._update_url(), params=params)
+    response = await self.hunt_client.get(await self._update_url(), params=params)
     if response.status_code != 200:
       await self.admin_msg(
           f'Attempt to refresh team data for {params["team_id"]} failed with '
           f'error {response.status_code}: {response.text}')
-      del self.teams[params['team_id']]
+      self._untrack_team(params['team_id'])
       return
-    data = response.json()
+    await self._apply_team_data(params['team_id'], response.json(), team=team)
+
+  async def _apply_team_data(self, team_id: int, data: dict,
+                             team: TeamData = None):
+    """Applies a hunt server lookup result for a single team."""
     if not data['success']:
       await self.admin_msg(
-          f'Attempt to refresh team data for {params["team_id"]} failed;'
+          f'Attempt to refresh team data for {team_id} failed;'
           ' there might not be any Discord accounts bound to it.')
-      del self.teams[params['team_id']]
+      self._untrack_team(team_id)
       return
 
     if team is None:
@@ -1228,16 +1722,13 @@ class TeamTracker(commands.Cog):
           'display_name': data['team'][2],
           'username': data['team'][3]
       })
-      await team_data.write(self.config)
-      self.teams[team_id] = team_data
+      await self.writes.mark_team(team_data)
       team = team_data
+    team.last_updated = time.time()
+    self._track_team(team)
 
-    team.users = [user for user in team.users if user is not None]
-
-    original_users = set(user.id for user in team.users)
-    updated_users = set()
-    for user_hash in data['user_ids']:
-      updated_users.add(await self._user_id_from_digest(user_hash))
+    original_users = set(team.user_ids)
+    updated_users = set(self.digests.get_many(data['user_ids']))
     updated_users.discard(None)
     ids_to_add = list(updated_users - original_users)
     users_to_add = await asyncio.gather(
@@ -1274,40 +1765,55 @@ class TeamTracker(commands.Cog):
       await self.admin_msg('\n'.join(message))
 
   async def _add_user_to_team(self, user: discord.User, team: TeamData):
-    if user in team.users:
+    if user.id in team.user_ids:
       log.debug(f'User {display(user)} is already on {team.username}.')
       return
-    team.users.append(user)
-    await team.write(self.config)
+    team.user_ids.add(user.id)
+    self.membership.add(user.id, team.team_id)
+    self.views.invalidate(team.team_id)
+    await self.writes.mark_team(team)
 
-    await self.config.user(user).team_id.set(team.team_id)
-    await self.config.user(user).backoff_factor.set(4.0)
-    await self.config.user(user).last_updated.set(time.time())
+    await self._set_user_state(user.id, team_id=team.team_id,
+                               backoff_factor=4.0, last_updated=time.time())
 
-    for channel in team.channels:
-      await self._permit_user_in_channel(
-          user, channel, f'Adding {user.name} to {team.username}')
+    await self._apply_in_team_channels(
+        user, team, TEAMMATE_PERM, f'Adding {user.name} to {team.username}')
 
   async def _remove_user_from_team(self, user: discord.User, team: TeamData):
-    if user not in team.users:
+    if user.id not in team.user_ids:
       log.debug(f'User {display(user)} is not on {team.username}.')
       return
-    team.users.remove(user)
-    await team.write(self.config)
-
-    old_digest = await self.config.user(user).digest()
-    async with self.config.undigest() as undigest:
-      if old_digest in undigest:
-        del undigest[old_digest]
-    await self.config.user(user).team_id.set(-1)
-    await self.config.user(user).secret.set(None)
-    await self.config.user(user).digest.set(None)
-    await self.config.user(user).backoff_factor.set(2.0)
-    await self.config.user(user).last_updated.set(time.time())
-
-    for channel in team.channels:
-      await self._forbid_user_in_channel(
-          user, channel, f'Removing {user.name} from {team.username}')
+    team.user_ids.discard(user.id)
+    self.membership.remove(user.id, team.team_id)
+    self.views.invalidate(team.team_id)
+    await self.writes.mark_team(team)
+
+    old_digest = await self._get_user_field(user.id, 'digest')
+    if old_digest is not None:
+      self.digests.remove(old_digest)
+    await self._set_user_state(user.id, team_id=-1, secret=None, digest=None,
+                               backoff_factor=2.0, last_updated=time.time())
+
+    await self._apply_in_team_channels(
+        user, team, DEFAULT_PERM, f'Removing {user.name} from {team.username}')
+
+  async def _apply_in_team_channels(self, user: discord.User, team: TeamData,
+                                    overwrite: discord.PermissionOverwrite,
+                                    reason: str):
+    """Sets `overwrite` for `user` in all of `team`'s channels at once.
+
+    Goes through the PermissionEngine, like whole-team changes, so that these
+    edits are bounded, retried, and serialized with others to each channel."""
+    results = await asyncio.gather(*[
+        self.permissions.apply(
+            channel, [channel.guild.get_member(user.id)], overwrite,
+            reason=reason)
+        for channel in team.channels if channel is not None],
+                                   return_exceptions=True)
+    for result in results:
+      if isinstance(result, Exception):
+        log.error(f'Could not update {display(user)} in a channel of'
+                  f' {team.username}: {result!r}')
 
   async def _get_or_create_team_category(self, guild: discord.Guild):
     category_id = await self.config.guild(guild).teams_category()
@@ -1338,47 +1844,149 @@ class TeamTracker(commands.Cog):
         raise
 
 
-  async def _create_team_text_channel(
-      self, name: str, guild: discord.Guild, *teams: TeamData):
-    team_category = await self._get_or_create_team_category(guild)
+  async def _base_channel_overwrites(self, guild: discord.Guild):
+    """The permission overwrites every team channel in `guild` starts from."""
     participant_role = await self._get_or_create_participant_role(guild)
     permission_overwrites = {
         guild.default_role: DEFAULT_PERM,  # none
         guild.get_member(self.bot.user.id): MOD_PERM,  # all
         participant_role: PARTICIPANT_PERM,
     }
-    mod_roles = [guild.get_role(role_id)
-                 for role_id in await self.bot._config.guild(guild).mod_role()]
-    for role in mod_roles:
-      permission_overwrites[role] = MOD_PERM
-
-    channel = await team_category.create_text_channel(
-        name, overwrites=permission_overwrites)
-    await asyncio.gather(
-        *[self._permit_team_in_channel(team, channel) for team in teams],
-        return_exceptions=True)
+    for role_id in await self.bot._config.guild(guild).mod_role():
+      role = guild.get_role(role_id)
+      if role is not None:
+        permission_overwrites[role] = MOD_PERM
+    return permission_overwrites
+
+  def _team_channel_overwrites(self, base: dict, members_by_team: dict,
+                               *teams: TeamData):
+    """The complete permission overwrites for a channel shared by `teams`."""
+    permission_overwrites = dict(base)
+    for team in teams:
+      for member in members_by_team.get(team.team_id, []):
+        permission_overwrites[member] = TEAMMATE_PERM
+    return permission_overwrites
+
+  async def _create_team_channel(
+      self, kind: str, name: str, category: discord.CategoryChannel,
+      overwrites: dict, *teams: TeamData):
+    if kind == 'text':
+      create = self.permissions.create_text_channel
+    else:
+      create = self.permissions.create_voice_channel
+    channel = await create(
+        category, name, overwrites,
+        reason='Adding %s' % ', '.join(team.username for team in teams))
+    await self._record_team_channel(channel, *teams)
     return channel
 
-  async def _create_team_voice_channel(
-      self, name: str, guild: discord.Guild, *teams: TeamData):
-    team_category = await self._get_or_create_team_category(guild)
-    participant_role = await self._get_or_create_participant_role(guild)
-    permission_overwrites = {
-        guild.default_role: DEFAULT_PERM,  # none
-        guild.get_member(self.bot.user.id): MOD_PERM,  # all
-        participant_role: PARTICIPANT_PERM,
-    }
-    mod_roles = [guild.get_role(role_id)
-                 for role_id in await self.bot._config.guild(guild).mod_role()]
-    for role in mod_roles:
-      permission_overwrites[role] = MOD_PERM
+  async def _record_team_channel(self, channel: discord.abc.GuildChannel,
+                                 *teams: TeamData):
+    for team in teams:
+      if channel not in team.channels:
+        team.channels.append(channel)
+        self.views.invalidate(team.team_id)
+        await self.writes.mark_team(team)
+
+  async def _start_channel_batch(self, ctx: commands.Context,
+                                 channel_type: str, groups: List[List[int]]):
+    if await self.config.guild(ctx.guild).channel_batch() is not None:
+      my_prefix = await self._prefix()
+      await ctx.send('There is already an unfinished channel batch in this'
+                     f' server. Use `{my_prefix}team channel resume` to finish'
+                     f' it, or `{my_prefix}team channel resume discard` to'
+                     ' abandon it.')
+      return
+    batch = ChannelBatch.plan(channel_type, groups,
+                              [random_channel_name() for group in groups])
+    await self._run_channel_batch(ctx, batch)
+
+  async def _run_channel_batch(self, ctx: commands.Context, batch: ChannelBatch):
+    """Creates the channels of `batch` that don't exist yet, several at a time.
+
+    The batch is saved to guild config as it goes, so that if this fails
+    partway, `[p]team channel resume` can pick up where it left off."""
+    guild = ctx.guild
+    if guild.id in self._running_batches:
+      await ctx.send('A channel batch is already running in this server.')
+      return
+    self._running_batches.add(guild.id)
+    progress = ProgressMessage(ctx.channel)
+    errors = []
+
+    async def save():
+      await self.config.guild(guild).channel_batch.set(
+          None if batch.done() else batch.serialize())
+
+    async def build(index: int, category: discord.CategoryChannel):
+      teams = [self.teams[team_id] for team_id in batch.groups[index]
+               if team_id in self.teams]
+      overwrites = self._team_channel_overwrites(base, members_by_team, *teams)
+      kinds = batch.missing(index)
+      results = await asyncio.gather(*[
+          self._create_team_channel(kind, batch.names[index], category,
+                                    overwrites, *teams)
+          for kind in kinds], return_exceptions=True)
+      for kind, result in zip(kinds, results):
+        if isinstance(result, Exception):
+          errors.append(result)
+        else:
+          batch.created.setdefault(index, {})[kind] = result.id
+      await progress.update(batch.progress())
 
-    channel = await team_category.create_voice_channel(
-        name, overwrites=permission_overwrites)
-    await asyncio.gather(
-        *[self._permit_team_in_channel(team, channel) for team in teams],
-        return_exceptions=True)
-    return channel
+    try:
+      await progress.update(batch.progress(), force=True)
+      await save()
+      base = await self._base_channel_overwrites(guild)
+      members_by_team = self.membership.members_by_team(guild)
+      assignments = await self._assign_batch_categories(guild, batch)
+      await save()
+      await asyncio.gather(*[build(index, category)
+                             for index, category in assignments])
+    finally:
+      self._running_batches.discard(guild.id)
+      await save()
+
+    if batch.done():
+      await progress.update(batch.progress() + ' Done!', force=True)
+    else:
+      log.error(f'Channel batch in {guild.name} had errors: {errors}')
+      await progress.update(
+          batch.progress() + f' {len(errors)} channels could not be created;'
+          f' use `{await self._prefix()}team channel resume` to try again.',
+          force=True)
+
+  async def _assign_batch_categories(self, guild: discord.Guild,
+                                     batch: ChannelBatch):
+    """Pairs each pending group of `batch` with a category that has room for it.
+
+    Groups go in the team category while it has room, then in the batch's own
+    overflow categories, which are created as needed (all at once)."""
+    width = len(batch.kinds)
+    categories = [await self._get_or_create_team_category(guild)]
+    categories.extend(category for category in map(guild.get_channel, batch.categories)
+                      if category is not None)
+    room = [(CATEGORY_LIMIT - len(category.channels)) // width
+            for category in categories]
+    pending = batch.pending()
+    short = len(pending) - sum(max(slots, 0) for slots in room)
+    if short > 0:
+      per_category = CATEGORY_LIMIT // width
+      new_categories = await asyncio.gather(*[
+          self.permissions.create_category(
+              guild, f'Team Channels {len(categories) + i + 1}',
+              reason='Overflow category for team channels')
+          for i in range(-(-short // per_category))])
+      batch.categories.extend(category.id for category in new_categories)
+      categories.extend(new_categories)
+      room.extend(per_category for category in new_categories)
+
+    assignments = []
+    slots = iter([category for category, count in zip(categories, room)
+                  for i in range(count)])
+    for index in pending:
+      assignments.append((index, next(slots)))
+    return assignments
 
   ## NOTE: Channels will be created such that users have all the necessary
   ## permissions EXCEPT being able to see the channel. This means that
@@ -1397,68 +2005,38 @@ class TeamTracker(commands.Cog):
         users.append(self.bot.get_user(user_id))
     return members, users
 
-  async def _permit_user_in_channel(self, user: discord.User,
-                                    channel: discord.abc.GuildChannel,
-                                    reason: str = None):
-    guild = channel.guild
-    member = guild.get_member(user.id)
-    if member is None:
-      # User is not in the guild containing the channel
-      return
-    await self._permit_member_in_channel(member, channel, reason=reason)
-
-
-  async def _permit_member_in_channel(self, member: discord.Member,
-                                      channel: discord.abc.GuildChannel,
-                                      reason: str = None):
-    try:
-      await channel.set_permissions(member, overwrite=TEAMMATE_PERM,
-                                    reason=reason)
-    except Exception as e:
-      log.error(str(e))
-      log.error("DEAD")
-
-
-  async def _forbid_user_in_channel(self, user: discord.User,
-                                    channel: discord.abc.GuildChannel,
-                                    reason: str = None):
-    guild = channel.guild
-    member = guild.get_member(user.id)
-    if member is None:
-      # User is not in the guild containing the channel
+  async def _permit_teams_in_channel(self, channel: discord.abc.GuildChannel,
+                                     *teams: TeamData):
+    teams = [team for team in teams if channel not in team.channels]
+    if not teams:
       return
-    await self._forbid_member_in_channel(member, channel, reason=reason)
-
-  async def _forbid_member_in_channel(self, member: discord.Member,
-                                      channel: discord.abc.GuildChannel,
-                                      reason: str = None):
-    await channel.set_permissions(member, overwrite=DEFAULT_PERM,
-                                  reason=reason)
-
-  async def _permit_team_in_channel(self, team: TeamData,
-                                    channel: discord.abc.GuildChannel):
-    if channel in team.channels:
+    await self._record_team_channel(channel, *teams)
+
+    members_by_team = self.membership.members_by_team(channel.guild)
+    await self.permissions.apply(
+        channel,
+        [member for team in teams
+         for member in members_by_team.get(team.team_id, [])],
+        TEAMMATE_PERM,
+        reason='Adding %s' % ', '.join(team.username for team in teams))
+
+  async def _forbid_teams_in_channel(self, channel: discord.abc.GuildChannel,
+                                     *teams: TeamData):
+    teams = [team for team in teams if channel in team.channels]
+    if not teams:
       return
-    team.channels.append(channel)
-    await team.write(self.config)
-
-    await asyncio.gather(*[
-        self._permit_user_in_channel(
-            channel.guild.get_member(user.id),
-            channel, f'Adding {team.username}')
-        for user in team.users
-    ])
-
-  async def _forbid_team_in_channel(self, team: TeamData,
-                                    channel: discord.abc.GuildChannel):
-    if channel not in team.channels:
-      return
-    team.channels.remove(channel)
-    await team.write(self.config)
-
-    await asyncio.gather(*[
-        self._forbid_user_in_channel(user, channel, f'Removing {team.username}')
-        for user in team.users])
+    for team in teams:
+      team.channels.remove(channel)
+      self.views.invalidate(team.team_id)
+      await self.writes.mark_team(team)
+
+    members_by_team = self.membership.members_by_team(channel.guild)
+    await self.permissions.apply(
+        channel,
+        [member for team in teams
+         for member in members_by_team.get(team.team_id, [])],
+        DEFAULT_PERM,
+        reason='Removing %s' % ', '.join(team.username for team in teams))
 
   ## DEBUG, delete before final deploy
 
@@ -0,0 +1,131 @@
+"""Tests for the digest index's append-only log."""
+
+import pytest
+
+from . import digest_index
+from .digest_index import DigestIndex
+from .fake_discord import FakeUser
+
+
+def log_lines(index):
+  return index.path.read_text(encoding='utf-8').splitlines()
+
+
+def reopened(index):
+  index.close()
+  other = DigestIndex(index.path.parent)
+  other.load()
+  return other
+
+
+def test_load_replays_additions_and_removals(tmp_path):
+  (tmp_path / digest_index.LOG_NAME).write_text(
+      '+ aaaa 1\n'
+      '+ bbbb 2\n'
+      '- aaaa\n'
+      '+ cccc 3\n'
+      '+ bbbb 4\n'  # a later addition replaces an earlier one
+      '- zzzz\n',  # removing a missing digest is harmless
+      encoding='utf-8')
+  index = DigestIndex(tmp_path)
+  index.load()
+  assert index.undigest == {'bbbb': 4, 'cccc': 3}
+  assert index.get_many(['aaaa', 'bbbb', 'cccc']) == [None, 4, 3]
+
+
+def test_changes_are_appended_and_survive_reopening(tmp_path):
+  index = DigestIndex(tmp_path)
+  index.load()
+  index.add('aaaa', 1)
+  index.add('aaaa', 1)  # unchanged, so not logged again
+  index.add('bbbb', 2)
+  index.remove('aaaa')
+  index.remove('aaaa')  # already gone, so not logged again
+  assert log_lines(index) == ['+ aaaa 1', '+ bbbb 2', '- aaaa']
+  assert reopened(index).undigest == {'bbbb': 2}
+
+
+def test_malformed_lines_are_skipped_and_compacted_away(tmp_path):
+  (tmp_path / digest_index.LOG_NAME).write_text(
+      '+ aaaa 1\n'
+      '+ bbbb two\n'
+      '+ cccc 3',  # torn by a crash before its newline
+      encoding='utf-8')
+  index = DigestIndex(tmp_path)
+  index.load()
+  assert index.undigest == {'aaaa': 1}
+  assert log_lines(index) == ['+ aaaa 1']
+
+
+def test_log_is_compacted_past_twice_the_live_size(tmp_path, monkeypatch):
+  monkeypatch.setattr(digest_index, 'MIN_COMPACT_LINES', 4)
+  index = DigestIndex(tmp_path)
+  index.load()
+  index.add('aaaa', 1)
+  index.add('bbbb', 2)
+  index.remove('aaaa')
+  index.add('aaaa', 1)
+  # Four lines for two entries is not yet more than twice the live size
+  assert len(log_lines(index)) == 4
+  index.remove('aaaa')
+  assert log_lines(index) == ['+ bbbb 2']
+  assert not (tmp_path / 'undigest.tmp').exists()
+
+
+def test_log_is_not_compacted_below_the_minimum(tmp_path, monkeypatch):
+  monkeypatch.setattr(digest_index, 'MIN_COMPACT_LINES', 10)
+  index = DigestIndex(tmp_path)
+  index.load()
+  for _ in range(4):
+    index.add('aaaa', 1)
+    index.remove('aaaa')
+  assert len(log_lines(index)) == 8
+  assert not index.undigest
+
+
+def test_reopening_after_compaction(tmp_path, monkeypatch):
+  monkeypatch.setattr(digest_index, 'MIN_COMPACT_LINES', 4)
+  index = DigestIndex(tmp_path)
+  index.load()
+  for user_id in range(3):
+    index.add(f'user{user_id}', user_id)
+  for user_id in range(2):
+    index.remove(f'user{user_id}')
+  index.add('user1', 11)
+  assert log_lines(index) == ['+ user2 2', '+ user1 11']
+
+  # Appends after compaction go to the new log, not the replaced one
+  index.add('user3', 3)
+  index.remove('user2')
+  other = reopened(index)
+  assert other.undigest == {'user1': 11, 'user3': 3}
+  other.add('user4', 4)
+  assert reopened(other).undigest == {'user1': 11, 'user3': 3, 'user4': 4}
+
+
+def test_load_seeds_a_missing_log_from_legacy_config(tmp_path):
+  index = DigestIndex(tmp_path)
+  index.load(legacy={'aaaa': '1', 'bbbb': '2'})
+  assert index.undigest == {'aaaa': 1, 'bbbb': 2}
+  assert reopened(index).undigest == {'aaaa': 1, 'bbbb': 2}
+
+
+@pytest.mark.asyncio
+async def test_new_tokens_are_indexed_once_saved(tracker, monkeypatch):
+  user = FakeUser('user')
+  tracker.bot.add_user(user)
+  hashh = await tracker._token(user)
+  assert hashh not in tracker.digests
+
+  def broken_custom(*args, **kwargs):
+    raise OSError('disk full')
+
+  monkeypatch.setattr(tracker.config, 'custom', broken_custom)
+  with pytest.raises(OSError):
+    await tracker.writes.flush()
+  assert hashh not in tracker.digests
+
+  monkeypatch.undo()
+  await tracker.writes.flush()
+  assert tracker.digests.get(hashh) == user.id
+  assert await tracker.config.user(user).digest() == hashh
@@ -0,0 +1,37 @@
+"""Tests for the hunt server client, run against the local stand-in server."""
+
+import os
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_single_lookup(server, client):
+  response = await client.get(os.path.join(server.base_url, 'lookup_discord'),
+                              params={'auth': 'hunter2', 'user_id': 'aaaa'})
+  assert response.status_code == 200
+  assert response.json() == {'success': True,
+                             'team': [7, None, 'Team Seven', 'seven']}
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_is_one_request(server, client):
+  response = await client.post_json(
+      os.path.join(server.base_url, 'lookup_discord_batch'),
+      {'auth': 'hunter2', 'team_ids': [7, 8, 9],
+       'user_ids': ['aaaa', 'cccc', 'zzzz']})
+  data = response.json()
+  assert data['teams']['7']['user_ids'] == ['aaaa', 'bbbb']
+  assert data['teams']['8']['user_ids'] == ['cccc']
+  assert not data['teams']['9']['success']
+  assert data['users']['cccc']['team'][0] == 8
+  assert not data['users']['zzzz']['success']
+  assert server.requests == {'lookup_discord_batch': 1}
+
+
+@pytest.mark.asyncio
+async def test_bad_auth_is_rejected(server, client):
+  response = await client.post_json(
+      os.path.join(server.base_url, 'lookup_discord_batch'),
+      {'auth': 'wrong', 'team_ids': [7]})
+  assert response.status_code == 403
@@ -0,0 +1,78 @@
+"""Tests for the refresh pipeline's metrics and their Prometheus export."""
+
+from .metrics import Histogram, Metrics
+
+
+def test_histogram_buckets_are_upper_bounds():
+  histogram = Histogram(buckets=(1, 2, 5))
+  for value in (0.5, 1, 1.5, 4, 4, 9):
+    histogram.observe(value)
+  assert histogram.counts == [2, 1, 2, 1]
+  assert histogram.count == 6
+  assert histogram.mean() == 20 / 6
+  assert histogram.quantile(.3) == 1
+  assert histogram.quantile(.5) == 2
+  assert histogram.quantile(.8) == 5
+  assert histogram.quantile(1) == float('inf')
+  assert Histogram().quantile(.5) == 0.0
+
+
+def test_counters_are_keyed_by_labels():
+  metrics = Metrics()
+  metrics.inc('requests_total', endpoint='lookup')
+  metrics.inc('requests_total', 2, endpoint='lookup')
+  metrics.inc('requests_total', endpoint='batch')
+  metrics.inc('errors_total', kind='http', status=500)
+  assert metrics.counter('requests_total', endpoint='lookup') == 3
+  assert metrics.counter('requests_total', endpoint='batch') == 1
+  assert metrics.counter('requests_total') == 0
+  assert metrics.counter('errors_total', status='500', kind='http') == 1
+
+
+def test_export_is_prometheus_text():
+  metrics = Metrics()
+  metrics.inc('requests_total', 3, endpoint='lookup', status=200)
+  metrics.inc('flushes_total')
+  metrics.observe('request_seconds', 0.003, endpoint='lookup')
+  metrics.observe('request_seconds', 0.2, endpoint='lookup')
+  metrics.observe('request_seconds', 60, endpoint='lookup')
+  metrics.gauge('teams', lambda: 12)
+  metrics.gauge('broken', lambda: 1 / 0)
+  lines = metrics.export().splitlines()
+  assert lines[:2] == [
+      'flushes_total 1',
+      'requests_total{endpoint="lookup",status="200"} 3',
+  ]
+  buckets = [line for line in lines if line.startswith('request_seconds_bucket')]
+  assert buckets[0] == 'request_seconds_bucket{endpoint="lookup",le="0.005"} 1'
+  assert 'request_seconds_bucket{endpoint="lookup",le="0.25"} 2' in buckets
+  assert buckets[-2] == 'request_seconds_bucket{endpoint="lookup",le="10"} 2'
+  assert buckets[-1] == 'request_seconds_bucket{endpoint="lookup",le="+Inf"} 3'
+  counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+  assert counts == sorted(counts)
+  assert 'request_seconds_sum{endpoint="lookup"} 60.203000' in lines
+  assert 'request_seconds_count{endpoint="lookup"} 3' in lines
+  assert lines[-2:] == ['broken 0', 'teams 12']
+  assert metrics.export().endswith('\n')
+
+
+def test_timer_observes_even_on_error():
+  metrics = Metrics()
+  try:
+    with metrics.timer('flush_seconds', scope='users'):
+      raise RuntimeError
+  except RuntimeError:
+    pass
+  with metrics.timer('flush_seconds', scope='users'):
+    pass
+  assert metrics.histograms[('flush_seconds', (('scope', 'users'),))].count == 2
+
+
+def test_reset_keeps_gauges():
+  metrics = Metrics()
+  metrics.inc('requests_total')
+  metrics.observe('request_seconds', 1)
+  metrics.gauge('teams', lambda: 3)
+  metrics.reset()
+  assert metrics.export() == 'teams 3\n'
+  assert metrics.summary()[1:] == ['**Gauges**:', '    teams: 3']
@@ -0,0 +1,113 @@
+"""Tests for lazily paginated team tables and the team view cache."""
+
+import random
+
+import pytest
+
+from .pagination import TablePages, TeamViewCache
+
+
+def paginate_table(lines):
+  """How tables were paginated before TablePages, all pages at once."""
+  pages = []
+  current_page, current_count = [], 0
+  current_page.append("```")
+  current_count += len(current_page[0]) + 1
+  for line in lines:
+    current_page.append(line)
+    current_count += len(line) + 1
+    if current_count > 1500:
+      current_page.append("```")
+      pages.append('\n'.join(current_page))
+      current_page = ["```"]
+      current_count = len(current_page[0]) + 1
+  current_page.append("```")
+  pages.append('\n'.join(current_page))
+  return pages
+
+
+def expected_pages(lines):
+  pages = paginate_table(lines)
+  # The old pagination ended with an empty page when the last row filled one
+  if len(pages) > 1 and pages[-1] == '```\n```':
+    pages.pop()
+  return pages
+
+
+@pytest.mark.parametrize('count', [0, 1, 10, 37, 38, 39, 500])
+def test_pages_break_where_they_used_to(count):
+  lines = [f'{i:>5} | Team {i:<20} | {i % 7} members' for i in range(count)]
+  assert list(TablePages(lines)) == expected_pages(lines)
+
+
+def test_pages_break_where_they_used_to_with_uneven_rows():
+  rng = random.Random(1234)
+  for _ in range(50):
+    lines = ['x' * rng.randrange(1, 400) for _ in range(rng.randrange(60))]
+    assert list(TablePages(lines)) == expected_pages(lines)
+
+
+def test_last_row_filling_a_page_adds_no_empty_page():
+  lines = ['x' * 1500]
+  assert len(paginate_table(lines)) == 2
+  assert list(TablePages(lines)) == ['```\n' + lines[0] + '\n```']
+
+
+def test_pages_are_indexed_like_a_list():
+  lines = ['x' * 700 for _ in range(7)]
+  pages = TablePages(lines)
+  assert len(pages) == 3
+  assert pages[-1] == pages[2]
+  assert pages[1:] == list(pages)[1:]
+  with pytest.raises(IndexError):
+    pages[3]
+
+
+class Renderer(object):
+  """Renders a row per team from `names`, counting what it renders."""
+
+  def __init__(self, names):
+    self.names = names
+    self.rendered = []
+
+  def render_all(self):
+    self.rendered.append('all')
+    return {team_id: self.render(team_id) for team_id in self.names}
+
+  def render(self, team_id):
+    self.rendered.append(team_id)
+    name = self.names.get(team_id, None)
+    return name and f'{team_id}: {name}'
+
+
+def test_table_rows_are_rerendered_only_when_invalidated():
+  renderer = Renderer({2: 'Two', 1: 'One', 3: ''})
+  cache = TeamViewCache()
+  view = lambda: list(cache.table('view', renderer.render_all, renderer.render))
+  assert view() == ['```\n1: One\n2: Two\n```']
+  renderer.rendered.clear()
+  assert view() == ['```\n1: One\n2: Two\n```']
+  assert renderer.rendered == []
+
+  renderer.names.update({1: 'Uno', 3: 'Three'})
+  del renderer.names[2]
+  for team_id in (1, 2, 3):
+    cache.invalidate(team_id)
+  assert view() == ['```\n1: Uno\n3: Three\n```']
+  assert sorted(renderer.rendered) == [1, 2, 3]
+
+
+def test_details_are_dropped_on_invalidation():
+  cache = TeamViewCache()
+  calls = []
+  render = lambda: calls.append(1) or ['page']
+  assert cache.details(7, 1, render) == ['page']
+  assert cache.details(7, 1, render) == ['page']
+  assert cache.details(7, None, render) == ['page']
+  assert len(calls) == 2
+  cache.invalidate(8)
+  cache.details(7, 1, render)
+  assert len(calls) == 2
+  cache.invalidate(7)
+  cache.details(7, 1, render)
+  assert len(calls) == 3
@@ -0,0 +1,48 @@
+"""Tests for refreshing users' teams through bulk and single lookups."""
+
+import pytest
+
+from .fake_discord import FakeUser
+
+
+async def register(tracker, server, guild, count: int):
+  """Adds `count` users to the guild, alternately on teams 7 and 8."""
+  users = []
+  for i in range(count):
+    user = FakeUser(f'user{i}')
+    tracker.bot.add_user(user)
+    guild.add_member(user)
+    server.register(await tracker._token(user), 7 + i % 2)
+    users.append(user)
+  return users
+
+
+def team_ids(tracker, users):
+  return [tracker.user_table.get(user.id).team_id for user in users]
+
+
+@pytest.mark.asyncio
+async def test_users_are_looked_up_in_batches(tracker, server, guild):
+  await tracker.config.batch_size.set(2)
+  users = await register(tracker, server, guild, 5)
+  await tracker._update_users(users=users)
+  assert server.requests == {'lookup_discord_batch': 3}
+  assert team_ids(tracker, users) == [7, 8, 7, 8, 7]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('status', [404, 405])
+async def test_missing_bulk_endpoint_falls_back(tracker, server, guild, status):
+  await tracker.config.batch_size.set(2)
+  server.bulk_status = status
+  users = await register(tracker, server, guild, 5)
+  await tracker._update_users(users=users)
+  assert tracker._bulk_unsupported
+  assert server.requests['lookup_discord'] == 5
+  assert team_ids(tracker, users) == [7, 8, 7, 8, 7]
+
+  # Once the endpoint is known to be missing, it isn't tried again
+  bulk_requests = server.requests['lookup_discord_batch']
+  await tracker._update_users(users=users)
+  assert server.requests['lookup_discord_batch'] == bulk_requests
+  assert server.requests['lookup_discord'] == 10
@@ -0,0 +1,84 @@
+"""Tests for planning and applying bulk role changes."""
+
+import pytest
+
+from . import roles
+from .fake_discord import FakeRole, FakeUser
+from .roles import RolePlan
+
+
+class FlakyEngine(object):
+  """Stands in for a PermissionEngine, failing each member's first `failures`
+  role changes."""
+
+  def __init__(self, failures: dict = None):
+    self.failures = dict(failures or {})
+    self.calls = []
+
+  async def add_roles(self, member, role, reason=None):
+    await self._change(member, 'add', role, reason)
+
+  async def remove_roles(self, member, role, reason=None):
+    await self._change(member, 'remove', role, reason)
+
+  async def _change(self, member, action, role, reason):
+    self.calls.append((member.name, action, role.name, reason))
+    if self.failures.get(member.name, 0):
+      self.failures[member.name] -= 1
+      raise RuntimeError(f'{action} failed for {member.name}')
+
+
+@pytest.fixture
+def no_delay(monkeypatch):
+  monkeypatch.setattr(roles, 'RETRY_ROUND_DELAY', 0)
+
+
+def plan_for(adds, removes):
+  plan = RolePlan(FakeRole('Participant'), reason='admin select')
+  for name in adds:
+    plan.add(FakeUser(name))
+  for name in removes:
+    plan.remove(FakeUser(name))
+  return plan
+
+
+def test_describe():
+  plan = plan_for(['a', 'b', 'c'], ['d'])
+  assert len(plan) == 4
+  assert plan.describe() == '+3 and -1'
+
+
+@pytest.mark.asyncio
+async def test_every_change_is_applied_once(no_delay):
+  plan = plan_for(['a', 'b'], ['c'])
+  engine = FlakyEngine()
+  await plan.apply(engine)
+  assert sorted(engine.calls) == [
+      ('a', 'add', 'Participant', 'admin select'),
+      ('b', 'add', 'Participant', 'admin select'),
+      ('c', 'remove', 'Participant', 'admin select')]
+  assert plan.failed == []
+
+
+@pytest.mark.asyncio
+async def test_failed_changes_get_one_more_round(no_delay):
+  plan = plan_for(['a', 'b'], ['c', 'd'])
+  engine = FlakyEngine({'b': 1, 'c': 1})
+  await plan.apply(engine)
+  names = [name for name, *_ in engine.calls]
+  assert sorted(names[:4]) == ['a', 'b', 'c', 'd']
+  assert sorted(engine.calls[4:]) == [
+      ('b', 'add', 'Participant', 'admin select'),
+      ('c', 'remove', 'Participant', 'admin select')]
+  assert plan.failed == []
+
+
+@pytest.mark.asyncio
+async def test_changes_failing_twice_are_reported(no_delay):
+  plan = plan_for(['a', 'b'], ['c'])
+  engine = FlakyEngine({'a': 5, 'c': 2})
+  await plan.apply(engine)
+  assert len(engine.calls) == 5
+  assert [(member.name, action) for member, action, _ in plan.failed] == [
+      ('a', 'add'), ('c', 'remove')]
+  assert all(isinstance(e, RuntimeError) for _, _, e in plan.failed)
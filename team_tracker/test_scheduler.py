@@ -0,0 +1,108 @@
+"""Tests for scheduling user refreshes by due time."""
+
+import pytest
+
+from . import state
+from .scheduler import RefreshScheduler
+from .state import UserTable
+
+
+def test_keys_are_popped_in_due_order():
+  scheduler = RefreshScheduler()
+  for key, due in [('c', 30), ('a', 10), ('b', 20), ('d', 40)]:
+    scheduler.schedule(key, due)
+  assert scheduler.next_due() == 10
+  assert scheduler.pop_due(now=5) == []
+  assert scheduler.pop_due(now=30) == ['a', 'b', 'c']
+  assert len(scheduler) == 1
+  assert scheduler.next_due() == 40
+
+
+def test_rescheduled_and_unscheduled_keys_are_lazily_removed():
+  scheduler = RefreshScheduler()
+  scheduler.schedule('a', 10)
+  scheduler.schedule('b', 20)
+  scheduler.schedule('a', 30)
+  scheduler.unschedule('b')
+  scheduler.unschedule('missing')
+  assert len(scheduler) == 1
+  assert 'b' not in scheduler
+  # The old entries stay in the heap until they reach its front
+  assert len(scheduler._queue) == 3
+  assert scheduler.next_due() == 30
+  assert len(scheduler._queue) == 1
+  assert scheduler.upcoming(5) == [(30, 'a')]
+  assert scheduler.pop_due(now=100) == ['a']
+  assert scheduler.next_due() is None
+
+
+def test_due_keys_beyond_the_budget_wait_for_the_next_tick():
+  scheduler = RefreshScheduler()
+  for i in range(5):
+    scheduler.schedule(i, i)
+  scheduler.unschedule(1)
+  assert scheduler.pop_due(now=10, budget=2) == [0, 2]
+  assert scheduler.pop_due(now=10, budget=2) == [3, 4]
+  assert scheduler.pop_due(now=10, budget=2) == []
+
+
+def test_popped_keys_are_rescheduled_for_a_retry():
+  scheduler = RefreshScheduler()
+  scheduler.schedule('a', 10)
+  scheduler.schedule('b', 20)
+  assert scheduler.pop_due(now=15, retry_after=60) == ['a']
+  assert scheduler.upcoming(5) == [(20, 'b'), (75, 'a')]
+  # A job which reschedules itself replaces its retry
+  scheduler.schedule('a', 16)
+  assert scheduler.pop_due(now=20, retry_after=60) == ['a', 'b']
+  assert scheduler.upcoming(5) == [(80, 'a'), (80, 'b')]
+
+
+def test_jitter_only_delays_jobs():
+  scheduler = RefreshScheduler(jitter=5.0)
+  dues = [scheduler.schedule(i, 100) for i in range(50)]
+  assert all(100 <= due <= 105 for due in dues)
+  assert len(set(dues)) > 1
+  assert scheduler.pop_due(now=99) == []
+
+
+def test_table_schedules_users_after_their_threshold():
+  table = UserTable()
+  table.load({
+      1: {'team_id': 7, 'last_updated': 1000, 'backoff_factor': 1},
+      2: {'team_id': -1, 'last_updated': 1000, 'backoff_factor': 2,
+          'digest': 'ignored'},
+      3: {},
+  })
+  assert table.get(2).team_id == -1
+  assert table.get(3).next_due() == state.BASE_UPDATE_THRESHOLD
+  assert table.get(4).team_id == -1
+  assert 4 not in table
+  assert table.pop_due(now=1000 + state.BASE_UPDATE_THRESHOLD) == [3, 1]
+  assert table.pop_due(now=1000 + 2 * state.BASE_UPDATE_THRESHOLD) == [2]
+
+
+def test_table_updates_reschedule_users():
+  table = UserTable()
+  table.update(1, team_id=7, last_updated=1000)
+  table.update(2, last_updated=1000)
+  table.update(2, backoff_factor=4)
+  assert table.get(1).team_id == 7
+  assert table.scheduler.upcoming(2) == [
+      (1000 + state.BASE_UPDATE_THRESHOLD, 1),
+      (1000 + 4 * state.BASE_UPDATE_THRESHOLD, 2)]
+  table.remove(1)
+  assert 1 not in table
+  assert len(table.scheduler) == 1
+
+
+@pytest.mark.parametrize('budget', [None, 1])
+def test_popped_users_are_retried_unless_refreshed(budget):
+  table = UserTable()
+  table.update(1, last_updated=0)
+  popped = table.pop_due(now=1000, budget=budget)
+  assert popped == [1]
+  assert table.scheduler.upcoming(1) == [(1000 + state.RETRY_INTERVAL, 1)]
+  table.update(1, last_updated=1000)
+  assert table.scheduler.upcoming(1) == [
+      (1000 + state.BASE_UPDATE_THRESHOLD, 1)]
@@ -0,0 +1,90 @@
+"""Tests for fuzzy team name search through the trigram index."""
+
+from fuzzywuzzy import process
+
+from . import search
+from .search import TrigramIndex, trigrams
+
+
+TEAMS = {
+    1: 'Galactic Trendsetters',
+    2: 'Setec Astronomy',
+    3: "Death and Mayhem",
+    4: 'Palindrome',
+    5: 'The Killer Bees',
+    6: 'Left Out',
+    7: 'Team Seven',
+    8: 'Team Eight',
+    9: 'teamseven',
+    10: 'Galaxy Brain',
+    11: 'Super Team!!',
+    12: 'xyzzy',
+}
+
+QUERIES = ['team seven', 'TEAM-SEVEN', 'galactic', 'galax', 'setec', 'palindrom',
+           'killer bee', 'team', 'super team', 'xyzy', 'mayhem death']
+
+
+def index_of(teams):
+  index = TrigramIndex()
+  for key, name in teams.items():
+    index.add(key, name)
+  return index
+
+
+def old_search(teams, query, limit=5, min_score=50):
+  """How teams were searched before the index: WRatio over every team."""
+  return [(key, score) for _, score, key
+          in process.extract(query, teams, limit=limit) if score >= min_score]
+
+
+def test_trigrams_are_padded_and_normalized():
+  assert trigrams('Ab') == {'  a', ' ab', 'ab '}
+  assert trigrams('A-b!') == trigrams('a b')
+  assert not TrigramIndex().search('  !! ')
+
+
+def test_results_match_scoring_every_team():
+  index = index_of(TEAMS)
+  for query in QUERIES:
+    results = index.search(query, limit=5, min_score=50)
+    expected = old_search(TEAMS, query)
+    assert [score for _, score in results] == [score for _, score in expected], query
+    # Teams with tied scores may come back in either order
+    assert set(results) == set(expected), query
+
+
+def test_only_the_best_trigram_matches_are_rescored(monkeypatch):
+  monkeypatch.setattr(search, 'CANDIDATES', 2)
+  index = index_of({1: 'team seven', 2: 'team seventy', 3: 'team', 4: 'tea'})
+  # Team 3 would score well, but shares fewer trigrams than teams 1 and 2
+  assert {key for key, _ in index.search('team seven')} == {1, 2}
+  # Teams sharing no trigram with the query are never rescored
+  index = index_of({1: 'teamseven', 2: 'setec astronomy', 3: 'xyzzy'})
+  assert [key for key, _ in index.search('setec')] == [2]
+
+
+def test_small_indexes_rescore_every_key(monkeypatch):
+  monkeypatch.setattr(search, 'CANDIDATES', 3)
+  index = index_of({1: 'teamseven', 2: 'setec astronomy', 3: 'xyzzy'})
+  assert [key for key, _ in index.search('setec', min_score=50)] == [2, 1]
+
+
+def test_keys_are_reindexed_and_removed():
+  index = index_of(TEAMS)
+  index.add(12, 'Plugh', 'plugh-alt')
+  assert index.names[12] == ('Plugh', 'plugh-alt')
+  assert not any(key == 12 for key, _ in index.search('xyzzy', min_score=50))
+  assert index.search('plugh', limit=1) == [(12, 100)]
+  index.remove(12)
+  assert 12 not in index
+  assert not any(12 in keys for keys in index.postings.values())
+  assert index.search('plugh', min_score=50) == []
+
+
+def test_removing_every_key_empties_the_postings():
+  index = index_of(TEAMS)
+  for key in TEAMS:
+    index.remove(key)
+  assert len(index) == 0
+  assert not index.postings
@@ -0,0 +1,276 @@
+# -*- py-indent-offset: 4; -*-
+"""Compiled, cached copies of trivia lists."""
+import array
+import collections
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .log import LOG
+
+__all__ = ["CompiledList", "ListCache", "ListReader"]
+
+CACHE_SIZE = 32
+COMPILED_VERSION = 2
+
+
+class CompiledList:
+    """A trivia list's metadata, and where each question is in its compiled file.
+
+    Only the metadata and an index of line offsets are held in memory; the
+    questions themselves stay on disk until they are read, through `open`.
+
+    Attributes
+    ----------
+    path : `pathlib.Path`
+        The YAML file the list was compiled from.
+    compiled : `pathlib.Path`
+        The compiled file.
+    metadata : `dict`
+        The list's ``AUTHOR``, ``DESC`` and ``CONFIG``, those it has.
+    offsets : `array.array`
+        The byte offset of each question's line in ``compiled``.
+
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        compiled: pathlib.Path,
+        stat: os.stat_result,
+        metadata: dict,
+        offsets: array.array,
+    ):
+        self.path = path
+        self.compiled = compiled
+        self.stat = (stat.st_mtime_ns, stat.st_size)
+        self.metadata = metadata
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def open(self) -> "ListReader":
+        """Open the compiled file to read questions from.
+
+        The reader keeps reading this version of the list even if the list
+        is recompiled in the meantime.
+        """
+        return ListReader(self.compiled.open("rb"), self.offsets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Read the whole list back into the `dict` its YAML file describes."""
+        trivia_dict = dict(self.metadata)
+        with self.open() as reader:
+            trivia_dict.update(reader)
+        return trivia_dict
+
+
+class ListReader(Sequence[Tuple[str, list]]):
+    """The questions of a compiled list, read from disk on demand."""
+
+    def __init__(self, file, offsets: array.array):
+        self._file = file
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Tuple[str, list]:
+        self._file.seek(self._offsets[index])
+        question, answers = json.loads(self._file.readline())
+        return question, answers
+
+    def __iter__(self):
+        self._file.seek(self._offsets[0] if self._offsets else 0)
+        for index in range(len(self._offsets)):
+            question, answers = json.loads(self._file.readline())
+            yield question, answers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+
+class ListCache:
+    """Trivia lists, parsed and validated once and then kept compiled.
+
+    Parsing a YAML list and validating it against the schema is slow, so
+    each list is only loaded through ``loader`` the first time it is asked
+    for. The result is written to ``directory`` in a compiled, line-oriented
+    JSON form, and the most recently used ``size`` lists are also kept in
+    memory, as `CompiledList` objects.
+
+    A compiled list records the modification time, size and SHA-256 hash of
+    the YAML file it was compiled from. It is used as-is while the file's
+    modification time and size are unchanged; otherwise the file is hashed,
+    and only recompiled if its contents actually changed.
+
+    The compiled form is one JSON value per line: a header, then the list's
+    metadata (``AUTHOR``, ``DESC`` and ``CONFIG``), then one
+    ``[question, answers]`` pair per question.
+
+    Attributes
+    ----------
+    directory : `pathlib.Path`
+        Where compiled lists are stored.
+    loader : `callable`
+        Parses and validates a YAML list, given its path, and returns its
+        `dict`. Errors it raises are passed on to the caller of `get`.
+    size : `int`
+        How many lists to keep in memory.
+
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        loader: Callable[[pathlib.Path], Dict[str, Any]],
+        size: int = CACHE_SIZE,
+    ):
+        self.directory = directory
+        self.loader = loader
+        self.size = size
+        self._lists = collections.OrderedDict()  # path -> CompiledList
+
+    def __len__(self):
+        return len(self._lists)
+
+    def get(self, path: pathlib.Path) -> CompiledList:
+        """Return the compiled trivia list for the YAML file at ``path``."""
+        stat = path.stat()
+        key = str(path)
+        cached = self._lists.get(key)
+        if cached is not None and cached.stat == (stat.st_mtime_ns, stat.st_size):
+            self._lists.move_to_end(key)
+            return cached
+
+        compiled = self._load_compiled(path, stat)
+        if compiled is None:
+            compiled = self._write_compiled(path, stat, _digest(path), self.loader(path))
+        self._lists[key] = compiled
+        self._lists.move_to_end(key)
+        while len(self._lists) > self.size:
+            self._lists.popitem(last=False)
+        return compiled
+
+    def discard(self, path: pathlib.Path):
+        """Forget the compiled copy of the list at ``path``, if there is one."""
+        self._lists.pop(str(path), None)
+        try:
+            self.compiled_path(path).unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        self._lists.clear()
+
+    def compiled_path(self, path: pathlib.Path) -> pathlib.Path:
+        # Custom and core lists may share a name, so tell them apart by path
+        tag = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+        return self.directory / f"{path.stem}-{tag}.jsonl"
+
+    def _load_compiled(
+        self, path: pathlib.Path, stat: os.stat_result
+    ) -> Optional[CompiledList]:
+        compiled = self.compiled_path(path)
+        try:
+            with compiled.open("rb") as file:
+                header = json.loads(file.readline())
+                if header.get("version") != COMPILED_VERSION:
+                    return None
+                fresh = (header["mtime_ns"], header["size"]) == (stat.st_mtime_ns, stat.st_size)
+                if not fresh:
+                    digest = _digest(path)
+                    if header["sha256"] != digest:
+                        return None
+                metadata = json.loads(file.readline())
+                offsets = array.array("Q")
+                position = file.tell()
+                for line in file:
+                    offsets.append(position)
+                    position += len(line)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            LOG.warning("Ignoring unreadable compiled trivia list %s: %r", compiled, exc)
+            return None
+        if len(offsets) != header.get("count"):
+            LOG.warning("Ignoring truncated compiled trivia list %s", compiled)
+            return None
+        if not fresh:
+            # Touched but unchanged; record the new mtime so we skip hashing next time
+            header.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            shift = self._replace_header(compiled, header)
+            offsets = array.array("Q", (offset + shift for offset in offsets))
+        return CompiledList(path, compiled, stat, metadata, offsets)
+
+    def _write_compiled(
+        self, path: pathlib.Path, stat: os.stat_result, digest: str, trivia_dict: dict
+    ) -> CompiledList:
+        compiled = self.compiled_path(path)
+        # Questions always map to lists of answers; anything else is metadata
+        metadata = {
+            key: value for key, value in trivia_dict.items() if not isinstance(value, list)
+        }
+        header = {
+            "version": COMPILED_VERSION,
+            "source": str(path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "count": len(trivia_dict) - len(metadata),
+        }
+        lines = [json.dumps(header).encode("utf-8"), json.dumps(metadata).encode("utf-8")]
+        offsets = array.array("Q")
+        position = sum(len(line) + 1 for line in lines)
+        for question, answers in trivia_dict.items():
+            if question not in metadata:
+                line = json.dumps([question, answers]).encode("utf-8")
+                lines.append(line)
+                offsets.append(position)
+                position += len(line) + 1
+        try:
+            self._write(compiled, lines)
+        except OSError:
+            LOG.exception("Could not write compiled trivia list %s", compiled)
+            raise
+        return CompiledList(path, compiled, stat, metadata, offsets)
+
+    def _replace_header(self, compiled: pathlib.Path, header: dict) -> int:
+        """Rewrite a compiled list's header, returning how far its questions moved."""
+        line = json.dumps(header).encode("utf-8")
+        try:
+            with compiled.open("rb") as file:
+                old_length = len(file.readline())
+                rest = file.read()
+            self._write(compiled, [line, rest[:-1]])
+        except OSError:
+            LOG.exception("Could not update compiled trivia list %s", compiled)
+            return 0
+        return len(line) + 1 - old_length
+
+    def _write(self, compiled: pathlib.Path, lines):
+        # Written aside and moved into place, so that readers which already
+        # have the old file open keep reading consistent offsets
+        temp = compiled.with_suffix(".tmp")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with temp.open("wb") as file:
+            for line in lines:
+                file.write(line + b"\n")
+        os.replace(temp, compiled)
+
+
+def _digest(path: pathlib.Path) -> str:
+    sha256 = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,52 @@
+# -*- py-indent-offset: 4; -*-
+"""Matching guesses against a trivia question's answers."""
+import re
+from typing import Iterable
+
+__all__ = ["AnswerMatcher"]
+
+# A guess is only correct if the answer it contains makes up this much of it
+MIN_MATCH_FRACTION = 0.6
+# Backreferences would point at the wrong groups once answers are combined
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class AnswerMatcher:
+    """All of a question's answers, compiled into one pattern.
+
+    Answers are regular expressions, matched case-insensitively as whole
+    words. A guess is correct if the first match of any answer in it is at
+    least `MIN_MATCH_FRACTION` of the guess's length.
+
+    Most messages don't contain an answer at all, so each guess is first
+    searched for all answers at once, with a single alternation. That
+    finds the same match the first answer to match would have found, so
+    the guess can be judged from it alone unless it is too short; only then
+    are the answers tried one by one, in case another answer's match is
+    long enough.
+    """
+
+    def __init__(self, answers: Iterable[str]):
+        answers = list(answers)
+        self.answers = tuple(re.compile(f"\\b{s}\\b", re.I) for s in answers)
+        self.combined = None
+        if answers and not any(_BACKREFERENCE.search(s) for s in answers):
+            try:
+                self.combined = re.compile("|".join(f"(?:\\b{s}\\b)" for s in answers), re.I)
+            except re.error:
+                pass  # e.g. the same group name in two answers
+
+    def matches(self, guess: str) -> bool:
+        """Whether ``guess``, already normalized, is a correct answer."""
+        min_length = MIN_MATCH_FRACTION * len(guess)
+        if self.combined is not None:
+            match = self.combined.search(guess)
+            if match is None:
+                return False
+            if len(match.group(0)) >= min_length:
+                return True
+        for answer in self.answers:
+            if the_match := answer.search(guess):
+                if len(the_match.group(0)) >= min_length:
+                    return True
+        return False
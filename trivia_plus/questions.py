@@ -0,0 +1,80 @@
+# -*- py-indent-offset: 4; -*-
+"""Random, lazily read questions for a trivia session."""
+import bisect
+import itertools
+import random
+from typing import Iterator, Sequence, Tuple
+
+__all__ = ["QuestionSource"]
+
+Question = Tuple[str, list]  # (question, answers)
+
+
+class QuestionSource:
+    """Questions drawn at random and without repeats from one or more lists.
+
+    Rather than shuffling every question up front, each question is picked
+    when it is needed, so the cost of a session is proportional to the
+    number of questions actually asked rather than to the size of its lists.
+    The lists only need to support `len` and indexing; `ListReader` objects
+    read each question from disk as it is picked.
+
+    A question which appears in more than one list is only asked once, with
+    the answers from the first list it appears in. Finding that list means
+    reading the questions of all lists but the last, which is only done once
+    a question is drawn from a list other than the first.
+    """
+
+    def __init__(self, lists: Sequence[Sequence[Question]]):
+        self.lists = list(lists)
+        self._starts = [0] + list(itertools.accumulate(len(list_) for list_ in self.lists))
+        self._swaps = {}  # position -> index, for a lazy Fisher-Yates shuffle
+        self._drawn = 0
+        self._asked = set()
+        self._first = None  # question -> index of its first copy
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def __iter__(self) -> Iterator[Question]:
+        while self._drawn < len(self):
+            index = self._draw()
+            question, answers = self._get(index)
+            if question not in self._asked:
+                self._asked.add(question)
+                first = self._first_index(question, index)
+                if first != index:
+                    question, answers = self._get(first)
+                yield question, answers
+
+    def close(self):
+        for list_ in self.lists:
+            if hasattr(list_, "close"):
+                list_.close()
+
+    def _draw(self) -> int:
+        # Swap a random undrawn position into the next drawn position, only
+        # remembering positions which have been swapped
+        position = self._drawn
+        other = random.randrange(position, len(self))
+        index = current = self._swaps.pop(position, position)
+        if other != position:
+            index = self._swaps.get(other, other)
+            self._swaps[other] = current
+        self._drawn += 1
+        return index
+
+    def _first_index(self, question: str, index: int) -> int:
+        if index < self._starts[1]:
+            return index
+        if self._first is None:
+            self._first = {}
+            for list_index, list_ in enumerate(self.lists[:-1]):
+                start = self._starts[list_index]
+                for position, (other, _answers) in enumerate(list_):
+                    self._first.setdefault(other, start + position)
+        return self._first.get(question, index)
+
+    def _get(self, index: int) -> Question:
+        list_index = bisect.bisect_right(self._starts, index) - 1
+        return self.lists[list_index][index - self._starts[list_index]]
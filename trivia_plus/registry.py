@@ -0,0 +1,101 @@
+# -*- py-indent-offset: 4; -*-
+"""Index of the trivia categories available to the cog."""
+import pathlib
+from typing import Iterable, List, Optional
+
+__all__ = ["Category", "CategoryRegistry"]
+
+
+class Category:
+    """A trivia category, and what is known about its list.
+
+    Attributes
+    ----------
+    name : `str`
+        The category's name, which is its list's file stem.
+    path : `pathlib.Path`
+        The list's YAML file.
+    custom : `bool`
+        Whether the list was uploaded, rather than packaged with the cog.
+    size : `int`, optional
+        How many questions the list has, once it has been loaded.
+    author : `str`, optional
+        The list's author, if it names one.
+    desc : `str`, optional
+        The list's description, if it has one.
+
+    """
+
+    def __init__(self, path: pathlib.Path, custom: bool):
+        self.name = path.stem
+        self.path = path
+        self.custom = custom
+        self.size = None
+        self.author = None
+        self.desc = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.size is not None
+
+    def describe(self, size: int, author: Optional[str], desc: Optional[str]):
+        self.size = size
+        self.author = author
+        self.desc = desc
+
+
+class CategoryRegistry:
+    """Trivia categories by name, so that looking one up needs no globbing.
+
+    The list directories are scanned once, by `scan`; after that, uploads
+    and deletions must be recorded with `add` and `remove`. Uploaded lists
+    take priority over packaged lists of the same name.
+    """
+
+    def __init__(self, custom_dir: pathlib.Path, core_lists: Iterable[pathlib.Path]):
+        self.custom_dir = custom_dir
+        self.core_lists = list(core_lists)
+        self._core = {}  # name -> Category
+        self._custom = {}  # name -> Category
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._custom or name in self._core
+
+    def __len__(self):
+        return len(self._core.keys() | self._custom.keys())
+
+    def scan(self):
+        self._core = {p.stem: Category(p, custom=False) for p in self.core_lists}
+        custom_lists = [p.resolve() for p in self.custom_dir.glob("*.yaml")]
+        self._custom = {p.stem: Category(p, custom=True) for p in custom_lists}
+
+    def get(self, name: str) -> Category:
+        """Return the category called ``name``.
+
+        Raises
+        ------
+        FileNotFoundError
+            There is no such category.
+        """
+        category = self._custom.get(name) or self._core.get(name)
+        if category is None:
+            raise FileNotFoundError("Could not find the `{}` category.".format(name))
+        return category
+
+    def names(self) -> List[str]:
+        return sorted(self._core.keys() | self._custom.keys())
+
+    def custom_names(self) -> List[str]:
+        return sorted(self._custom)
+
+    def is_core(self, name: str) -> bool:
+        return name in self._core
+
+    def add(self, path: pathlib.Path) -> Category:
+        """Record an uploaded list, replacing any earlier upload of the same name."""
+        category = self._custom[path.stem] = Category(path.resolve(), custom=True)
+        return category
+
+    def remove(self, name: str) -> Optional[Category]:
+        """Forget an uploaded list, returning its category if there was one."""
+        return self._custom.pop(name, None)
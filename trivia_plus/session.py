@@ -12,7 +12,11 @@ from redbot.core.utils.chat_formatting import box, bold, humanize_list, humanize
 from redbot.core.utils.common_filters import normalize_smartquotes
 from typing import List, Optional
 
+from game_sessions import message_router
+
 from .log import LOG
+from .matcher import AnswerMatcher
+from .questions import QuestionSource
 
 __all__ = ["TriviaSession"]
 
@@ -33,6 +37,7 @@ _FAIL_MESSAGES = (
     _("\N{PENSIVE FACE} Next one."),
 )
 # _ = T_
+_WHITESPACE = re.compile(r"\s+")
 
 
 class TriviaSession:
@@ -47,9 +52,9 @@ class TriviaSession:
         Context object from which this session will be run.
         This object assumes the session was started in `ctx.channel`
         by `ctx.author`.
-    question_list : `dict`
-        A list of tuples mapping questions (`str`) to answers (`list` of
-        `str`).
+    question_list : `QuestionSource`
+        The questions (`str`) to ask, with their answers (`list` of `str`),
+        in the order they are to be asked.
     settings : `dict`
         Settings for the trivia session, with values for the following:
          - ``max_score`` (`int`)
@@ -69,11 +74,11 @@ class TriviaSession:
 
     """
 
-    def __init__(self, ctx, question_list: dict, settings: dict):
+    def __init__(self, ctx, question_list, settings: dict):
         self.ctx = ctx
-        list_ = list(question_list.items())
-        random.shuffle(list_)
-        self.question_list = list_
+        if isinstance(question_list, dict):
+            question_list = QuestionSource([list(question_list.items())])
+        self.question_list = question_list
         self.settings = settings
         self.scores = Counter()
         self.count = 0
@@ -91,8 +96,9 @@ class TriviaSession:
         ----------
         ctx : `commands.Context`
             Same as `TriviaSession.ctx`
-        question_list : `dict`
-            Same as `TriviaSession.question_list`
+        question_list : `QuestionSource` or `dict`
+            Same as `TriviaSession.question_list`. A `dict` mapping
+            questions to answers is also accepted.
         settings : `dict`
             Same as `TriviaSession.settings`
 
@@ -110,6 +116,7 @@ class TriviaSession:
 
     def _error_handler(self, fut):
         """Catches errors in the session task."""
+        self.question_list.close()
         try:
             fut.result()
         except asyncio.CancelledError:
@@ -253,8 +260,8 @@ class TriviaSession:
                 reveal_task = self.ctx.bot.loop.create_task(self.reveal_answer(answers[0], slow_reveal))
             if quizbowl_interval:
                 prompt_task = self.ctx.bot.loop.create_task(self.extra_prompts(remains, quizbowl_interval))
-            message = await self.ctx.bot.wait_for(
-                "message", check=self.check_answer(answers), timeout=delay
+            message = await message_router(self.ctx.bot).wait_for(
+                self.ctx.channel, check=self.check_answer(answers), timeout=delay
             )
         except asyncio.TimeoutError:
             if time.time() - self._last_response >= timeout:
@@ -307,7 +314,8 @@ class TriviaSession:
 
         The returned predicate takes a message as its only parameter,
         and returns ``True`` if the message contains any of the
-        given answers.
+        given answers. The answers are compiled into an `AnswerMatcher`
+        once, rather than for every message.
 
         Parameters
         ----------
@@ -320,7 +328,7 @@ class TriviaSession:
             The message predicate.
 
         """
-        answers = tuple(re.compile(f'\\b{s}\\b', re.I) for s in answers)
+        matcher = AnswerMatcher(answers)
 
         def _pred(message: discord.Message):
             early_exit = message.channel != self.ctx.channel or message.author == self.ctx.guild.me
@@ -328,13 +336,9 @@ class TriviaSession:
                 return False
 
             self._last_response = time.time()
-            guess = re.sub(r'\s+', ' ', message.content.strip().lower())
+            guess = _WHITESPACE.sub(' ', message.content.strip().lower())
             guess = normalize_smartquotes(guess)
-            for answer in answers:
-                if the_match := answer.search(guess):
-                    if len(the_match.group(0)) >= .6 * len(guess):
-                        return True
-            return False
+            return matcher.matches(guess)
 
         return _pred
 
@@ -0,0 +1,159 @@
+# -*- py-indent-offset: 4; -*-
+"""Tests for compiling trivia lists and serving them from the cache."""
+import json
+import os
+
+import pytest
+
+from . import cache
+from .cache import ListCache
+
+TRIVIA = {
+    "AUTHOR": "Someone",
+    "CONFIG": {"max_score": 5},
+    "What is 2 + 2?": ["4", "four"],
+    "Café or café?": ["Both"],
+    'Who said "hello"?': ["Everyone"],
+}
+
+
+class CountingLoader:
+    """Loads lists written as JSON, counting how often it is called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with path.open(encoding="utf-8") as file:
+            return json.load(file)
+
+
+def write_list(path, trivia_dict, mtime_ns=None):
+    path.write_text(json.dumps(trivia_dict), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def questions(trivia_dict):
+    return [(key, value) for key, value in trivia_dict.items() if isinstance(value, list)]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "lists" / "sample.yaml"
+    path.parent.mkdir()
+    write_list(path, TRIVIA, mtime_ns=1_600_000_000_000_000_000)
+    return path
+
+
+@pytest.fixture
+def loader():
+    return CountingLoader()
+
+
+@pytest.fixture
+def list_cache(tmp_path, loader):
+    return ListCache(tmp_path / "compiled", loader)
+
+
+def reopen(list_cache):
+    """A cache with nothing in memory, reading the same compiled files."""
+    return ListCache(list_cache.directory, list_cache.loader)
+
+
+def test_compiled_list_holds_metadata_and_offsets(source, list_cache):
+    compiled = list_cache.get(source)
+    assert compiled.metadata == {"AUTHOR": "Someone", "CONFIG": {"max_score": 5}}
+    assert len(compiled) == 3
+    data = compiled.compiled.read_bytes()
+    for offset, (question, answers) in zip(compiled.offsets, questions(TRIVIA)):
+        line = data[offset:data.index(b"\n", offset)]
+        assert json.loads(line) == [question, answers]
+    with compiled.open() as reader:
+        assert list(reader) == questions(TRIVIA)
+        assert reader[2] == questions(TRIVIA)[2]
+        assert reader[0] == questions(TRIVIA)[0]
+    assert compiled.to_dict() == TRIVIA
+
+
+def test_lists_are_only_loaded_once(source, list_cache, loader):
+    compiled = list_cache.get(source)
+    assert list_cache.get(source) is compiled
+    reopened = reopen(list_cache).get(source)
+    assert loader.calls == 1
+    assert list(reopened.offsets) == list(compiled.offsets)
+    assert reopened.to_dict() == TRIVIA
+
+
+def test_touched_list_is_not_recompiled(source, list_cache, loader, monkeypatch):
+    compiled = list_cache.get(source)
+    # A much shorter mtime shortens the header, moving every question
+    os.utime(source, ns=(1, 1))
+    touched = reopen(list_cache).get(source)
+    assert loader.calls == 1
+    shift = touched.offsets[0] - compiled.offsets[0]
+    assert shift < 0
+    assert [offset - shift for offset in touched.offsets] == list(compiled.offsets)
+    with touched.open() as reader:
+        assert list(reader) == questions(TRIVIA)
+        assert reader[1] == questions(TRIVIA)[1]
+
+    # The new mtime was recorded, so the list isn't even hashed again
+    def fail(path):
+        raise AssertionError("hashed a list whose mtime and size are unchanged")
+
+    monkeypatch.setattr(cache, "_digest", fail)
+    assert reopen(list_cache).get(source).to_dict() == TRIVIA
+
+
+def test_list_changed_in_size_is_recompiled(source, list_cache, loader):
+    list_cache.get(source)
+    changed = dict(TRIVIA, **{"What is 3 + 3?": ["6", "six"]})
+    write_list(source, changed, mtime_ns=1_600_000_000_000_000_000)
+    compiled = list_cache.get(source)
+    assert loader.calls == 2
+    assert compiled.to_dict() == changed
+    assert reopen(list_cache).get(source).to_dict() == changed
+    assert loader.calls == 2
+
+
+def test_list_changed_in_place_is_recompiled(source, list_cache, loader):
+    list_cache.get(source)
+    # Same size, new contents, new mtime: only the hash tells them apart
+    changed = dict(TRIVIA, **{"What is 2 + 2?": ["5", "five"]})
+    write_list(source, changed, mtime_ns=1_700_000_000_000_000_000)
+    assert source.stat().st_size == len(json.dumps(TRIVIA).encode("utf-8"))
+    compiled = reopen(list_cache).get(source)
+    assert loader.calls == 2
+    assert compiled.to_dict() == changed
+
+
+def test_readers_keep_their_version_of_a_recompiled_list(source, list_cache):
+    with list_cache.get(source).open() as reader:
+        changed = {"Only question?": ["Yes"]}
+        write_list(source, changed)
+        assert list_cache.get(source).to_dict() == changed
+        assert list(reader) == questions(TRIVIA)
+
+
+def test_truncated_compiled_list_is_recompiled(source, list_cache, loader):
+    compiled = list_cache.get(source)
+    data = compiled.compiled.read_bytes()
+    compiled.compiled.write_bytes(data[:compiled.offsets[-1]])
+    assert reopen(list_cache).get(source).to_dict() == TRIVIA
+    assert loader.calls == 2
+
+
+def test_least_recently_used_lists_are_evicted(tmp_path, loader):
+    list_cache = ListCache(tmp_path / "compiled", loader, size=2)
+    paths = [tmp_path / f"list{i}.yaml" for i in range(3)]
+    for path in paths:
+        write_list(path, TRIVIA)
+    first = list_cache.get(paths[0])
+    list_cache.get(paths[1])
+    list_cache.get(paths[0])
+    list_cache.get(paths[2])
+    assert len(list_cache) == 2
+    assert list_cache.get(paths[0]) is first
+    assert loader.calls == 3
@@ -0,0 +1,118 @@
+# -*- py-indent-offset: 4; -*-
+"""Tests that AnswerMatcher judges guesses as the per-answer check did."""
+import itertools
+import re
+
+import pytest
+
+from .matcher import AnswerMatcher
+
+
+def old_matches(answers, guess):
+    """The check AnswerMatcher replaced: each answer, searched for in turn."""
+    for answer in answers:
+        if the_match := re.search(f"\\b{answer}\\b", guess, re.I):
+            if len(the_match.group(0)) >= 0.6 * len(guess):
+                return True
+    return False
+
+
+GUESSES = [
+    "",
+    "no idea",
+    "4",
+    "four",
+    "42",
+    "1984",
+    "it is 1984",
+    "1984 or 1985",
+    "c++",
+    "c",
+    "u.s.a.",
+    "usa",
+    "the u.s.",
+    "new york",
+    "new york city",
+    "york",
+    "new",
+    "the new york times",
+    "st. louis",
+    "saint louis",
+    "rock and roll",
+    "rock",
+    "rock & roll",
+    "mississippi",
+    "a mississippi river",
+    "ABBA",
+    "abba abba",
+    "$100",
+    "100",
+    "3.14",
+    "3x14",
+]
+
+ANSWER_SETS = {
+    "numbers": ["4", "four", "42", "1984", "3.14", "100"],
+    "special characters": ["c\\+\\+", "u\\.s\\.a\\.", "st\\. louis", "\\$100", "rock (and|&) roll"],
+    "overlapping alternatives": ["new", "new york", "new york city", "york"],
+    "overlapping, longest first": ["new york city", "new york", "york", "new"],
+    "optional parts": ["(saint|st\\.?) louis", "(the )?u\\.?s\\.?(a\\.?)?", "rock"],
+    "repetition": ["missis+ippi", "(ab)+a", "ab+a"],
+}
+
+
+@pytest.mark.parametrize("answers", ANSWER_SETS.values(), ids=ANSWER_SETS.keys())
+def test_same_verdicts_as_the_per_answer_check(answers):
+    matcher = AnswerMatcher(answers)
+    assert matcher.combined is not None
+    for guess in GUESSES:
+        assert matcher.matches(guess) == old_matches(answers, guess), guess
+
+
+@pytest.mark.parametrize("answers", ANSWER_SETS.values(), ids=ANSWER_SETS.keys())
+def test_answer_order_does_not_matter(answers):
+    for permutation in itertools.islice(itertools.permutations(answers), 24):
+        matcher = AnswerMatcher(permutation)
+        for guess in GUESSES:
+            assert matcher.matches(guess) == old_matches(answers, guess), (permutation, guess)
+
+
+def test_short_first_match_falls_back_to_each_answer():
+    # The combined pattern first finds "york", too short a part of the guess,
+    # while "york city" alone matches enough of it
+    answers = ["york", "york city"]
+    matcher = AnswerMatcher(answers)
+    guess = "york city"
+    assert matcher.combined.search(guess).group(0) == "york"
+    assert matcher.matches(guess)
+    assert old_matches(answers, guess)
+    assert not matcher.matches("york, not york city")
+    assert not old_matches(answers, "york, not york city")
+
+
+@pytest.mark.parametrize(
+    "answers",
+    [["(a)b\\1", "c"], ["(?P<x>a)b(?P=x)", "c"]],
+    ids=["numbered", "named"],
+)
+def test_backreferences_are_matched_one_by_one(answers):
+    matcher = AnswerMatcher(answers)
+    assert matcher.combined is None
+    for guess in ["aba", "abb", "c", "xaba", "abc"]:
+        assert matcher.matches(guess) == old_matches(answers, guess), guess
+
+
+def test_answers_which_cannot_be_combined_are_matched_one_by_one():
+    # The same group name twice is an error only once the answers are combined
+    answers = ["(?P<n>one)", "(?P<n>two)"]
+    matcher = AnswerMatcher(answers)
+    assert matcher.combined is None
+    assert matcher.matches("one")
+    assert matcher.matches("two")
+    assert not matcher.matches("three")
+
+
+def test_no_answers_match_nothing():
+    matcher = AnswerMatcher([])
+    assert not matcher.matches("")
+    assert not matcher.matches("anything")
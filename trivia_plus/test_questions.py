@@ -0,0 +1,91 @@
+# -*- py-indent-offset: 4; -*-
+"""Tests for drawing trivia questions at random from several lists."""
+import json
+import random
+
+import pytest
+
+from .cache import ListCache
+from .questions import QuestionSource
+
+
+class CountingList(list):
+    """A list of questions which counts how many of them are read."""
+
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+def make_list(name, count):
+    return CountingList((f"{name} {i}?", [f"{name}{i}"]) for i in range(count))
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(1234)
+
+
+def test_every_question_is_drawn_once():
+    lists = [make_list("a", 50), make_list("b", 1), make_list("c", 0), make_list("d", 20)]
+    drawn = list(QuestionSource(lists))
+    assert sorted(drawn) == sorted(question for list_ in lists for question in list_)
+
+
+def test_draws_are_shuffled():
+    orders = {
+        tuple(question for question, _answers in QuestionSource([make_list("a", 10)]))
+        for _ in range(20)
+    }
+    assert len(orders) > 1
+
+
+def test_only_asked_questions_are_read():
+    list_ = make_list("a", 1000)
+    source = QuestionSource([list_])
+    drawn = list(zip(range(5), source))
+    assert len(drawn) == 5
+    assert list_.reads == 5
+    assert len(source._swaps) <= 5
+
+
+def test_each_position_is_equally_likely_first():
+    counts = [0] * 4
+    for _ in range(4000):
+        question, _answers = next(iter(QuestionSource([make_list("a", 4)])))
+        counts[int(question[2])] += 1
+    assert all(800 < count < 1200 for count in counts)
+
+
+def test_questions_in_several_lists_are_asked_once_with_the_first_answers():
+    first = CountingList([("Shared?", ["first"]), ("Only first?", ["1"])])
+    second = CountingList([("Only second?", ["2"]), ("Shared?", ["second"])])
+    third = CountingList([("Shared?", ["third"])])
+    for _ in range(20):
+        drawn = list(QuestionSource([first, second, third]))
+        assert sorted(drawn) == [
+            ("Only first?", ["1"]),
+            ("Only second?", ["2"]),
+            ("Shared?", ["first"]),
+        ]
+
+
+def test_compiled_lists_keep_the_first_answers(tmp_path):
+    paths = [tmp_path / "first.yaml", tmp_path / "second.yaml"]
+    paths[0].write_text(json.dumps({"AUTHOR": "A", "Shared?": ["first"]}), encoding="utf-8")
+    paths[1].write_text(
+        json.dumps({"Shared?": ["second"], "Other?": ["other"]}), encoding="utf-8"
+    )
+    list_cache = ListCache(tmp_path / "compiled", lambda path: json.loads(path.read_text()))
+    source = QuestionSource([list_cache.get(path).open() for path in paths])
+    try:
+        assert sorted(source) == [("Other?", ["other"]), ("Shared?", ["first"])]
+    finally:
+        source.close()
+
+
+def test_empty_source():
+    assert list(QuestionSource([])) == []
+    assert list(QuestionSource([make_list("a", 0)])) == []
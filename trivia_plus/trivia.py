@@ -3,7 +3,6 @@
 import asyncio
 import math
 import pathlib
-from collections import Counter
 from schema import Schema, Optional, Or, SchemaError
 from typing import Any, Dict, List, Literal
 
@@ -20,9 +19,21 @@ from redbot.core.utils.chat_formatting import box, pagify, bold
 from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import MessagePredicate, ReactionPredicate
 
+from game_sessions import (
+    STAT_DEFAULTS,
+    ChannelBusyError,
+    LeaderboardStore,
+    SessionLimitError,
+    message_router,
+    session_registry,
+)
+
+from .cache import CompiledList, ListCache
 from .checks import trivia_stop_check
 from .converters import finite_float
 from .log import LOG
+from .questions import QuestionSource
+from .registry import CategoryRegistry
 from .session import TriviaSession
 
 __all__ = ("Trivia", "UNIQUE_ID", "InvalidListError", "get_core_lists", "get_list")
@@ -64,9 +75,14 @@ class InvalidListError(Exception):
 class Trivia(commands.Cog):
     """Play trivia with friends!"""
 
-    def __init__(self):
+    def __init__(self, bot):
         super().__init__()
-        self.trivia_sessions = []
+        self.bot = bot
+        self.sessions = session_registry(bot)
+        message_router(bot).attach(self)
+        self.list_cache = ListCache(cog_data_path(self) / "compiled", get_list)
+        self.categories = CategoryRegistry(cog_data_path(self), get_core_lists())
+        self.categories.scan()
         self.config = Config.get_conf(self, identifier=UNIQUE_ID, force_registration=True)
 
         self.config.register_guild(
@@ -82,7 +98,8 @@ class Trivia(commands.Cog):
             use_spoilers=False,
         )
 
-        self.config.register_member(wins=0, games=0, total_score=0)
+        self.config.register_member(**STAT_DEFAULTS)
+        self.leaderboard = LeaderboardStore(self.config)
 
     async def red_delete_data_for_user(
         self,
@@ -97,7 +114,7 @@ class Trivia(commands.Cog):
 
         async for guild_id, guild_data in AsyncIter(all_members.items(), steps=100):
             if user_id in guild_data:
-                await self.config.member_from_ids(guild_id, user_id).clear()
+                await self.leaderboard.delete_member(guild_id, user_id)
 
     @commands.group()
     @commands.guild_only()
@@ -269,7 +286,7 @@ class Trivia(commands.Cog):
     @triviaset_custom.command(name="list")
     async def custom_trivia_list(self, ctx: commands.Context):
         """List uploaded custom trivia."""
-        personal_lists = sorted([p.resolve().stem for p in cog_data_path(self).glob("*.yaml")])
+        personal_lists = self.categories.custom_names()
         no_lists_uploaded = _("No custom Trivia lists uploaded.")
 
         if not personal_lists:
@@ -344,10 +361,11 @@ class Trivia(commands.Cog):
     @triviaset_custom.command(name="delete", aliases=["remove"])
     async def trivia_delete(self, ctx: commands.Context, name: str):
         """Delete a trivia file."""
-        filepath = cog_data_path(self) / f"{name}.yaml"
-        if filepath.exists():
-            filepath.unlink()
-            await ctx.send(_("Trivia {filename} was deleted.").format(filename=filepath.stem))
+        category = self.categories.remove(name)
+        if category is not None and category.path.exists():
+            self.list_cache.discard(category.path)
+            category.path.unlink()
+            await ctx.send(_("Trivia {filename} was deleted.").format(filename=category.name))
         else:
             await ctx.send(_("Trivia file was not found."))
 
@@ -363,56 +381,33 @@ class Trivia(commands.Cog):
             await ctx.send_help()
             return
         categories = [c.lower() for c in categories]
-        session = self._get_trivia_session(ctx.channel)
-        if session is not None:
-            await ctx.send(_("There is already an ongoing trivia session in this channel."))
-            return
-        trivia_dict = {}
-        authors = []
-        for category in reversed(categories):
-            # We reverse the categories so that the first list's config takes
-            # priority over the others.
-            try:
-                dict_ = self.get_trivia_list(category)
-            except FileNotFoundError:
-                await ctx.send(
-                    _(
-                        "Invalid category `{name}`. See `{prefix}trivia list` for a list of "
-                        "trivia categories."
-                    ).format(name=category, prefix=ctx.clean_prefix)
-                )
-            except InvalidListError as exc:
-                await ctx.send(
-                    _(
-                        "There was an error parsing the trivia list for the `{name}` category. It "
-                        "may be formatted incorrectly."
-                    ).format(name=category)
-                )
-                LOG.exception(f"Failed to parse triviai [{category.lower()}]: {exc}")
+        try:
+            slot = self.sessions.claim(ctx.channel, "trivia")
+        except ChannelBusyError as exc:
+            if exc.kind == "trivia":
+                await ctx.send(_("There is already an ongoing trivia session in this channel."))
             else:
-                trivia_dict.update(dict_)
-                authors.insert(0, (trivia_dict.pop("AUTHOR", None), get_trivia_list_size(dict_)))
-                continue
+                await ctx.send(str(exc))
             return
-        if not trivia_dict:
-            await ctx.send(
-                _("The trivia list was parsed successfully, however it appears to be empty!")
-            )
+        except SessionLimitError as exc:
+            await ctx.send(str(exc))
             return
-        settings = await self.config.guild(ctx.guild).all()
-        config = trivia_dict.pop("CONFIG", None)
-        if config and settings["allow_override"]:
-            settings.update(config)
-        settings["lists"] = dict(zip(categories, authors))
-        session = TriviaSession.start(ctx, trivia_dict, settings)
-        self.trivia_sessions.append(session)
-        LOG.debug("New trivia session; #%s in %d", ctx.channel, ctx.guild.id)
+        session = None
+        try:
+            session = await self._start_trivia_session(ctx, categories)
+        finally:
+            if session is None:
+                self.sessions.release(ctx.channel, slot)
+            else:
+                self.sessions.start(slot, session)
 
     @trivia.command(name="info")
     async def trivia_info(self, ctx: commands.Context, category: str):
         """Show the description of a trivia category."""
         try:
-            dict_ = self.get_trivia_list(category.lower())
+            entry = self.categories.get(category.lower())
+            if not entry.loaded:
+                self._get_compiled_list(entry.name)
         except FileNotFoundError:
             await ctx.send(
                 f"Invalid category `{category.lower()}`. See `{ctx.prefix}trivia list` for"
@@ -424,12 +419,12 @@ class Trivia(commands.Cog):
             LOG.exception(f"Failed to parse triviai [{category.lower()}]: {exc}")
         else:
             title = f"{category.lower()}"
-            count = f"({get_trivia_list_size(dict_)} questions"
-            if 'AUTHOR' in dict_:
-                count += f" by {dict_['AUTHOR']})"
+            count = f"({entry.size} questions"
+            if entry.author is not None:
+                count += f" by {entry.author})"
             else:
                 count += ")"
-            desc = dict_.get('DESC', None)
+            desc = entry.desc
             if await ctx.embed_requested():
                 await ctx.send(
                     embed=discord.Embed(
@@ -456,7 +451,7 @@ class Trivia(commands.Cog):
     @trivia.command(name="list")
     async def trivia_list(self, ctx: commands.Context):
         """List available trivia categories."""
-        lists = set(p.stem for p in self._all_lists())
+        lists = self.categories.names()
         if await ctx.embed_requested():
             await ctx.send(
                 embed=discord.Embed(
@@ -510,11 +505,8 @@ class Trivia(commands.Cog):
                 ).format(field_name=sort_by, prefix=ctx.clean_prefix)
             )
             return
-        guild = ctx.guild
-        data = await self.config.all_members(guild)
-        data = {guild.get_member(u): d for u, d in data.items()}
-        data.pop(None, None)  # remove any members which aren't in the guild
-        await self.send_leaderboard(ctx, data, key, top)
+        rows = await self.leaderboard.top_members(ctx.guild, key, top)
+        await self.send_leaderboard(ctx, rows)
 
     @trivia_leaderboard.command(name="global")
     async def trivia_leaderboard_global(
@@ -539,21 +531,8 @@ class Trivia(commands.Cog):
                 ).format(field_name=sort_by, prefix=ctx.clean_prefix)
             )
             return
-        data = await self.config.all_members()
-        collated_data = {}
-        for guild_id, guild_data in data.items():
-            guild = ctx.bot.get_guild(guild_id)
-            if guild is None:
-                continue
-            for member_id, member_data in guild_data.items():
-                member = guild.get_member(member_id)
-                if member is None:
-                    continue
-                collated_member_data = collated_data.get(member, Counter())
-                for v_key, value in member_data.items():
-                    collated_member_data[v_key] += value
-                collated_data[member] = collated_member_data
-        await self.send_leaderboard(ctx, collated_data, key, top)
+        rows = await self.leaderboard.top_users(ctx.bot, key, top)
+        await self.send_leaderboard(ctx, rows)
 
     @staticmethod
     def _get_sort_key(key: str):
@@ -565,21 +544,16 @@ class Trivia(commands.Cog):
         elif key in ("total", "score", "answers", "correct"):
             return "total_score"
 
-    async def send_leaderboard(self, ctx: commands.Context, data: dict, key: str, top: int):
+    async def send_leaderboard(self, ctx: commands.Context, rows: list):
         """Send the leaderboard from the given data.
 
         Parameters
         ----------
         ctx : commands.Context
             The context to send the leaderboard to.
-        data : dict
-            The data for the leaderboard. This must map `discord.Member` ->
-            `dict`.
-        key : str
-            The field to sort the data by. Can be ``wins``, ``total_score``,
-            ``games`` or ``average_score``.
-        top : int
-            The number of members to display on the leaderboard.
+        rows : list
+            The leaderboard, best first, as ``(discord.Member, dict)``
+            pairs of players and their stats.
 
         Returns
         -------
@@ -587,35 +561,18 @@ class Trivia(commands.Cog):
             The sent leaderboard messages.
 
         """
-        if not data:
+        if not rows:
             await ctx.send(_("There are no scores on record!"))
             return
-        leaderboard = self._get_leaderboard(data, key, top)
+        leaderboard = self._get_leaderboard(rows)
         ret = []
         for page in pagify(leaderboard, shorten_by=10):
             ret.append(await ctx.send(box(page, lang="py")))
         return ret
 
     @staticmethod
-    def _get_leaderboard(data: dict, key: str, top: int):
-        # Mix in average score
-        for member, stats in data.items():
-            if stats["games"] != 0:
-                stats["average_score"] = stats["total_score"] / stats["games"]
-            else:
-                stats["average_score"] = 0.0
-        # Sort by reverse order of priority
-        priority = ["average_score", "total_score", "wins", "games"]
-        try:
-            priority.remove(key)
-        except ValueError:
-            raise ValueError(f"{key} is not a valid key.")
-        # Put key last in reverse priority
-        priority.append(key)
-        items = data.items()
-        for key in priority:
-            items = sorted(items, key=lambda t: t[1][key], reverse=True)
-        max_name_len = max(map(lambda m: len(str(m)), data.keys()))
+    def _get_leaderboard(rows: list):
+        max_name_len = max(len(str(member)) for member, stats in rows)
         # Headers
         headers = (
             _("Rank"),
@@ -627,7 +584,7 @@ class Trivia(commands.Cog):
         )
         lines = [" | ".join(headers), " | ".join(("-" * len(h) for h in headers))]
         # Header underlines
-        for rank, tup in enumerate(items, 1):
+        for rank, tup in enumerate(rows, 1):
             member, m_data = tup
             # Align fields to header width
             fields = tuple(
@@ -646,8 +603,6 @@ class Trivia(commands.Cog):
             padding = [" " * (len(h) - len(f)) for h, f in zip(headers, fields)]
             fields = tuple(f + padding[i] for i, f in enumerate(fields))
             lines.append(" | ".join(fields))
-            if rank == top:
-                break
         return "\n".join(lines)
 
     @commands.Cog.listener()
@@ -665,8 +620,7 @@ class Trivia(commands.Cog):
         """
         channel = session.ctx.channel
         LOG.debug("Ending trivia session; #%s in %s", channel, channel.guild.id)
-        if session in self.trivia_sessions:
-            self.trivia_sessions.remove(session)
+        self.sessions.release(channel, session)
         if session.scores:
             await self.update_leaderboard(session)
 
@@ -680,15 +634,12 @@ class Trivia(commands.Cog):
 
         """
         max_score = session.settings["max_score"]
-        for member, score in session.scores.items():
-            if member.id == session.ctx.bot.user.id:
-                continue
-            stats = await self.config.member(member).all()
-            if score == max_score:
-                stats["wins"] += 1
-            stats["total_score"] += score
-            stats["games"] += 1
-            await self.config.member(member).set(stats)
+        results = {
+            member.id: (score, score == max_score)
+            for member, score in session.scores.items()
+            if member.id != session.ctx.bot.user.id
+        }
+        await self.leaderboard.record_game(session.ctx.guild, results)
 
     def get_trivia_list(self, category: str) -> dict:
         """Get the trivia list corresponding to the given category.
@@ -704,11 +655,72 @@ class Trivia(commands.Cog):
             A dict mapping questions (`str`) to answers (`list` of `str`).
 
         """
-        try:
-            path = next(p for p in self._all_lists() if p.stem == category)
-        except StopIteration:
-            raise FileNotFoundError("Could not find the `{}` category.".format(category))
-        return get_list(path)
+        return self._get_compiled_list(category).to_dict()
+
+    def _get_compiled_list(self, category: str) -> CompiledList:
+        """Get the compiled trivia list for the given category from `list_cache`.
+
+        Lists are only parsed the first time they are used, or after they
+        change. This also records the list's size, author and description
+        in its category.
+        """
+        entry = self.categories.get(category)
+        compiled = self.list_cache.get(entry.path)
+        entry.describe(
+            len(compiled), compiled.metadata.get("AUTHOR"), compiled.metadata.get("DESC")
+        )
+        return compiled
+
+    async def _start_trivia_session(
+        self, ctx: commands.Context, categories: List[str]
+    ) -> TriviaSession:
+        """Load the lists for ``categories`` and start a session on them.
+
+        Returns `None`, having told the user why, if any list can't be
+        loaded.
+        """
+        lists = []
+        authors = []
+        config = None
+        for category in reversed(categories):
+            # We reverse the categories so that the first list's config takes
+            # priority over the others.
+            try:
+                compiled = self._get_compiled_list(category)
+            except FileNotFoundError:
+                await ctx.send(
+                    _(
+                        "Invalid category `{name}`. See `{prefix}trivia list` for a list of "
+                        "trivia categories."
+                    ).format(name=category, prefix=ctx.clean_prefix)
+                )
+            except InvalidListError as exc:
+                await ctx.send(
+                    _(
+                        "There was an error parsing the trivia list for the `{name}` category. It "
+                        "may be formatted incorrectly."
+                    ).format(name=category)
+                )
+                LOG.exception(f"Failed to parse triviai [{category.lower()}]: {exc}")
+            else:
+                lists.insert(0, compiled)
+                authors.insert(0, (compiled.metadata.get("AUTHOR"), len(compiled)))
+                config = compiled.metadata.get("CONFIG", config)
+                continue
+            return
+        if not any(lists):
+            await ctx.send(
+                _("The trivia list was parsed successfully, however it appears to be empty!")
+            )
+            return
+        settings = await self.config.guild(ctx.guild).all()
+        if config and settings["allow_override"]:
+            settings.update(config)
+        settings["lists"] = dict(zip(categories, authors))
+        questions = QuestionSource([compiled.open() for compiled in lists])
+        session = TriviaSession.start(ctx, questions, settings)
+        LOG.debug("New trivia session; #%s in %d", ctx.channel, ctx.guild.id)
+        return session
 
     async def _save_trivia_list(
         self, ctx: commands.Context, attachment: discord.Attachment
@@ -727,9 +739,7 @@ class Trivia(commands.Cog):
         filename = attachment.filename.rsplit(".", 1)[0].casefold()
 
         # Check if trivia filename exists in core files or if it is a command
-        if filename in self.trivia.all_commands or any(
-            filename == item.stem for item in get_core_lists()
-        ):
+        if filename in self.trivia.all_commands or self.categories.is_core(filename):
             await ctx.send(
                 _(
                     "{filename} is a reserved trivia name and cannot be replaced.\n"
@@ -776,21 +786,18 @@ class Trivia(commands.Cog):
         buffer.seek(0)
         with file.open("wb") as fp:
             fp.write(buffer.read())
+        self.list_cache.discard(file.resolve())
+        self.categories.add(file)
         await ctx.send(_("Saved Trivia list as {filename}.").format(filename=filename))
 
     def _get_trivia_session(self, channel: discord.TextChannel) -> TriviaSession:
-        return next(
-            (session for session in self.trivia_sessions if session.ctx.channel == channel), None
-        )
-
-    def _all_lists(self) -> List[pathlib.Path]:
-        personal_lists = [p.resolve() for p in cog_data_path(self).glob("*.yaml")]
-
-        return personal_lists + get_core_lists()
+        return self.sessions.get(channel, "trivia")
 
     def cog_unload(self):
-        for session in self.trivia_sessions:
+        for session in self.sessions.sessions("trivia"):
             session.force_stop()
+            self.sessions.release(session.ctx.channel, session)
+        message_router(self.bot).detach(self)
 
 
 def get_core_lists() -> List[pathlib.Path]:
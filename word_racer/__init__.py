@@ -1,4 +1,4 @@
 from .wordracer import WordRacer
 
 def setup(bot):
-    bot.add_cog(WordRacer())
+    bot.add_cog(WordRacer(bot))
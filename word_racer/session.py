@@ -9,6 +9,8 @@ import re
 import time
 from PIL import Image, ImageDraw, ImageFont
 
+from game_sessions import message_router
+
 __all__ = ["WordRacerSession"]
 
 _LEVEL_COUNT = 4
@@ -112,7 +114,8 @@ class WordRacerSession:
         timer_task = self.ctx.bot.loop.create_task(self.timer_task())
         reaction_task = self.ctx.bot.loop.create_task(self.reactions_handler())
         try:
-            await self.ctx.bot.wait_for("message", check=self.check_message, timeout=_ROUND_TIME)
+            await message_router(self.ctx.bot).wait_for(
+                self.ctx.channel, check=self.check_message, timeout=_ROUND_TIME)
         except asyncio.TimeoutError:
             #Round over
             pass